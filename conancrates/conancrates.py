@@ -18,17 +18,24 @@ This tool:
 
 import sys
 import os
+import io
 import subprocess
 import json
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 import argparse
 
 # Fix Windows console encoding and make unbuffered for real-time output
 if sys.platform == 'win32':
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace', line_buffering=True)
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace', line_buffering=True)
 else:
@@ -36,6 +43,86 @@ else:
     sys.stdout.reconfigure(line_buffering=True) if hasattr(sys.stdout, 'reconfigure') else None
 
 
+# HTTP client defaults (overridable with --timeout / --retries / --no-compression)
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300
+DEFAULT_RETRIES = 3
+DEFAULT_POOL_SIZE = 16
+
+# Status codes worth retrying - the server or a proxy in front of it is busy
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Binaries at least this large are uploaded straight to MinIO through an
+# upload session (when the server supports it) instead of through the server
+DIRECT_UPLOAD_MIN_SIZE = 16 * 1024 * 1024
+
+# Parts of one direct upload sent to MinIO in parallel
+DEFAULT_PART_UPLOADS = 4
+
+
+class HttpSession(requests.Session):
+    """
+    Shared HTTP session for all server calls.
+
+    Keeps connections alive in a pool (no TCP/TLS handshake per request),
+    applies a default timeout and retries idempotent requests (GET/HEAD)
+    with exponential backoff. Uploads (POST) are never retried automatically.
+    """
+
+    def __init__(self, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 retries=DEFAULT_RETRIES, compression=True, pool_size=DEFAULT_POOL_SIZE):
+        super().__init__()
+        self.timeout = timeout
+        self.retries = retries
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+        # Let the server compress JSON responses; identity avoids pointless
+        # re-compression of already-gzipped binaries when turned off
+        self.headers['Accept-Encoding'] = 'gzip, deflate' if compression else 'identity'
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_http_session = None
+
+
+def configure_http_session(**options):
+    """Create the shared HTTP session with the given HttpSession options."""
+    global _http_session
+    if _http_session is not None:
+        _http_session.close()
+    _http_session = HttpSession(**options)
+    return _http_session
+
+
+def get_http_session():
+    """Get the shared HTTP session, creating one with defaults if needed."""
+    if _http_session is None:
+        return configure_http_session()
+    return _http_session
+
+
+_direct_uploads_enabled = True
+
+
+def configure_direct_uploads(enabled):
+    """Turn direct-to-MinIO uploads of large binaries on or off (--no-direct-upload)."""
+    global _direct_uploads_enabled
+    _direct_uploads_enabled = enabled
+
+
 def get_conan_executable():
     """Get the path to conan executable (prefer venv version)."""
     # Try venv first
@@ -291,12 +378,60 @@ def check_package_exists(server_url, package_ref, package_id):
         # Try to access the specific binary download endpoint
         # This will return 200 if the binary exists, 404 if not
         check_url = f"{server_url}/packages/{package_name}/{version}/binaries/{package_id}/download/"
-        response = requests.head(check_url)  # Use HEAD to avoid downloading
+        response = get_http_session().head(check_url)  # Use HEAD to avoid downloading
         return response.status_code == 200
     except Exception:
         return False
 
 
+def check_packages_exist(server_url, packages):
+    """
+    Check which binary packages already exist on the server in one request.
+
+    Args:
+        server_url: ConanCrates server URL
+        packages: List of (package_ref, package_id) tuples
+
+    Returns:
+        Set of (package_ref, package_id) tuples that exist on the server,
+        or None if the server doesn't support the bulk check
+    """
+    payload = {'packages': []}
+    for package_ref, package_id in packages:
+        package_name, version = package_ref.split('/', 1)
+        payload['packages'].append({'name': package_name, 'version': version, 'package_id': package_id})
+
+    try:
+        response = get_http_session().post(f"{server_url}/api/package/exists", json=payload)
+        if response.status_code != 200:
+            return None
+        results = response.json()['packages']
+    except Exception:
+        return None
+
+    return {
+        (f"{result['name']}/{result['version']}", result['package_id'])
+        for result in results if result['exists']
+    }
+
+
+def blob_exists(server_url, sha256):
+    """
+    Check whether the server already stores content with this sha256.
+
+    Such content doesn't have to be uploaded again; sending its sha256 is
+    enough.
+
+    Returns:
+        True if the server has it, False otherwise (including older servers)
+    """
+    try:
+        response = get_http_session().get(f"{server_url}/api/blobs/{sha256}")
+        return response.status_code == 200 and response.json().get('exists', False)
+    except Exception:
+        return False
+
+
 def is_release_version(version):
     """
     Check if a version string is a release version (not RC, beta, etc.).
@@ -344,6 +479,101 @@ def extract_dependencies_from_graph(dependency_graph):
     return dependencies
 
 
+def file_sha256(path):
+    """SHA256 of a local file, read in chunks."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _upload_part(url, path, offset, length):
+    """
+    PUT one part of a file to a presigned MinIO URL.
+
+    Retried with exponential backoff (parts are idempotent).
+
+    Returns:
+        The part's ETag
+    """
+    session = get_http_session()
+    error = None
+    for attempt in range(session.retries + 1):
+        if attempt:
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+            response = session.put(url, data=data)
+            if response.status_code == 200:
+                return response.headers['ETag']
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except requests.RequestException as e:
+            error = str(e)
+    raise RuntimeError(f"Uploading part at offset {offset} failed: {error}")
+
+
+def upload_binary_direct(server_url, binary_path, package_name, version, package_id,
+                         part_uploads=DEFAULT_PART_UPLOADS, sha256=None):
+    """
+    Upload a binary straight to MinIO through an upload session.
+
+    The server hands out presigned URLs for the parts of an S3 multipart
+    upload; the parts are PUT to MinIO in parallel, so the binary never
+    passes through the ConanCrates server. The session still has to be
+    completed (see upload_package()).
+
+    Returns:
+        (session_id, parts) on success, or None if the server doesn't support
+        direct uploads or already stores the content (use the regular upload
+        instead)
+
+    Raises:
+        RuntimeError: If the upload failed (the session is aborted)
+    """
+    binary_path = Path(binary_path)
+    sessions_url = f"{server_url}/api/package/upload-sessions"
+    session = get_http_session()
+
+    response = session.post(sessions_url, json={
+        'package_name': package_name,
+        'version': version,
+        'package_id': package_id,
+        'size': binary_path.stat().st_size,
+        'sha256': sha256 or file_sha256(binary_path),
+    })
+    if response.status_code in (404, 501):
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"Could not start direct upload: HTTP {response.status_code}: {response.text[:200]}")
+
+    upload = response.json()
+    if upload.get('exists'):
+        return None
+    part_size = upload['part_size']
+    parts = upload['parts']
+    print(f"  Direct upload to storage: {len(parts)} part(s) of {part_size / (1024 * 1024):.0f} MB")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(part_uploads, len(parts)))) as pool:
+            futures = [
+                pool.submit(_upload_part, part['url'], binary_path,
+                            (part['part_number'] - 1) * part_size, part_size)
+                for part in parts
+            ]
+            etags = [future.result() for future in futures]
+    except Exception:
+        session.delete(f"{sessions_url}/{upload['session_id']}")
+        raise
+
+    return upload['session_id'], [
+        {'part_number': part['part_number'], 'etag': etag}
+        for part, etag in zip(parts, etags)
+    ]
+
+
 def upload_package(server_url, recipe_path, binary_path, package_ref, package_id=None, dependency_graph=None, rust_crate_path=None):
     """
     Upload package to ConanCrates server.
@@ -369,17 +599,30 @@ def upload_package(server_url, recipe_path, binary_path, package_ref, package_id
         # Get Conan version
         conan_version = get_conan_version()
 
+        # Content the server already stores (e.g. a CI re-upload) is not sent again
+        binary_sha256 = file_sha256(binary_path)
+        binary_known = blob_exists(server_url, binary_sha256)
+
+        # Large binaries go straight to MinIO; the server only verifies them
+        direct_upload = None
+        if (not binary_known and _direct_uploads_enabled and package_id
+                and Path(binary_path).stat().st_size >= DIRECT_UPLOAD_MIN_SIZE):
+            direct_upload = upload_binary_direct(server_url, binary_path, package_name, version, package_id,
+                                                 sha256=binary_sha256)
+
         file_handles = []
         try:
             # Open files
             recipe_file = open(recipe_path, 'rb')
-            binary_file = open(binary_path, 'rb')
-            file_handles.extend([recipe_file, binary_file])
+            file_handles.append(recipe_file)
 
             files = {
                 'recipe': ('conanfile.py', recipe_file, 'text/plain'),
-                'binary': (binary_path.name, binary_file, 'application/gzip')
             }
+            if not direct_upload and not binary_known:
+                binary_file = open(binary_path, 'rb')
+                file_handles.append(binary_file)
+                files['binary'] = (binary_path.name, binary_file, 'application/gzip')
 
             # Add rust crate if available
             if rust_crate_path and Path(rust_crate_path).exists():
@@ -390,16 +633,23 @@ def upload_package(server_url, recipe_path, binary_path, package_ref, package_id
             data = {
                 'package_name': package_name,
                 'version': version,
-                'conan_version': conan_version
+                'conan_version': conan_version,
+                'binary_sha256': binary_sha256
             }
+            if 'rust_crate' in files:
+                data['rust_crate_sha256'] = file_sha256(rust_crate_path)
             if package_id:
                 data['package_id'] = package_id
             if dependency_graph:
                 data['dependency_graph'] = json.dumps(dependency_graph)
+            if direct_upload:
+                session_id, parts = direct_upload
+                upload_url = f"{server_url}/api/package/upload-sessions/{session_id}/complete"
+                data['parts'] = json.dumps(parts)
 
             print(f"Uploading to {upload_url}...")
             print(f"  Recipe: {recipe_path}")
-            print(f"  Binary: {binary_path}")
+            print(f"  Binary: {binary_path}" + (" (already on server, not sent)" if binary_known else ""))
             if rust_crate_path:
                 print(f"  Rust Crate: {rust_crate_path}")
             print(f"  Conan version: {conan_version}")
@@ -409,7 +659,7 @@ def upload_package(server_url, recipe_path, binary_path, package_ref, package_id
                 dep_count = len(dependency_graph.get('graph', {}).get('nodes', {})) - 1  # -1 for root
                 print(f"  Dependencies: {dep_count} package(s) in graph")
 
-            response = requests.post(upload_url, files=files, data=data)
+            response = get_http_session().post(upload_url, files=files, data=data)
         finally:
             # Close all file handles
             for fh in file_handles:
@@ -539,7 +789,7 @@ def upload_single_package(server_url, package_ref, profile, package_id=None):
         else:
             print(f"  ✓ No dependencies", flush=True)
 
-    # Create tarball and rust crate
+    # Create tarball (the server builds the Rust crate from it)
     with tempfile.TemporaryDirectory() as tmpdir:
         print(f"  Creating binary tarball...", flush=True)
         tarball_path = Path(tmpdir) / f"{package_ref.replace('/', '-')}-{package_id}.tgz"
@@ -549,30 +799,9 @@ def upload_single_package(server_url, package_ref, profile, package_id=None):
         tarball_size_kb = tarball_path.stat().st_size / 1024
         print(f"  ✓ Binary tarball created ({tarball_size_kb:.1f} KB)", flush=True)
 
-        # Generate Rust crate
-        rust_crate_path = None
-        try:
-            print(f"  Generating Rust crate...", flush=True)
-            class RustArgs:
-                pass
-            rust_args = RustArgs()
-            rust_args.package_ref = package_ref
-            rust_args.profile = profile
-            rust_args.package_id = package_id  # Pass the package_id we already have
-            rust_args.output = tmpdir  # Use temp dir
-
-            rust_result = cmd_generate_rust_crate(rust_args)
-            if isinstance(rust_result, tuple):
-                exit_code, crate_path = rust_result
-                if exit_code == 0:
-                    rust_crate_path = crate_path
-                    print(f"  ✓ Rust crate generated", flush=True)
-        except Exception as e:
-            print(f"  ⚠ Warning: Rust crate generation failed: {e}", flush=True)
-
         # Upload
         print(f"  Uploading to server...", flush=True)
-        if upload_package(server_url, recipe_path, tarball_path, package_ref, package_id=package_id, dependency_graph=dependency_graph, rust_crate_path=rust_crate_path):
+        if upload_package(server_url, recipe_path, tarball_path, package_ref, package_id=package_id, dependency_graph=dependency_graph):
             print(f"  ✓ Upload completed successfully", flush=True)
             return 0
         else:
@@ -580,12 +809,122 @@ def upload_single_package(server_url, package_ref, profile, package_id=None):
             return 1
 
 
+class _ThreadStream:
+    """
+    Stream wrapper that sends writes from capturing threads to their own buffer.
+
+    Threads that are not capturing write straight through to the wrapped stream.
+    """
+
+    def __init__(self, stream, local):
+        self._stream = stream
+        self._local = local
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self._stream.write(text)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class CapturedOutput:
+    """
+    Collect the console output of worker threads per job.
+
+    While active, sys.stdout and sys.stderr are replaced so that anything a
+    worker prints inside capture() ends up in that job's buffer. The main
+    thread can then print each job's log as one uninterrupted block.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._saved = None
+
+    def __enter__(self):
+        self._saved = (sys.stdout, sys.stderr)
+        sys.stdout = _ThreadStream(sys.stdout, self._local)
+        sys.stderr = _ThreadStream(sys.stderr, self._local)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.stdout, sys.stderr = self._saved
+        return False
+
+    @contextmanager
+    def capture(self):
+        """Capture output of the current thread; yields the StringIO buffer"""
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+
+def upload_packages_parallel(server_url, packages, profile, jobs):
+    """
+    Upload packages with a pool of worker threads.
+
+    Each package runs the full upload_single_package() pipeline in a worker.
+    Its output is buffered and printed as one block, in the order of
+    `packages`, as soon as it and all packages before it have finished.
+
+    Args:
+        server_url: ConanCrates server URL
+        packages: List of (package_ref, package_id) tuples
+        profile: Conan profile name or path
+        jobs: Number of uploads to run at once
+
+    Returns:
+        List of (package_ref, package_id, result, seconds) in input order,
+        where result is 0 on success and 1 on failure
+    """
+    def run_job(output, pkg_ref, pkg_id):
+        start = time.monotonic()
+        with output.capture() as log:
+            try:
+                result = upload_single_package(server_url, pkg_ref, profile, package_id=pkg_id)
+            except Exception as e:
+                print(f"  ✗ Error: {e}")
+                result = 1
+        return result, log.getvalue(), time.monotonic() - start
+
+    results = []
+    total = len(packages)
+    with CapturedOutput() as output:
+        pool = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            futures = [pool.submit(run_job, output, pkg_ref, pkg_id) for pkg_ref, pkg_id in packages]
+            for idx, ((pkg_ref, pkg_id), future) in enumerate(zip(packages, futures), 1):
+                result, log, seconds = future.result()
+                print(f"\n📦 [{idx}/{total}] {pkg_ref} ({pkg_id[:8]}...)", flush=True)
+                sys.stdout.write(log)
+                if result == 0:
+                    print(f"  ✓ Done in {seconds:.1f}s", flush=True)
+                else:
+                    print(f"  ✗ Failed after {seconds:.1f}s", flush=True)
+                results.append((pkg_ref, pkg_id, result, seconds))
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+    return results
+
+
 def cmd_upload(args):
     """Handle the 'upload' command."""
     package_ref = args.package_ref
     server_url = args.server or "http://localhost:8000"
     profile = args.profile
     with_deps = args.with_dependencies if hasattr(args, 'with_dependencies') else False
+    jobs = max(1, getattr(args, 'jobs', 1) or 1)
 
     print(f"ConanCrates Upload")
     print(f"{'='*60}")
@@ -593,6 +932,8 @@ def cmd_upload(args):
     print(f"Profile: {profile}")
     print(f"Server: {server_url}")
     print(f"Upload dependencies: {with_deps}")
+    if jobs > 1:
+        print(f"Parallel jobs: {jobs}")
     print(f"{'='*60}")
 
     # Step 1: Get package cache path (recipe)
@@ -655,14 +996,25 @@ def cmd_upload(args):
     existing_packages = []
     missing_packages = []
 
-    for pkg_ref, pkg_id in packages_to_upload:
-        print(f"  Checking {pkg_ref} ({pkg_id[:8]}...)...", end=' ')
-        if check_package_exists(server_url, pkg_ref, pkg_id):
-            print("EXISTS")
-            existing_packages.append((pkg_ref, pkg_id))
-        else:
-            print("NOT FOUND")
-            missing_packages.append((pkg_ref, pkg_id))
+    on_server = check_packages_exist(server_url, packages_to_upload)
+    if on_server is not None:
+        for pkg_ref, pkg_id in packages_to_upload:
+            if (pkg_ref, pkg_id) in on_server:
+                existing_packages.append((pkg_ref, pkg_id))
+            else:
+                missing_packages.append((pkg_ref, pkg_id))
+        print(f"  Checked {len(packages_to_upload)} binaries: "
+              f"{len(existing_packages)} on server, {len(missing_packages)} missing")
+    else:
+        # Older servers without the bulk check - ask about each binary
+        for pkg_ref, pkg_id in packages_to_upload:
+            print(f"  Checking {pkg_ref} ({pkg_id[:8]}...)...", end=' ')
+            if check_package_exists(server_url, pkg_ref, pkg_id):
+                print("EXISTS")
+                existing_packages.append((pkg_ref, pkg_id))
+            else:
+                print("NOT FOUND")
+                missing_packages.append((pkg_ref, pkg_id))
 
     # Step 6: Show upload plan and ask for confirmation
     print(f"\n{'='*60}")
@@ -702,18 +1054,28 @@ def cmd_upload(args):
     uploaded_count = 0
     failed_packages = []
     total_to_upload = len(missing_packages)
+    upload_start = time.monotonic()
+
+    if jobs > 1 and total_to_upload > 1:
+        print(f"Running up to {min(jobs, total_to_upload)} uploads at a time...", flush=True)
+        results = upload_packages_parallel(server_url, missing_packages, profile, jobs)
+        for pkg_ref, pkg_id, result, seconds in results:
+            if result == 0:
+                uploaded_count += 1
+            else:
+                failed_packages.append((pkg_ref, pkg_id))
+    else:
+        for idx, (pkg_ref, pkg_id) in enumerate(missing_packages, 1):
+            print(f"\n📦 [{idx}/{total_to_upload}] Uploading {pkg_ref} ({pkg_id[:8]}...)...", flush=True)
 
-    for idx, (pkg_ref, pkg_id) in enumerate(missing_packages, 1):
-        print(f"\n📦 [{idx}/{total_to_upload}] Uploading {pkg_ref} ({pkg_id[:8]}...)...", flush=True)
-
-        result = upload_single_package(server_url, pkg_ref, profile, package_id=pkg_id)
+            result = upload_single_package(server_url, pkg_ref, profile, package_id=pkg_id)
 
-        if result == 0:
-            uploaded_count += 1
-            print(f"  ✓ Success! ({uploaded_count}/{total_to_upload} completed)")
-        else:
-            failed_packages.append((pkg_ref, pkg_id))
-            print(f"  ✗ Failed!")
+            if result == 0:
+                uploaded_count += 1
+                print(f"  ✓ Success! ({uploaded_count}/{total_to_upload} completed)")
+            else:
+                failed_packages.append((pkg_ref, pkg_id))
+                print(f"  ✗ Failed!")
 
     # Step 8: Summary
     print(f"\n{'='*60}")
@@ -723,6 +1085,7 @@ def cmd_upload(args):
     print(f"  Already existed: {len(existing_packages)}")
     print(f"  Uploaded: {uploaded_count}")
     print(f"  Failed: {len(failed_packages)}")
+    print(f"  Upload time: {time.monotonic() - upload_start:.1f}s")
 
     if failed_packages:
         print(f"\n✗ Failed packages:")
@@ -871,7 +1234,7 @@ def cmd_download_rust_crates(args):
     # Query the API with profile settings
     query_url = f"{server_url}/api/packages/{package_name}/{version}/rust-crate"
     try:
-        response = requests.get(query_url, params=profile_settings)
+        response = get_http_session().get(query_url, params=profile_settings)
         if response.status_code == 404:
             print(f"Error: No binary found matching profile '{args.profile}'")
             print(f"\nProfile settings:")
@@ -905,7 +1268,7 @@ def cmd_download_rust_crates(args):
     info_url = f"{server_url}/api/packages/{package_name}/{version}/binaries/{package_id}/info"
     
     try:
-        response = requests.get(info_url)
+        response = get_http_session().get(info_url)
         response.raise_for_status()
         package_info = response.json()
     except Exception as e:
@@ -922,7 +1285,7 @@ def cmd_download_rust_crates(args):
     crate_url = f"{server_url}/packages/{package_name}/{version}/binaries/{package_id}/rust-crate/"
     
     try:
-        response = requests.get(crate_url)
+        response = get_http_session().get(crate_url)
         if response.status_code == 404:
             print(f"  Error: Rust crate not available")
             return 1
@@ -950,7 +1313,7 @@ def cmd_download_rust_crates(args):
             dep_url = f"{server_url}/packages/{dep_name}/{dep_version}/binaries/{dep_package_id}/rust-crate/"
             
             try:
-                response = requests.get(dep_url)
+                response = get_http_session().get(dep_url)
                 if response.status_code == 404:
                     print(f"  Warning: {dep_crate_name} not available")
                     continue
@@ -1066,7 +1429,7 @@ def cmd_download(args):
     bundle_url = f"{server_url}/packages/{package_name}/{version}/bundle/?os={os_name}&arch={arch}&compiler={compiler}&compiler_version={compiler_version}&build_type={build_type}"
 
     try:
-        response = requests.get(bundle_url, stream=True)
+        response = get_http_session().get(bundle_url, stream=True)
         if response.status_code != 200:
             print(f"\nError: No binaries found matching your profile settings")
             print(f"  Requested: {os_name}/{arch}/{compiler} {compiler_version}/{build_type}")
@@ -1076,7 +1439,7 @@ def cmd_download(args):
             print(f"\nFetching available binaries for {package_name}/{version}...")
             try:
                 binaries_url = f"{server_url}/packages/{package_name}/{version}/binaries/"
-                binaries_response = requests.get(binaries_url)
+                binaries_response = get_http_session().get(binaries_url)
 
                 if binaries_response.status_code == 200:
                     binaries_data = binaries_response.json()
@@ -1600,6 +1963,23 @@ def main():
         default='http://localhost:8000',
         help='ConanCrates server URL (default: http://localhost:8000)'
     )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help=f'Seconds to wait for the server to respond (default: {DEFAULT_READ_TIMEOUT})'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f'Retries for failed downloads and lookups, with exponential backoff (default: {DEFAULT_RETRIES})'
+    )
+    parser.add_argument(
+        '--no-compression',
+        action='store_true',
+        help='Do not ask the server for compressed (gzip) responses'
+    )
 
     subparsers = parser.add_subparsers(dest='command', help='Commands')
 
@@ -1619,10 +1999,22 @@ def main():
         action='store_true',
         help='Also upload all dependencies (will check server and ask for confirmation)'
     )
+    upload_parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of packages to upload in parallel (default: 1)'
+    )
+    upload_parser.add_argument(
+        '--no-direct-upload',
+        action='store_true',
+        help=f'Send binaries through the server even if they are over '
+             f'{DIRECT_UPLOAD_MIN_SIZE // (1024 * 1024)} MB (default: upload those straight to MinIO)'
+    )
     upload_parser.add_argument(
         '--no-rust',
         action='store_true',
-        help='Skip Rust crate generation (by default, a Rust crate is generated)'
+        help='No effect, kept for compatibility: the server builds Rust crates from uploaded binaries'
     )
 
     # Download command
@@ -1669,7 +2061,16 @@ def main():
 
     args = parser.parse_args()
 
+    # One pooled connection per parallel upload, so workers don't wait on each other
+    configure_http_session(
+        timeout=(DEFAULT_CONNECT_TIMEOUT, args.timeout),
+        retries=args.retries,
+        compression=not args.no_compression,
+        pool_size=max(DEFAULT_POOL_SIZE, getattr(args, 'jobs', 1) or 1),
+    )
+
     if args.command == 'upload':
+        configure_direct_uploads(not args.no_direct_upload)
         return cmd_upload(args)
     elif args.command == 'download':
         return cmd_download(args)
@@ -74,6 +74,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'conancrates.wsgi.application'
 
+# Used by ASGI servers (uvicorn, daphne). Downloads are streamed from the
+# event loop there, so slow clients don't tie up a worker each.
+ASGI_APPLICATION = 'conancrates.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -155,6 +159,89 @@ STORAGES = {
     },
 }
 
+# Bundle downloads
+# Read buffer size used when streaming stored binaries into bundle ZIPs
+BUNDLE_STREAM_CHUNK_SIZE = 64 * 1024
+# Default ZIP compression policy: 'auto' stores already-compressed members
+# (.tar.gz, .crate) and deflates the rest; 'store' and 'deflate' apply to all.
+# Clients can override per request with ?compression=<policy>
+BUNDLE_COMPRESSION_POLICY = 'auto'
+
+# Bundle cache: finished bundle ZIPs are stored in MinIO under bundle_cache/,
+# keyed by the exact set of binaries they contain (LRU eviction past MAX_SIZE)
+BUNDLE_CACHE_ENABLED = True
+BUNDLE_CACHE_MAX_SIZE = 10 * 1024 ** 3  # 10 GB total
+BUNDLE_CACHE_MAX_ENTRY_SIZE = 2 * 1024 ** 3  # Larger bundles are never cached
+
+# How stored files (binaries, Rust crates, cached bundles) are delivered:
+# 'proxy' streams them through Django, 'redirect' answers with a 302 to a
+# presigned MinIO URL (requires AWS_QUERYSTRING_AUTH)
+DOWNLOAD_DELIVERY_MODE = 'proxy'
+
+# Download counters: 'immediate' does an atomic F() increment per download,
+# 'buffered' appends to PendingDownload and needs the flush_download_counts
+# management command (cron or --loop) to apply counts in batches
+DOWNLOAD_COUNT_MODE = 'immediate'
+
+# Cache-Control for binary and crate downloads that have a sha256 ETag
+# (conditional requests still revalidate with If-None-Match)
+DOWNLOAD_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Build the extracted-format ZIP (include/lib/bin/cmake) of each binary after
+# upload (JOB_QUEUE_MODE = 'queued' only). Binaries without one are built on
+# their first extracted download.
+EXTRACTED_PRECOMPUTE_ON_UPLOAD = True
+
+# Build the Rust -sys crate of each binary after upload, unless the client
+# uploaded one (JOB_QUEUE_MODE = 'queued' only). Binaries without one are built
+# on their first crate download.
+RUST_CRATE_GENERATE_ON_UPLOAD = True
+
+# Build the package Conan clients download from the /v2 remote (conaninfo.txt,
+# conanmanifest.txt, conan_package.tgz) after upload (JOB_QUEUE_MODE = 'queued'
+# only). Binaries without one are built on the first request for them.
+CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD = True
+
+# Seconds a Conan package build may hold its claim. Other requests for the same
+# package wait for the build meanwhile; a claim older than this (its builder
+# died) is taken over.
+CONAN_PACKAGE_BUILD_TIMEOUT = 600
+
+# Largest page the Conan remote's recipe search returns (?page=&page_size=)
+CONAN_SEARCH_MAX_PAGE_SIZE = 1000
+
+# Number of dependency tarballs fetched and decompressed in parallel while an
+# extracted bundle is streamed (also caps how many wait on scratch disk)
+EXTRACTED_BUNDLE_WORKERS = 4
+
+# Direct uploads: the CLI uploads large binaries straight to MinIO as S3
+# multipart uploads with presigned part URLs (AWS_S3_ENDPOINT_URL must be
+# reachable by clients). Sessions not finalized in time expire.
+UPLOAD_PART_SIZE = 16 * 1024 * 1024  # 16 MB (S3 minimum is 5 MB)
+UPLOAD_SESSION_EXPIRY = 6 * 3600  # seconds
+
+# Deleted packages, binaries and cached bundles only queue their MinIO objects;
+# the drain_storage_deletions command (cron or --loop) deletes them in batches.
+# Objects that keep failing stay queued after this many attempts
+STORAGE_DELETION_MAX_ATTEMPTS = 5
+
+# collect_storage_garbage never deletes objects (or unreferenced blobs)
+# younger than this, so uploads still being recorded are safe
+STORAGE_GC_GRACE_PERIOD = 24 * 3600  # seconds
+
+# Work derived from uploads (extracted artifacts, Rust crates, Conan packages,
+# dependency indexing, bundle prewarming): 'immediate' only indexes dependencies
+# in the upload request and builds the rest on first download, 'queued' stores
+# Job rows and needs the run_workers management command (--loop --workers N)
+JOB_QUEUE_MODE = 'immediate'
+JOB_MAX_ATTEMPTS = 5
+JOB_VISIBILITY_TIMEOUT = 30 * 60  # seconds before a claimed job is retried
+JOB_RETRY_DELAY = 60  # seconds after the first failure, doubled per attempt
+
+# Build the bundle of each uploaded binary (for its own platform) into the
+# bundle cache (JOB_QUEUE_MODE = 'queued' only)
+BUNDLE_PREWARM_ON_UPLOAD = False
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
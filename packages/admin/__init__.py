@@ -6,6 +6,9 @@ from .package_version_admin import PackageVersionAdmin
 from .binary_package_admin import BinaryPackageAdmin
 from .dependency_admin import DependencyAdmin
 from .topic_admin import TopicAdmin
+from .bundle_cache_admin import BundleCacheEntryAdmin
+from .upload_session_admin import UploadSessionAdmin
+from .stored_blob_admin import StoredBlobAdmin
 
 __all__ = [
     'PackageAdmin',
@@ -13,4 +16,7 @@ __all__ = [
     'BinaryPackageAdmin',
     'DependencyAdmin',
     'TopicAdmin',
+    'BundleCacheEntryAdmin',
+    'UploadSessionAdmin',
+    'StoredBlobAdmin',
 ]
@@ -1,5 +1,18 @@
 from django.contrib import admin
-from packages.models import BinaryPackage
+from packages.models import BinaryPackage, BinaryDependency
+
+
+class BinaryDependencyInline(admin.TabularInline):
+    """Read-only display of the indexed dependency graph"""
+    model = BinaryDependency
+    fk_name = 'binary'
+    extra = 0
+    fields = ['name', 'version', 'package_id', 'dependency_binary']
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(BinaryPackage)
@@ -8,7 +21,9 @@ class BinaryPackageAdmin(admin.ModelAdmin):
                     'build_type', 'file_size_mb', 'download_count', 'created_at']
     list_filter = ['os', 'arch', 'compiler', 'build_type', 'created_at']
     search_fields = ['package_version__package__name', 'package_id']
-    readonly_fields = ['created_at', 'download_count', 'file_size']
+    readonly_fields = ['created_at', 'download_count', 'file_size',
+                       'extracted_file', 'extracted_size', 'extracted_source_sha256']
+    inlines = [BinaryDependencyInline]
 
     fieldsets = [
         ('Package Information', {
@@ -20,6 +35,10 @@ class BinaryPackageAdmin(admin.ModelAdmin):
         ('Binary File', {
             'fields': ['binary_file', 'file_size', 'sha256']
         }),
+        ('Extracted Artifact', {
+            'fields': ['extracted_file', 'extracted_size', 'extracted_source_sha256'],
+            'classes': ['collapse']
+        }),
         ('Statistics', {
             'fields': ['download_count', 'created_at'],
             'classes': ['collapse']
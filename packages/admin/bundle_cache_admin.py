@@ -0,0 +1,17 @@
+from django.contrib import admin
+from packages.models import BundleCacheEntry
+
+
+@admin.register(BundleCacheEntry)
+class BundleCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['cache_key_short', 'size_mb', 'hit_count', 'last_accessed', 'created_at']
+    search_fields = ['cache_key']
+    readonly_fields = ['cache_key', 'bundle_file', 'size', 'hit_count', 'last_accessed', 'created_at']
+
+    def cache_key_short(self, obj):
+        return obj.cache_key[:12]
+    cache_key_short.short_description = 'Cache Key'
+
+    def size_mb(self, obj):
+        return f"{obj.size / (1024 * 1024):.2f} MB"
+    size_mb.short_description = 'Size'
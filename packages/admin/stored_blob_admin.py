@@ -0,0 +1,18 @@
+from django.contrib import admin
+from packages.models import StoredBlob
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256_short', 'size_mb', 'ref_count', 'created_at', 'updated_at']
+    list_filter = ['created_at']
+    search_fields = ['sha256', 'file']
+    readonly_fields = ['sha256', 'file', 'size', 'ref_count', 'created_at', 'updated_at']
+
+    def sha256_short(self, obj):
+        return obj.sha256[:12]
+    sha256_short.short_description = 'SHA256'
+
+    def size_mb(self, obj):
+        return f"{obj.size / (1024 * 1024):.2f} MB"
+    size_mb.short_description = 'Size'
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from packages.models import UploadSession
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['package_name', 'version', 'package_id_short', 'size_mb', 'status', 'created_at', 'expires_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['package_name', 'package_id']
+    readonly_fields = ['id', 'package_name', 'version', 'package_id', 'size', 'sha256', 'binary_file',
+                       'multipart_upload_id', 'part_size', 'status', 'created_at', 'expires_at']
+
+    def package_id_short(self, obj):
+        return obj.package_id[:12]
+    package_id_short.short_description = 'Package ID'
+
+    def size_mb(self, obj):
+        return f"{obj.size / (1024 * 1024):.2f} MB"
+    size_mb.short_description = 'Size'
@@ -0,0 +1,116 @@
+"""
+Async response bodies for ASGI deployments
+
+Under ASGI, Django can only stream a StreamingHttpResponse chunk by chunk if
+its content is an async iterator - a sync iterator is first read completely
+into memory. The helpers here turn the chunked storage reads and ZIP
+generators used by the download views into async iterators when the request
+came in through ASGI, so a transfer holds no worker thread between chunks.
+
+Each chunk is produced in a worker thread and handed to the server, and the
+next one is only read once the server has accepted the previous one, so a
+slow client throttles its own storage reads (backpressure) and memory per
+download stays at about one chunk.
+
+Generators should get the rows they need loaded before streaming starts
+(select_related). Database connections a step still opens in a worker
+thread (e.g. storing a finished bundle in the cache) are closed after the
+step: executor threads never see request_finished, so nothing else would.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+
+_EXHAUSTED = object()
+
+
+def is_async_request(request):
+    """Check whether a request is being served by the ASGI handler"""
+    return isinstance(request, ASGIRequest)
+
+
+def _close_thread_connections():
+    """Close the database connections the current (worker) thread opened"""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def _next_chunk(iterator):
+    try:
+        return next(iterator, _EXHAUSTED)
+    finally:
+        _close_thread_connections()
+
+
+def _close_iterator(close):
+    try:
+        close()
+    finally:
+        _close_thread_connections()
+
+
+async def aiter_chunks(chunks):
+    """
+    Drive a sync chunk iterator (e.g. a ZipStream generator) from the event loop.
+
+    Each next() runs in a worker thread, so compression and storage reads
+    never block the loop. The iterator is closed if the client disconnects.
+    """
+    iterator = iter(chunks)
+    next_chunk = sync_to_async(_next_chunk, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await next_chunk(iterator)
+            if chunk is _EXHAUSTED:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(_close_iterator, thread_sensitive=False)(close)
+
+
+async def aiter_file(fileobj, chunk_size):
+    """Read a file object (e.g. an S3 response body) in chunks from the event loop"""
+    read = sync_to_async(fileobj.read, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await sync_to_async(fileobj.close, thread_sensitive=False)()
+
+
+def stream_content(request, chunks):
+    """
+    Response content for a chunk iterator: async under ASGI, unchanged under WSGI.
+
+    Args:
+        request: Current request (None is treated as WSGI)
+        chunks: Sync iterable of bytes
+    """
+    if is_async_request(request):
+        return aiter_chunks(chunks)
+    return chunks
+
+
+def async_file_response(fileobj, filename, content_type, chunk_size, status=200):
+    """
+    Async counterpart of FileResponse(fileobj, as_attachment=True, filename=...).
+
+    FileResponse only streams sync file objects, so ASGI requests get a
+    StreamingHttpResponse over aiter_file() with the same headers.
+    """
+    response = StreamingHttpResponse(
+        aiter_file(fileobj, chunk_size),
+        status=status,
+        content_type=content_type
+    )
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
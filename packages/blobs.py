@@ -0,0 +1,185 @@
+"""
+Content-addressed storage for binaries, Rust crates and Conan packages
+
+Uploaded binaries and crates are stored once per distinct content, under
+blobs/<sha256[:2]>/<sha256><suffix>, and tracked by a StoredBlob row. The
+BinaryPackage file fields simply point at the blob's object; StoredBlob
+ref_count says how many of them do.
+
+- An upload of content that is already stored is never written to storage
+  again (and with binary_sha256 the client doesn't even send it).
+- Deleting or replacing a BinaryPackage only releases its references.
+  Unreferenced blobs are left in storage - a re-upload of the same content
+  revives them for free - until they are garbage collected. Reclaiming them
+  lazily also means an upload that just found a blob can't race with its
+  deletion.
+
+Files stored before content addressing (binaries/, rust_crates/) keep
+working and are queued for deletion when released.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from packages.models import StoredBlob
+from packages.ingest import ingest_upload, inspect_upload, scan_stored, IngestResult
+from packages.storage_cleanup import schedule_deletion
+
+
+BINARY_SUFFIX = '.tar.gz'
+CRATE_SUFFIX = '.crate'
+CONAN_PACKAGE_SUFFIX = '.tgz'
+
+
+class ChecksumMismatch(Exception):
+    """Uploaded content does not match the sha256 the client announced"""
+    pass
+
+
+def blob_field():
+    """The FileField blobs are stored through (storage and upload_to)"""
+    return StoredBlob._meta.get_field('file')
+
+
+def blob_filename(sha256, suffix):
+    """Path of a blob below the blobs/ prefix"""
+    return f"{sha256[:2]}/{sha256}{suffix}"
+
+
+def blob_name(sha256, suffix):
+    """Full object name a blob is stored under"""
+    return blob_field().generate_filename(None, blob_filename(sha256, suffix))
+
+
+def is_blob_name(name):
+    """Check whether a stored file name is a content-addressed blob"""
+    return bool(name) and name.startswith(blob_field().upload_to)
+
+
+def find_blob(sha256):
+    """StoredBlob holding content with this sha256, or None"""
+    if not sha256:
+        return None
+    return StoredBlob.objects.filter(pk=sha256.lower()).first()
+
+
+def discard_upload(name):
+    """
+    Delete an object written for an upload that won't be referenced.
+
+    Objects that a StoredBlob already points at are left alone.
+    """
+    if StoredBlob.objects.filter(file=name).exists():
+        return
+    try:
+        blob_field().storage.delete(name)
+    except Exception as e:
+        print(f"Warning: Could not delete unused upload {name}: {e}")
+
+
+def store_upload(uploaded_file, suffix, sha256=None, scan=True):
+    """
+    Store an uploaded file as a blob, unless its content is already stored.
+
+    With the sha256 announced by the client, new content is hashed, scanned
+    and stored in a single pass straight under its blob name. Otherwise (or
+    if the content is already known) the request's local copy is hashed
+    first and only new content is written to storage.
+
+    No reference is taken here; pass the result to acquire_blob().
+
+    Args:
+        uploaded_file: UploadedFile from request.FILES
+        suffix: BINARY_SUFFIX, CRATE_SUFFIX or CONAN_PACKAGE_SUFFIX
+        sha256: sha256 announced by the client (optional)
+        scan: Look for conaninfo.txt on the way (Conan binaries only)
+
+    Returns:
+        IngestResult - name is the object holding the content
+
+    Raises:
+        ChecksumMismatch: If the upload doesn't match the announced sha256
+    """
+    sha256 = sha256.lower() if sha256 else None
+
+    if sha256 and find_blob(sha256) is None:
+        ingested = ingest_upload(uploaded_file, blob_field(), blob_filename(sha256, suffix), scan)
+        if ingested.sha256 != sha256:
+            discard_upload(ingested.name)
+            raise ChecksumMismatch(f'Uploaded file has sha256 {ingested.sha256}, expected {sha256}')
+        return ingested
+
+    ingested = inspect_upload(uploaded_file, scan)
+    if sha256 and ingested.sha256 != sha256:
+        raise ChecksumMismatch(f'Uploaded file has sha256 {ingested.sha256}, expected {sha256}')
+
+    blob = find_blob(ingested.sha256)
+    if blob is not None:
+        ingested.name = blob.file.name
+    else:
+        ingested.name = ingest_upload(
+            uploaded_file, blob_field(), blob_filename(ingested.sha256, suffix), scan=False
+        ).name
+    return ingested
+
+
+def reuse_blob(blob, scan=True):
+    """
+    IngestResult for content that is already stored, without any upload.
+
+    Only the start of the object is read, to find conaninfo.txt.
+    """
+    return IngestResult(
+        name=blob.file.name,
+        sha256=blob.sha256,
+        size=blob.size,
+        conaninfo=scan_stored(blob.file) if scan else None
+    )
+
+
+def acquire_blob(ingested):
+    """
+    Take a reference on the blob holding ingested content.
+
+    Creates the StoredBlob row for new content. If the same content was
+    stored concurrently under another name, the first one wins and the
+    duplicate object is deleted.
+
+    Returns:
+        Object name to assign to the BinaryPackage file field
+    """
+    with transaction.atomic():
+        blob, created = StoredBlob.objects.select_for_update().get_or_create(
+            sha256=ingested.sha256,
+            defaults={'file': ingested.name, 'size': ingested.size, 'ref_count': 1}
+        )
+        if not created:
+            StoredBlob.objects.filter(pk=blob.pk).update(
+                ref_count=F('ref_count') + 1,
+                updated_at=timezone.now()
+            )
+
+    if blob.file.name != ingested.name:
+        discard_upload(ingested.name)
+    return blob.file.name
+
+
+def release_file(field_file):
+    """
+    Drop a BinaryPackage file field's claim on its stored object.
+
+    Blobs lose one reference and stay in storage (see module docstring);
+    files from before content addressing are queued for deletion.
+
+    Args:
+        field_file: FieldFile (or any object with name and storage)
+    """
+    name = field_file.name
+    if not name:
+        return
+    if is_blob_name(name):
+        StoredBlob.objects.filter(file=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1,
+            updated_at=timezone.now()
+        )
+    else:
+        schedule_deletion(name)
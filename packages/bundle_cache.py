@@ -0,0 +1,180 @@
+"""
+Content-addressed cache for generated bundle ZIPs
+
+Bundles are keyed by the exact set of binaries they contain, taken from the
+stored dependency graph as (package, version, package_id, sha256). Two
+requests that resolve to the same binaries share one object in MinIO, so a
+repeat download is a single storage read (or a presigned redirect) instead of
+N storage reads plus compression.
+
+The cache is bounded by BUNDLE_CACHE_MAX_SIZE; least recently used entries
+are evicted once a new bundle pushes the total over the limit.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from packages.models import BundleCacheEntry
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 10 * 1024 ** 3  # 10 GB
+DEFAULT_MAX_ENTRY_SIZE = 2 * 1024 ** 3  # 2 GB
+
+
+def is_enabled():
+    return getattr(settings, 'BUNDLE_CACHE_ENABLED', True)
+
+
+def get_max_size():
+    return getattr(settings, 'BUNDLE_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def get_max_entry_size():
+    return getattr(settings, 'BUNDLE_CACHE_MAX_ENTRY_SIZE', DEFAULT_MAX_ENTRY_SIZE)
+
+
+def compute_cache_key(kind, members, **options):
+    """
+    Compute the cache key for a bundle.
+
+    Args:
+        kind: Bundle type (e.g. 'conan', 'rust') so different formats never collide
+        members: Iterable of (package, version, package_id, sha256[, recipe_revision])
+                 tuples - include the recipe revision when the bundle contains
+                 the recipe. Use an empty sha256 for dependencies missing from
+                 the registry.
+        **options: Anything else that changes the archive bytes (compression policy, ...)
+
+    Returns:
+        Hex SHA256 digest
+    """
+    payload = {
+        'kind': kind,
+        'members': sorted(list(member) for member in members),
+        'options': options,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_cached_bundle(cache_key):
+    """
+    Look up a cached bundle and mark it as recently used.
+
+    Returns:
+        BundleCacheEntry, or None on a cache miss
+    """
+    if not is_enabled():
+        return None
+
+    entry = BundleCacheEntry.objects.filter(cache_key=cache_key).first()
+    if entry is None:
+        return None
+
+    BundleCacheEntry.objects.filter(pk=entry.pk).update(
+        last_accessed=timezone.now(),
+        hit_count=F('hit_count') + 1
+    )
+    return entry
+
+
+def store_bundle(cache_key, fileobj, size):
+    """
+    Upload a finished bundle to the cache.
+
+    Args:
+        cache_key: Key from compute_cache_key()
+        fileobj: Readable file positioned at the start of the ZIP
+        size: ZIP size in bytes
+
+    Returns:
+        The new BundleCacheEntry, or None if another request stored it first
+    """
+    entry = BundleCacheEntry(cache_key=cache_key, size=size)
+    entry.bundle_file.save(f'{cache_key}.zip', File(fileobj), save=False)
+
+    try:
+        with transaction.atomic():
+            entry.save()
+    except IntegrityError:
+        # A concurrent request cached the same bundle - drop our copy
+        entry.bundle_file.delete(save=False)
+        return None
+
+    evict_bundles()
+    return entry
+
+
+def evict_bundles(max_size=None):
+    """
+    Delete least recently used bundles until the cache fits in max_size bytes.
+
+    Returns:
+        Number of entries evicted
+    """
+    if max_size is None:
+        max_size = get_max_size()
+
+    total = BundleCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    evicted = 0
+
+    for entry in BundleCacheEntry.objects.order_by('last_accessed').iterator():
+        if total <= max_size:
+            break
+        total -= entry.size
+        # pre_delete signal removes the stored ZIP
+        entry.delete()
+        evicted += 1
+
+    return evicted
+
+
+def cache_while_streaming(cache_key, chunks):
+    """
+    Pass bundle chunks through to the client while spooling a copy for the cache.
+
+    The copy is only stored if the whole stream was produced (the client did not
+    disconnect) and it stayed under BUNDLE_CACHE_MAX_ENTRY_SIZE.
+
+    Args:
+        cache_key: Key from compute_cache_key()
+        chunks: Iterable of ZIP bytes (e.g. a ZipStream generator)
+
+    Yields:
+        The same chunks, unchanged
+    """
+    if not is_enabled():
+        yield from chunks
+        return
+
+    max_entry_size = get_max_entry_size()
+    spool = tempfile.TemporaryFile()
+    size = 0
+
+    try:
+        for chunk in chunks:
+            if spool is not None:
+                size += len(chunk)
+                if size > max_entry_size:
+                    # Too big to be worth caching - stop copying
+                    spool.close()
+                    spool = None
+                else:
+                    spool.write(chunk)
+            yield chunk
+
+        if spool is not None:
+            spool.seek(0)
+            try:
+                store_bundle(cache_key, spool, size)
+            except Exception as e:
+                logger.warning(f"Could not cache bundle {cache_key[:12]}: {e}")
+    finally:
+        if spool is not None:
+            spool.close()
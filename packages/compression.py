@@ -0,0 +1,89 @@
+"""
+Compression policy for ZIP downloads
+
+Conan binaries (.tar.gz) and Rust crates (.crate) are already gzip-compressed,
+so deflating them again costs a full CPU core for ~0% size gain. The policy
+decides per archive member whether to store or deflate it.
+
+Policies:
+- auto: store already-compressed members, deflate everything else (default)
+- store: store every member (cheapest, largest archives)
+- deflate: deflate every member (previous behaviour)
+"""
+import zipfile
+from django.conf import settings
+
+
+COMPRESSION_POLICIES = ('auto', 'store', 'deflate')
+
+DEFAULT_COMPRESSION_POLICY = 'auto'
+
+# File extensions whose content is already compressed
+COMPRESSED_EXTENSIONS = (
+    '.tar.gz', '.tgz', '.gz', '.crate', '.zip', '.bz2', '.tbz2',
+    '.xz', '.txz', '.zst', '.7z', '.jar', '.whl',
+)
+
+# Leading bytes of common compressed formats
+COMPRESSED_MAGIC = (
+    b'\x1f\x8b',                # gzip (.tar.gz, .tgz, .crate)
+    b'PK\x03\x04',              # zip
+    b'BZh',                     # bzip2
+    b'\xfd7zXZ\x00',            # xz
+    b'\x28\xb5\x2f\xfd',        # zstd
+    b'7z\xbc\xaf\x27\x1c',      # 7z
+)
+
+# Number of leading bytes needed to recognise any format above
+MAGIC_SIZE = 8
+
+
+def get_default_compression_policy():
+    """Compression policy configured by the BUNDLE_COMPRESSION_POLICY setting"""
+    return getattr(settings, 'BUNDLE_COMPRESSION_POLICY', DEFAULT_COMPRESSION_POLICY)
+
+
+def get_compression_policy(request):
+    """
+    Get the compression policy for a download request.
+
+    Reads the 'compression' query parameter, falling back to the
+    BUNDLE_COMPRESSION_POLICY setting for missing or unknown values.
+    """
+    default = get_default_compression_policy()
+    policy = request.GET.get('compression', default)
+    if policy not in COMPRESSION_POLICIES:
+        return default
+    return policy
+
+
+def is_compressed(arcname, header=b''):
+    """
+    Check whether a member is already compressed.
+
+    Args:
+        arcname: Member name (used for the extension check)
+        header: First bytes of the member content, if available
+
+    Returns:
+        True if the content is a known compressed format
+    """
+    if arcname.lower().endswith(COMPRESSED_EXTENSIONS):
+        return True
+    return any(header.startswith(magic) for magic in COMPRESSED_MAGIC)
+
+
+def compress_type_for(policy, arcname, header=b''):
+    """
+    Pick the ZIP compression method for one archive member.
+
+    Returns:
+        zipfile.ZIP_STORED or zipfile.ZIP_DEFLATED
+    """
+    if policy == 'store':
+        return zipfile.ZIP_STORED
+    if policy == 'deflate':
+        return zipfile.ZIP_DEFLATED
+    if is_compressed(arcname, header):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
@@ -0,0 +1,318 @@
+"""
+Conan v2 remote layout
+
+The Conan client downloads a recipe revision as conanfile.py +
+conanmanifest.txt, and a package revision as conaninfo.txt +
+conanmanifest.txt + conan_package.tgz (the package folder without those two
+files). Revisions are the hash of the manifest, the way Conan computes them,
+so the client can verify what it downloads.
+
+Recipe revisions are computed from PackageVersion.recipe_content. Package
+revisions are derived from the stored binary tarball, which is either a
+`conan cache save` archive (the package folder is b/<folder>/p/) or a plain
+package folder. The tarball is read in one sequential pass and
+conan_package.tgz is written to a temporary file, then stored as a
+content-addressed blob (deterministic output, so rebuilding reuses it).
+
+Packages are built by a build_conan_package job after upload (see
+packages.jobs), or on first request for binaries that don't have a current
+one. Only one build per binary runs at a time: the builder claims it on the
+BinaryPackage row, and concurrent requests wait for its result.
+"""
+import gzip
+import hashlib
+import tarfile
+import tempfile
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from packages.blobs import CONAN_PACKAGE_SUFFIX, acquire_blob, discard_upload, release_file, store_upload
+from packages.extracted import _is_recipe_path, _is_safe_link, _iter_members, _open_tar_stream
+from packages.models import BinaryPackage, ConanPackageRevision
+
+
+CONANFILE = 'conanfile.py'
+CONANINFO = 'conaninfo.txt'
+CONAN_MANIFEST = 'conanmanifest.txt'
+PACKAGE_TGZ = 'conan_package.tgz'
+
+DEFAULT_BUILD_TIMEOUT = 600  # seconds
+BUILD_POLL_INTERVAL = 0.5  # seconds
+
+
+def get_build_timeout():
+    return getattr(settings, 'CONAN_PACKAGE_BUILD_TIMEOUT', DEFAULT_BUILD_TIMEOUT)
+
+
+def md5_text(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.md5(data).hexdigest()
+
+
+def format_manifest(timestamp, file_sums):
+    """conanmanifest.txt content: a timestamp line, then 'path: md5' per file"""
+    lines = [str(int(timestamp))]
+    lines += [f"{path}: {md5}" for path, md5 in sorted(file_sums.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def parse_manifest(content):
+    """{path: md5} of a conanmanifest.txt"""
+    file_sums = {}
+    for line in content.splitlines()[1:]:
+        path, sep, md5 = line.rpartition(': ')
+        if sep:
+            file_sums[path] = md5
+    return file_sums
+
+
+def manifest_revision(file_sums):
+    """Revision of a manifest: md5 of its file lines, without the timestamp (Conan's summary hash)"""
+    return md5_text(''.join(f"{path}: {md5}\n" for path, md5 in sorted(file_sums.items())))
+
+
+def recipe_revision(recipe_content):
+    """Recipe revision of a conanfile.py, or '' if there is none"""
+    if not recipe_content:
+        return ''
+    return manifest_revision({CONANFILE: md5_text(recipe_content)})
+
+
+def recipe_manifest(package_version):
+    """
+    conanmanifest.txt of a recipe revision.
+
+    Returns:
+        (manifest content, revision)
+    """
+    file_sums = {CONANFILE: md5_text(package_version.recipe_content)}
+    manifest = format_manifest(package_version.updated_at.timestamp(), file_sums)
+    return manifest, manifest_revision(file_sums)
+
+
+def parse_conaninfo_sections(content):
+    """
+    Settings, options and requires of a conaninfo.txt, as Conan's package search reports them.
+
+    Returns:
+        {'settings': {...}, 'options': {...}, 'requires': [...]}
+    """
+    info = {'settings': {}, 'options': {}, 'requires': []}
+    section = None
+    for line in (content or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            section = line[1:-1]
+        elif section == 'requires':
+            info['requires'].append(line)
+        elif section in ('settings', 'options') and '=' in line:
+            key, value = line.split('=', 1)
+            info[section][key.strip()] = value.strip()
+    return info
+
+
+def package_folder_path(parts):
+    """
+    Path of a tarball member inside the package folder, or None.
+
+    'b/zlib1a2b/p/include/zlib.h' -> 'include/zlib.h' for `conan cache save`
+    archives; members of plain package folder tarballs keep their path.
+    """
+    start = 1 if parts[0] == 'p' else 0  # tolerate archives rooted at the cache folder
+    if len(parts) > start + 3 and parts[start] == 'b' and parts[start + 2] == 'p':
+        return '/'.join(parts[start + 3:])
+    if parts == ('pkglist.json',) or parts[start] == 'b' or _is_recipe_path(parts):
+        return None
+    return '/'.join(parts)
+
+
+class _MD5Reader:
+    """File wrapper hashing what tarfile copies out of it"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.md5 = hashlib.md5()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.md5.update(data)
+        return data
+
+
+def write_conan_package(binary, output):
+    """
+    Write the conan_package.tgz of a binary to a file object.
+
+    Returns:
+        (conaninfo, manifest) - manifest is the packaged conanmanifest.txt,
+        or one generated from the files written
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    conaninfo = b''
+    packaged_manifest = None
+    file_sums = {}
+
+    # mtime=0 and no filename keep the gzip header (and so the blob) stable
+    with gzip.GzipFile(filename='', fileobj=output, mode='wb', mtime=0) as gz, \
+            tarfile.open(fileobj=gz, mode='w', format=tarfile.PAX_FORMAT) as package:
+        source, tar = _open_tar_stream(binary)
+        try:
+            for member, parts in _iter_members(tar):
+                path = package_folder_path(parts)
+                if not path or path == PACKAGE_TGZ:
+                    continue
+                if member.issym() and not _is_safe_link(path, member.linkname):
+                    continue
+
+                if path in (CONANINFO, CONAN_MANIFEST) and member.isfile():
+                    data = tar.extractfile(member).read()
+                    if path == CONANINFO:
+                        conaninfo = data
+                        file_sums[path] = md5_text(data)
+                    else:
+                        packaged_manifest = data.decode('utf-8', errors='replace')
+                    continue
+
+                info = tarfile.TarInfo(path)
+                info.type = member.type
+                info.mode = (member.mode & 0o777) or 0o644
+                info.mtime = member.mtime
+                if member.issym():
+                    # Conan hashes the link target of symlinks
+                    info.linkname = member.linkname
+                    package.addfile(info)
+                    file_sums[path] = md5_text(member.linkname)
+                else:
+                    info.size = member.size
+                    reader = _MD5Reader(tar.extractfile(member))
+                    package.addfile(info, reader)
+                    file_sums[path] = reader.md5.hexdigest()
+        finally:
+            tar.close()
+            source.close()
+
+    manifest = packaged_manifest or format_manifest(binary.created_at.timestamp(), file_sums)
+    return conaninfo.decode('utf-8', errors='replace'), manifest
+
+
+def _is_current(revision, binary):
+    # Without a sha256 there is no telling which upload a package was built from
+    return revision is not None and bool(binary.sha256) and revision.source_sha256 == binary.sha256
+
+
+def is_conan_package_current(binary):
+    """Check whether the binary has a Conan package built from its current binary_file"""
+    return _is_current(ConanPackageRevision.objects.filter(binary=binary).first(), binary)
+
+
+def build_conan_package(binary):
+    """
+    Build the Conan package revision of a binary, replacing any previous one.
+
+    Nothing is stored if the binary was re-uploaded while the package was
+    being built (the newer upload builds its own).
+
+    Returns:
+        The ConanPackageRevision
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    with tempfile.TemporaryFile() as tmp:
+        conaninfo, manifest = write_conan_package(binary, tmp)
+        tmp.seek(0)
+        ingested = store_upload(File(tmp, name=PACKAGE_TGZ), CONAN_PACKAGE_SUFFIX, scan=False)
+
+    replaced = None
+    with transaction.atomic():
+        current = BinaryPackage.objects.select_for_update().get(pk=binary.pk)
+        existing = ConanPackageRevision.objects.filter(binary=current).first()
+        if current.sha256 != binary.sha256:
+            discard_upload(ingested.name)
+            return existing
+
+        if existing is not None:
+            replaced = existing.package_file
+        revision, _ = ConanPackageRevision.objects.update_or_create(
+            binary=current,
+            defaults={
+                'revision': manifest_revision(parse_manifest(manifest)),
+                'manifest': manifest,
+                'conaninfo': conaninfo,
+                'package_file': acquire_blob(ingested),
+                'package_sha256': ingested.sha256,
+                'package_size': ingested.size,
+                'source_sha256': binary.sha256,
+                'created_at': timezone.now(),
+            }
+        )
+
+    if replaced is not None:
+        release_file(replaced)
+    return revision
+
+
+def _claim_build(binary):
+    """
+    Claim the Conan package build of a binary.
+
+    A single conditional UPDATE, so no lock is held while the package is
+    built. Claims older than CONAN_PACKAGE_BUILD_TIMEOUT are taken over.
+
+    Returns:
+        The claim's timestamp, or None if another build holds the claim
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=get_build_timeout())
+    claimed = BinaryPackage.objects.filter(
+        Q(conan_package_claimed_at__isnull=True) | Q(conan_package_claimed_at__lt=expired),
+        pk=binary.pk
+    ).update(conan_package_claimed_at=now)
+    return now if claimed else None
+
+
+def get_conan_package(binary):
+    """
+    Get the Conan package revision of a binary, building it on first use.
+
+    The Conan client asks for a package's revision and files concurrently;
+    only the request that claims the build builds the package, the others
+    wait for the claim to be released and reuse the result.
+
+    Returns:
+        The ConanPackageRevision, or None if the binary has no tarball to
+        build one from
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    revision = ConanPackageRevision.objects.filter(binary=binary).first()
+    if _is_current(revision, binary):
+        return revision
+    if not binary.binary_file or not binary.binary_file.name:
+        return revision
+
+    claimed_at = _claim_build(binary)
+    while claimed_at is None:
+        time.sleep(BUILD_POLL_INTERVAL)
+        claimed_at = _claim_build(binary)
+
+    try:
+        # Built by the request that held the claim before us
+        revision = ConanPackageRevision.objects.filter(binary=binary).first()
+        if _is_current(revision, binary):
+            return revision
+        return build_conan_package(binary)
+    finally:
+        BinaryPackage.objects.filter(pk=binary.pk, conan_package_claimed_at=claimed_at).update(
+            conan_package_claimed_at=None
+        )
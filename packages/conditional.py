@@ -0,0 +1,99 @@
+"""
+Conditional and partial downloads
+
+Helpers for ETag validation, HTTP Range requests and cache headers on stored
+file downloads. Binaries are content-addressed by their sha256, so it doubles
+as a strong ETag: unchanged binaries are answered with 304, and interrupted
+downloads can resume with a Range request.
+"""
+import re
+from django.conf import settings
+
+
+DEFAULT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file"""
+    pass
+
+
+def get_cache_control():
+    """Cache-Control header for downloads with a known checksum"""
+    return getattr(settings, 'DOWNLOAD_CACHE_CONTROL', DEFAULT_CACHE_CONTROL)
+
+
+def make_etag(checksum):
+    """Quoted strong ETag for a checksum, or None if there is none"""
+    if not checksum:
+        return None
+    return f'"{checksum}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header.
+
+    Multiple ranges and malformed headers are ignored (the whole file is
+    served instead), as RFC 9110 allows.
+
+    Args:
+        header: Range header value, e.g. 'bytes=100-' or 'bytes=-500'
+        size: Total file size in bytes
+
+    Returns:
+        (start, end) inclusive byte offsets, or None to serve the whole file
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def if_range_matches(request, etag):
+    """
+    Check the If-Range precondition.
+
+    A Range request with an If-Range that doesn't match the current ETag must
+    get the full (new) file instead of a slice of it.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    return etag is not None and if_range.strip() == etag
+
+
+def counts_as_download(response):
+    """
+    Whether a download response should increment the download counters.
+
+    304s and resumed ranges (206 not starting at byte 0) are not new downloads.
+    """
+    if response.status_code == 206:
+        return response.get('Content-Range', '').startswith('bytes 0-')
+    return response.status_code in (200, 302)
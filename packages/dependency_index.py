@@ -0,0 +1,85 @@
+"""
+Dependency graph index
+
+Normalizes BinaryPackage.dependency_graph (output of `conan graph info`) into
+BinaryDependency rows, so views can resolve a binary's dependencies with one
+indexed query instead of re-parsing the JSON and looking up every node.
+"""
+from django.db import transaction
+from packages.models import BinaryDependency
+from packages.resolver import find_binaries, iter_graph_dependencies
+
+
+def index_binary_dependencies(binary):
+    """
+    Rebuild the BinaryDependency rows of a binary from its dependency_graph.
+
+    Dependencies already uploaded are linked in a single lookup; edges from
+    other binaries that were waiting for this binary are linked too.
+
+    Args:
+        binary: Saved BinaryPackage
+
+    Returns:
+        Number of dependency rows written
+    """
+    dependencies = list(iter_graph_dependencies(binary.dependency_graph))
+
+    # Resolve all uploaded dependency binaries in one query
+    uploaded = find_binaries(dependencies)
+
+    with transaction.atomic():
+        BinaryDependency.objects.filter(binary=binary).delete()
+        BinaryDependency.objects.bulk_create([
+            BinaryDependency(
+                binary=binary,
+                dependency_binary=uploaded.get((dep['name'], dep['version'], dep['package_id'])),
+                name=dep['name'],
+                version=dep['version'],
+                package_id=dep['package_id'],
+                position=position,
+            )
+            for position, dep in enumerate(dependencies)
+        ])
+
+        link_dependents(binary)
+
+    return len(dependencies)
+
+
+def link_dependents(binary):
+    """
+    Point existing dependency edges that reference this binary at it.
+
+    Needed when a dependency is uploaded after the packages that depend on it.
+    """
+    return BinaryDependency.objects.filter(
+        dependency_binary__isnull=True,
+        name=binary.package_version.package.name,
+        version=binary.package_version.version,
+        package_id=binary.package_id,
+    ).update(dependency_binary=binary)
+
+
+def get_dependency_edges(binary):
+    """
+    Get the dependencies of a binary, with their uploaded binaries preloaded.
+
+    Binaries stored before the index existed are indexed on first use.
+
+    Returns:
+        List of BinaryDependency in graph order. dependency_binary (with
+        package_version and package) is None for dependencies not in the registry.
+    """
+    edges = list(
+        BinaryDependency.objects.filter(binary=binary)
+        .select_related('dependency_binary__package_version__package')
+        .order_by('position')
+    )
+    if edges or not binary.dependency_graph:
+        return edges
+
+    # Not indexed yet (or no dependencies) - index and read back
+    if index_binary_dependencies(binary):
+        return get_dependency_edges(binary)
+    return []
@@ -0,0 +1,83 @@
+"""
+Download accounting for binaries and packages
+
+Downloads never rewrite whole BinaryPackage/Package rows (which would also
+rewrite the large dependency_graph JSON and race under concurrency).
+
+Modes (DOWNLOAD_COUNT_MODE setting):
+- immediate: one atomic UPDATE ... SET download_count = download_count + 1
+  per counter (default)
+- buffered: append a PendingDownload row; counters are updated in batches by
+  the flush_download_counts management command
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from packages.models import Package, BinaryPackage, PendingDownload
+
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def get_count_mode():
+    return getattr(settings, 'DOWNLOAD_COUNT_MODE', 'immediate')
+
+
+def record_download(binary, package=None):
+    """
+    Count one download of a binary.
+
+    Args:
+        binary: BinaryPackage that was downloaded
+        package: Package whose total should also be incremented (optional)
+    """
+    if get_count_mode() == 'buffered':
+        PendingDownload.objects.create(binary=binary, package=package)
+        return
+
+    BinaryPackage.objects.filter(pk=binary.pk).update(download_count=F('download_count') + 1)
+    if package is not None:
+        Package.objects.filter(pk=package.pk).update(download_count=F('download_count') + 1)
+
+
+def flush_download_counts(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fold buffered downloads into the download counters.
+
+    Processes pending rows in id order, batch_size at a time. Each batch is
+    applied and deleted in one transaction, so counts are never lost or
+    applied twice even if several flushers run at once.
+
+    Returns:
+        Number of downloads applied
+    """
+    applied = 0
+
+    while True:
+        with transaction.atomic():
+            batch_ids = list(
+                PendingDownload.objects.select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+
+            pending = PendingDownload.objects.filter(id__in=batch_ids)
+
+            binary_counts = pending.values('binary_id').annotate(n=Count('id'))
+            for row in binary_counts:
+                BinaryPackage.objects.filter(pk=row['binary_id']).update(
+                    download_count=F('download_count') + row['n']
+                )
+
+            package_counts = pending.exclude(package_id=None).values('package_id').annotate(n=Count('id'))
+            for row in package_counts:
+                Package.objects.filter(pk=row['package_id']).update(
+                    download_count=F('download_count') + row['n']
+                )
+
+            pending.delete()
+            applied += len(batch_ids)
+
+    return applied
@@ -0,0 +1,505 @@
+"""
+Extracted-format artifacts
+
+Conan binaries are stored as tarballs laid out for the Conan cache. Non-Conan
+users download an "extracted" ZIP instead, with include/, lib/, bin/ and
+cmake/ at the top level. The single-binary ZIP is transcoded member by member
+straight from the tarball stream (no scratch directory), built once per
+BinaryPackage, stored in BinaryPackage.extracted_file and served as-is
+afterwards.
+
+Extracted bundles are different: every tarball is downloaded and
+decompressed into an anonymous temp file by a worker thread first, so up to
+EXTRACTED_BUNDLE_WORKERS + 1 uncompressed tarballs sit on local disk while a
+bundle streams. Size the temp directory for that.
+"""
+import gzip
+import itertools
+import logging
+import shutil
+import tarfile
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from packages.blobs import discard_upload, release_file
+from packages.compression import get_default_compression_policy
+from packages.models import BinaryPackage
+from packages.storage_utils import open_stream
+from packages.zip_stream import ZipStream
+
+
+logger = logging.getLogger(__name__)
+
+
+# Standard C++ directories (include/, lib/, bin/, cmake/) - Conan packages
+# typically store these in the package root
+STANDARD_DIRS = ['include', 'lib', 'bin', 'cmake']
+
+# Files to exclude from extraction (Conan metadata and recipe)
+EXCLUDE_FILES = {'conaninfo.txt', 'conanmanifest.txt', 'pkglist.json', 'conan_sources.tgz', 'conanfile.py'}
+
+# Chunk size used when copying fetched tarballs to scratch files
+FETCH_CHUNK_SIZE = 1024 * 1024
+
+
+class ExtractionError(Exception):
+    """Raised when a binary's tarball can't be read or unpacked"""
+    pass
+
+
+def build_readme(package_name, version, binary):
+    """README.txt placed at the root of every extracted ZIP"""
+    return f"""# {package_name} {version} - Extracted Binary
+
+This package has been extracted from Conan format for direct use.
+
+## Package Information
+- Name: {package_name}
+- Version: {version}
+- Package ID: {binary.package_id}
+- Configuration: {binary.get_config_string()}
+
+## Directory Structure
+
+The following directories may be present:
+- include/ - Header files
+- lib/ - Library files (.a, .so, .dll, .lib)
+- bin/ - Binary executables
+- cmake/ - CMake package configuration files
+
+## Usage with CMake
+
+If cmake/ directory is present, you can use this package in your CMakeLists.txt:
+
+```cmake
+# Add to CMAKE_PREFIX_PATH
+list(APPEND CMAKE_PREFIX_PATH "${{CMAKE_CURRENT_SOURCE_DIR}}/path/to/extracted/package")
+
+# Find the package
+find_package({package_name} REQUIRED)
+
+# Link against it
+target_link_libraries(your_target {package_name}::{package_name})
+```
+
+## Manual Usage
+
+If cmake/ is not present, you can manually specify include and library paths:
+
+```cmake
+target_include_directories(your_target PRIVATE "${{CMAKE_CURRENT_SOURCE_DIR}}/path/to/include")
+target_link_directories(your_target PRIVATE "${{CMAKE_CURRENT_SOURCE_DIR}}/path/to/lib")
+target_link_libraries(your_target library_name)
+```
+
+Generated by ConanCrates
+"""
+
+
+def _member_parts(member):
+    """
+    Normalized path components of a tar member.
+
+    Returns None for members that would land outside the package ('..').
+    """
+    parts = tuple(part for part in PurePosixPath(member.name).parts if part not in ('', '.', '/'))
+    if '..' in parts:
+        return None
+    return parts
+
+
+def _is_recipe_path(parts):
+    """Files in export/recipe directories (not in b/.../p/) aren't part of the binary"""
+    parts_str = '/'.join(parts)
+    return '/e/' in parts_str or '/d/' in parts_str or '/s/' in parts_str or '/es/' in parts_str
+
+
+def _is_safe_link(arcname, target):
+    """
+    Check that a symlink at arcname points inside the archive.
+
+    Absolute targets and targets that climb out of the archive root with '..'
+    would be followed outside the extraction directory by tools that
+    recreate symlinks.
+    """
+    if not target or target.startswith('/'):
+        return False
+    parts = list(PurePosixPath(arcname).parent.parts)
+    for part in target.split('/'):
+        if part == '..':
+            if not parts:
+                return False
+            parts.pop()
+        elif part not in ('', '.'):
+            parts.append(part)
+    return True
+
+
+def map_extracted_path(parts):
+    """
+    Archive path of a member in a single-binary extracted ZIP.
+
+    The first standard directory in the path becomes the top level:
+    'p/include/zlib.h' -> 'include/zlib.h'. Returns None for members outside
+    the standard directories and for Conan metadata.
+    """
+    if parts[-1] in EXCLUDE_FILES or _is_recipe_path(parts):
+        return None
+    for i, part in enumerate(parts):
+        if part in STANDARD_DIRS:
+            return '/'.join(parts[i:])
+    return None
+
+
+def map_bundle_paths(pkg_name, parts):
+    """
+    Candidate archive paths of a member in an interlaced bundle, in order of preference.
+
+    - include/ gets a subdirectory per package (include/<pkg_name>/...)
+    - lib/ and bin/ are flattened; name clashes get a '<pkg_name>_' prefix
+    - cmake/ from all packages is merged into one directory
+    """
+    for i, part in enumerate(parts):
+        if part not in STANDARD_DIRS:
+            continue
+        remaining = parts[i+1:]  # Everything after the standard dir
+        if part == 'include':
+            return ['/'.join(('include', pkg_name) + remaining)]
+        if part in ('lib', 'bin'):
+            filename = parts[-1]
+            return [f'{part}/{filename}', f'{part}/{pkg_name}_{filename}']
+        if remaining:
+            return ['/'.join(('cmake',) + remaining)]
+        return []
+    return []
+
+
+def _open_tar_stream(binary):
+    """
+    Open a binary's tarball for one sequential pass, straight from storage.
+
+    Uses tarfile's stream mode (r|gz): members are read in order from the
+    storage stream, nothing is written to disk.
+
+    Returns:
+        (source, tar) - close both when done
+    """
+    try:
+        source = open_stream(binary.binary_file)
+    except Exception as e:
+        raise ExtractionError(f"Could not read binary file: {e}") from e
+    try:
+        return source, tarfile.open(fileobj=source, mode='r|gz')
+    except Exception as e:
+        source.close()
+        raise ExtractionError(f"Error extracting package: {e}") from e
+
+
+def _write_member(zip_stream, tar, member, arcname):
+    """Copy one tar member into the ZIP stream in fixed-size chunks (unsafe symlinks are skipped)"""
+    if member.issym():
+        if not _is_safe_link(arcname, member.linkname):
+            logger.warning(f"  Skipping symlink {arcname} -> {member.linkname}: points outside the archive")
+            return
+        yield from zip_stream.write_symlink(arcname, member.linkname)
+    else:
+        yield from zip_stream.write_file(
+            arcname,
+            tar.extractfile(member),
+            size=member.size,
+            mode=(member.mode & 0o777) or 0o644
+        )
+
+
+def _iter_members(tar):
+    """
+    Regular files and symlinks of a tar stream, with their path parts.
+
+    Hard links are skipped: their target can't be re-read in stream mode.
+    """
+    try:
+        for member in tar:
+            if not (member.isfile() or member.issym()):
+                continue
+            parts = _member_parts(member)
+            if parts:
+                yield member, parts
+    except (tarfile.TarError, EOFError, OSError, zlib.error) as e:
+        raise ExtractionError(f"Error extracting package: {e}") from e
+
+
+def iter_extracted_zip(binary, policy=None):
+    """
+    Transcode a binary's Conan tarball into the extracted-format ZIP.
+
+    Generator yielding ZIP bytes. Each tar member is copied into the ZIP in
+    fixed-size chunks as it is read, so memory use is bounded by the chunk
+    size and no scratch disk is needed.
+
+    If the package has no standard directories, a second pass includes every
+    file except Conan metadata. Opening the tarball happens on the first
+    next() call, so callers can catch ExtractionError before responding.
+
+    Args:
+        binary: BinaryPackage with a stored binary_file
+        policy: Compression policy (defaults to BUNDLE_COMPRESSION_POLICY)
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    policy = policy or get_default_compression_policy()
+    package_name = binary.package_version.package.name
+    version = binary.package_version.version
+    written = set()
+
+    source, tar = _open_tar_stream(binary)
+    zip_stream = ZipStream(policy=policy)
+    try:
+        yield from zip_stream.write_str('README.txt', build_readme(package_name, version, binary))
+
+        for member, parts in _iter_members(tar):
+            arcname = map_extracted_path(parts)
+            if arcname is None or arcname in written:
+                continue
+            written.add(arcname)
+            yield from _write_member(zip_stream, tar, member, arcname)
+    finally:
+        tar.close()
+        source.close()
+
+    # If no standard directories found, include everything (except metadata)
+    if not written:
+        source, tar = _open_tar_stream(binary)
+        try:
+            for member, parts in _iter_members(tar):
+                arcname = '/'.join(parts)
+                if parts[-1] in EXCLUDE_FILES or arcname in written:
+                    continue
+                written.add(arcname)
+                yield from _write_member(zip_stream, tar, member, arcname)
+        finally:
+            tar.close()
+            source.close()
+
+    if not written:
+        # Package has no files!
+        yield from zip_stream.write_str('NOTE.txt',
+            "This package appears to be empty or header-only with no files.\n"
+            "No compiled binaries, headers, or other artifacts were found.\n"
+            "This may be a metapackage that only declares dependencies.")
+
+    yield from zip_stream.close()
+
+
+def _fetch_tarball(binary):
+    """
+    Download and decompress a binary's tarball into an anonymous temp file.
+
+    This is the network- and CPU-bound part of building a bundle (zlib
+    releases the GIL), so it runs in worker threads.
+
+    Returns:
+        Temp file holding the uncompressed tar, positioned at the start
+
+    Raises:
+        ExtractionError: If the tarball can't be read or decompressed
+    """
+    try:
+        source = open_stream(binary.binary_file)
+    except Exception as e:
+        raise ExtractionError(f"Could not read binary file: {e}") from e
+
+    tmp = tempfile.TemporaryFile()
+    try:
+        with gzip.GzipFile(fileobj=source, mode='rb') as gz:
+            shutil.copyfileobj(gz, tmp, FETCH_CHUNK_SIZE)
+    except (OSError, EOFError, zlib.error) as e:
+        tmp.close()
+        raise ExtractionError(f"Error extracting package: {e}") from e
+    finally:
+        source.close()
+
+    tmp.seek(0)
+    return tmp
+
+
+def _close_fetched(future):
+    """Release the temp file of a finished fetch, if it produced one"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    future.result().close()
+
+
+def iter_fetched_tarballs(binaries, workers=None):
+    """
+    Fetch and decompress tarballs concurrently, yielding them in input order.
+
+    Each tarball is spooled uncompressed into a temp file. At most `workers`
+    fetches run or wait ahead of the consumer, so scratch disk use is bounded
+    by the `workers` + 1 largest uncompressed tarballs of the bundle, however
+    many packages it has.
+
+    Args:
+        binaries: List of (BinaryPackage, package_name, version) tuples
+        workers: Pool size (defaults to EXTRACTED_BUNDLE_WORKERS)
+
+    Yields:
+        (entry, future) in the order of `binaries`. future.result() returns
+        the uncompressed tar file (closed by this generator once the consumer
+        moves on) or raises ExtractionError.
+    """
+    workers = max(1, workers or getattr(settings, 'EXTRACTED_BUNDLE_WORKERS', 4))
+    entries = iter(binaries)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bundle-fetch') as pool:
+        try:
+            for entry in itertools.islice(entries, workers):
+                pending.append((entry, pool.submit(_fetch_tarball, entry[0])))
+
+            while pending:
+                entry, future = pending.popleft()
+                # Keep the pool busy while the consumer works on this one
+                next_entry = next(entries, None)
+                if next_entry is not None:
+                    pending.append((next_entry, pool.submit(_fetch_tarball, next_entry[0])))
+
+                try:
+                    yield entry, future
+                finally:
+                    _close_fetched(future)
+        finally:
+            # Consumer stopped early (client disconnected): drop queued work
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            for _, future in pending:
+                _close_fetched(future)
+
+
+def iter_extracted_bundle_zip(binaries, readme, policy=None, workers=None):
+    """
+    Transcode several binaries into one interlaced extracted bundle ZIP.
+
+    Generator yielding ZIP bytes; see map_bundle_paths() for the layout.
+    Tarballs are fetched and decompressed in a thread pool (see
+    iter_fetched_tarballs()) while the ZIP is written from them in bundle
+    order, so the output is identical to a serial build. When two packages
+    produce the same path the first one is kept. Packages whose tarball
+    can't be read are skipped.
+
+    Args:
+        binaries: List of (BinaryPackage, package_name, version) tuples
+        readme: README.txt content
+        policy: Compression policy (defaults to BUNDLE_COMPRESSION_POLICY)
+        workers: Fetch pool size (defaults to EXTRACTED_BUNDLE_WORKERS)
+    """
+    zip_stream = ZipStream(policy=policy or get_default_compression_policy())
+    written = set()
+
+    yield from zip_stream.write_str('README.txt', readme)
+
+    stored = [entry for entry in binaries if entry[0].binary_file and entry[0].binary_file.name]
+    fetched = iter_fetched_tarballs(stored, workers=workers)
+    try:
+        for idx, ((bin_pkg, pkg_name, pkg_ver), future) in enumerate(fetched, 1):
+            logger.info(f"  [{idx}/{len(stored)}] Extracting {pkg_name}/{pkg_ver}...")
+            try:
+                tar = tarfile.open(fileobj=future.result(), mode='r|')
+            except (ExtractionError, tarfile.TarError) as e:
+                logger.warning(f"  Skipping {pkg_name}/{pkg_ver}: {e}")
+                continue
+
+            try:
+                for member, parts in _iter_members(tar):
+                    for arcname in map_bundle_paths(pkg_name, parts):
+                        if arcname not in written:
+                            written.add(arcname)
+                            yield from _write_member(zip_stream, tar, member, arcname)
+                            break
+            except ExtractionError as e:
+                logger.warning(f"  Stopped reading {pkg_name}/{pkg_ver}: {e}")
+            finally:
+                tar.close()
+    finally:
+        fetched.close()
+
+    yield from zip_stream.close()
+
+
+def write_extracted_zip(binary, output, policy=None):
+    """
+    Write the extracted-format ZIP of a binary to a file object.
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    for chunk in iter_extracted_zip(binary, policy=policy):
+        output.write(chunk)
+
+
+def is_extracted_current(binary):
+    """Check whether the stored extracted ZIP was built from the current binary_file"""
+    return bool(
+        binary.extracted_file
+        and binary.extracted_file.name
+        and binary.extracted_source_sha256 == binary.sha256
+    )
+
+
+def generate_extracted_artifact(binary):
+    """
+    Build the extracted ZIP of a binary and store it in binary.extracted_file.
+
+    The ZIP replaces any previously stored (stale) one, unless the binary was
+    re-uploaded while it was being built (the newer upload builds its own).
+
+    Returns:
+        The extracted_file FieldFile
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    package_name = binary.package_version.package.name
+    version = binary.package_version.version
+    field = binary.extracted_file.field
+    filename = field.generate_filename(binary, f"{package_name}-{version}-{binary.package_id}-extracted.zip")
+
+    with tempfile.TemporaryFile() as tmp:
+        write_extracted_zip(binary, tmp)
+        size = tmp.tell()
+        tmp.seek(0)
+        name = field.storage.save(filename, File(tmp), max_length=field.max_length)
+
+    with transaction.atomic():
+        current = BinaryPackage.objects.select_for_update().get(pk=binary.pk)
+        if current.sha256 != binary.sha256:
+            discard_upload(name)
+            return current.extracted_file
+
+        replaced = current.extracted_file
+        binary.extracted_file = name
+        binary.extracted_size = size
+        binary.extracted_source_sha256 = binary.sha256
+        binary.save(update_fields=['extracted_file', 'extracted_size', 'extracted_source_sha256'])
+
+    release_file(replaced)
+    return binary.extracted_file
+
+
+def get_extracted_artifact(binary):
+    """
+    Get the stored extracted ZIP of a binary, building it on first use.
+
+    Binaries uploaded before artifacts were precomputed (or re-uploaded since)
+    are built lazily here.
+    """
+    if is_extracted_current(binary):
+        return binary.extracted_file
+    return generate_extracted_artifact(binary)
+
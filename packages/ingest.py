@@ -0,0 +1,312 @@
+"""
+Single-pass upload ingestion
+
+An uploaded Conan binary has to be hashed, inspected (settings come from the
+conaninfo.txt inside the tarball) and written to storage. Instead of reading
+the upload once for each, the storage writer pulls the bytes through an
+IngestReader that feeds every chunk to the sha256 hasher and to a push-based
+tar scanner on the way. The scanner stops decompressing as soon as it has
+conaninfo.txt, so the cost of an upload is one read of its bytes.
+"""
+import hashlib
+import io
+import re
+import tarfile
+import zlib
+from dataclasses import dataclass
+from django.core.files.uploadedfile import UploadedFile
+from packages.storage_utils import open_stream
+
+
+# Largest conaninfo.txt (and long-name/pax header) the scanner will buffer
+MAX_METADATA_SIZE = 1024 * 1024
+
+# Upper bound on bytes inflated per decompress() call, so a highly
+# compressible chunk can't balloon in memory
+INFLATE_CHUNK_SIZE = 256 * 1024
+
+# Read size used when ingesting an upload
+READ_CHUNK_SIZE = UploadedFile.DEFAULT_CHUNK_SIZE
+
+BLOCK_SIZE = tarfile.BLOCKSIZE
+
+PAX_PATH_RE = re.compile(rb'\d+ path=([^\n]*)\n')
+
+
+def _padded(size):
+    """Size of a tar member's data rounded up to whole blocks"""
+    return -(-size // BLOCK_SIZE) * BLOCK_SIZE
+
+
+class ConaninfoScanner:
+    """
+    Push-based scanner that picks conaninfo.txt out of a .tar.gz stream.
+
+    Feed it the compressed bytes in order; it inflates just enough to walk
+    the tar headers, skips member data without keeping it, and stops (done)
+    once conaninfo.txt has been read, the archive ends, or the stream turns
+    out not to be a readable tar.gz.
+
+    Attributes:
+        content: conaninfo.txt text, or None if not found (yet)
+        done: True once feeding more data makes no difference
+    """
+
+    def __init__(self):
+        self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._buffer = bytearray()
+        self._skip = 0
+        self._capture = None  # (kind, size) of member data being buffered
+        self._long_name = None
+        self.content = None
+        self.done = False
+
+    def feed(self, data):
+        """Process the next chunk of the compressed stream"""
+        try:
+            while data and not self.done:
+                self._consume(self._inflater.decompress(data, INFLATE_CHUNK_SIZE))
+                data = self._inflater.unconsumed_tail
+        except zlib.error:
+            self.done = True
+
+    def _consume(self, data):
+        self._buffer += data
+
+        while not self.done:
+            if self._skip:
+                skipped = min(self._skip, len(self._buffer))
+                del self._buffer[:skipped]
+                self._skip -= skipped
+                if self._skip:
+                    return
+
+            if self._capture is not None:
+                kind, size = self._capture
+                if len(self._buffer) < _padded(size):
+                    return
+                payload = bytes(self._buffer[:size])
+                del self._buffer[:_padded(size)]
+                self._capture = None
+                self._handle_payload(kind, payload)
+                continue
+
+            if len(self._buffer) < BLOCK_SIZE:
+                return
+            header = bytes(self._buffer[:BLOCK_SIZE])
+            del self._buffer[:BLOCK_SIZE]
+            self._handle_header(header)
+
+    def _handle_header(self, header):
+        try:
+            member = tarfile.TarInfo.frombuf(header, 'utf-8', 'surrogateescape')
+        except tarfile.HeaderError:
+            # End-of-archive marker or not a tar at all
+            self.done = True
+            return
+
+        name = self._long_name or member.name
+        self._long_name = None
+
+        if member.type in (tarfile.GNUTYPE_LONGNAME, tarfile.XHDTYPE):
+            kind = 'longname' if member.type == tarfile.GNUTYPE_LONGNAME else 'pax'
+            self._start_capture(kind, member.size)
+        elif member.isfile() and name.rstrip('/').split('/')[-1] == 'conaninfo.txt':
+            self._start_capture('conaninfo', member.size)
+        elif member.isreg() or member.type not in tarfile.SUPPORTED_TYPES or member.type == tarfile.XGLTYPE:
+            # Member data (links, directories and devices have none)
+            self._skip = _padded(member.size)
+
+    def _start_capture(self, kind, size):
+        if size > MAX_METADATA_SIZE:
+            self.done = True
+        else:
+            self._capture = (kind, size)
+
+    def _handle_payload(self, kind, payload):
+        if kind == 'conaninfo':
+            self.content = payload.decode('utf-8', errors='replace')
+            self.done = True
+        elif kind == 'longname':
+            self._long_name = payload.rstrip(b'\0').decode('utf-8', errors='surrogateescape')
+        else:
+            match = PAX_PATH_RE.search(payload)
+            if match:
+                self._long_name = match.group(1).decode('utf-8', errors='surrogateescape')
+
+
+class IngestReader:
+    """
+    Read-only, forward-only view of an upload that hashes and scans as it goes.
+
+    Storage backends read the upload through this object; every byte they
+    pull is also fed to sha256 and to the ConaninfoScanner. It reports
+    itself as unseekable so backends stream it instead of rewinding.
+    """
+
+    def __init__(self, fileobj, scanner=None):
+        self._fileobj = fileobj
+        self.scanner = scanner
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        if data:
+            self.hasher.update(data)
+            self.size += len(data)
+            if self.scanner is not None and not self.scanner.done:
+                self.scanner.feed(data)
+        return data
+
+    @property
+    def closed(self):
+        return False
+
+    def seekable(self):
+        return False
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        raise io.UnsupportedOperation('upload streams are read once')
+
+    def tell(self):
+        return self.size
+
+    def close(self):
+        pass
+
+
+@dataclass
+class IngestResult:
+    """What one pass over an uploaded binary produced"""
+    name: str
+    sha256: str
+    size: int
+    conaninfo: str = None
+
+
+def scan_conaninfo(fileobj):
+    """
+    Read conaninfo.txt from a .tar.gz without storing it.
+
+    Stops reading as soon as conaninfo.txt has been found.
+
+    Returns:
+        conaninfo.txt text, or None
+    """
+    scanner = ConaninfoScanner()
+    fileobj.seek(0)
+    while not scanner.done:
+        chunk = fileobj.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        scanner.feed(chunk)
+    fileobj.seek(0)
+    return scanner.content
+
+
+def ingest_upload(uploaded_file, field, filename, scan=True):
+    """
+    Store an uploaded file, hashing (and optionally scanning) it in the same read.
+
+    Args:
+        uploaded_file: UploadedFile from request.FILES
+        field: Model FileField the file belongs to (e.g. BinaryPackage binary_file)
+        filename: Filename to store under (upload_to is applied)
+        scan: Look for conaninfo.txt on the way (Conan binaries only)
+
+    Returns:
+        IngestResult - assign result.name to the model's file field
+    """
+    uploaded_file.seek(0)
+    reader = IngestReader(uploaded_file, ConaninfoScanner() if scan else None)
+    name = field.storage.save(
+        field.generate_filename(None, filename),
+        reader,
+        max_length=field.max_length
+    )
+
+    # Drain whatever the backend didn't read (e.g. it stopped at Content-Length)
+    while reader.read(READ_CHUNK_SIZE):
+        pass
+
+    return IngestResult(
+        name=name,
+        sha256=reader.hasher.hexdigest(),
+        size=reader.size,
+        conaninfo=reader.scanner.content if scan else None
+    )
+
+
+def inspect_upload(uploaded_file, scan=True):
+    """
+    Hash (and optionally scan) an upload without storing it.
+
+    Used when the sha256 has to be known before deciding where - or whether -
+    to store the upload (content-addressed storage). Reads the request's
+    local copy of the upload, not storage.
+
+    Returns:
+        IngestResult with name None
+    """
+    uploaded_file.seek(0)
+    reader = IngestReader(uploaded_file, ConaninfoScanner() if scan else None)
+    while reader.read(READ_CHUNK_SIZE):
+        pass
+    uploaded_file.seek(0)
+
+    return IngestResult(
+        name=None,
+        sha256=reader.hasher.hexdigest(),
+        size=reader.size,
+        conaninfo=reader.scanner.content if scan else None
+    )
+
+
+def scan_stored(field_file):
+    """
+    Read conaninfo.txt from a stored .tar.gz.
+
+    Only the start of the object is fetched: the stream is closed as soon
+    as conaninfo.txt has been found.
+
+    Returns:
+        conaninfo.txt text, or None
+    """
+    scanner = ConaninfoScanner()
+    source = open_stream(field_file)
+    try:
+        while not scanner.done:
+            chunk = source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+    finally:
+        source.close()
+    return scanner.content
+
+
+def ingest_stored(field_file, scan=True):
+    """
+    Hash (and optionally scan) a file that is already in storage.
+
+    Used for binaries uploaded straight to MinIO: one sequential read of the
+    stored object gives its real size, sha256 and conaninfo.txt.
+
+    Returns:
+        IngestResult
+    """
+    source = open_stream(field_file)
+    try:
+        reader = IngestReader(source, ConaninfoScanner() if scan else None)
+        while reader.read(READ_CHUNK_SIZE):
+            pass
+    finally:
+        source.close()
+
+    return IngestResult(
+        name=field_file.name,
+        sha256=reader.hasher.hexdigest(),
+        size=reader.size,
+        conaninfo=reader.scanner.content if scan else None
+    )
@@ -0,0 +1,254 @@
+"""
+Background jobs
+
+Work derived from an upload (indexing its dependency graph, building its
+extracted artifact, Rust crate and Conan package, prewarming the bundle
+cache) doesn't have to be done before the client gets its response.
+
+Modes (JOB_QUEUE_MODE setting):
+- immediate: enqueue() runs the job right away, in the request (default).
+  Uploads don't precompute anything in this mode - the extracted artifact,
+  Rust crate and Conan package are built on their first download instead,
+  so an upload still responds once its bytes are stored
+- queued: enqueue() only writes a Job row, in the current transaction (a
+  rolled-back upload queues nothing); the run_workers management command
+  runs the jobs in N worker processes
+
+Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED and push their
+run_after out by JOB_VISIBILITY_TIMEOUT, so a job whose worker died becomes
+visible again. Jobs that raise are retried with exponential backoff, up to
+JOB_MAX_ATTEMPTS times; exhausted jobs stay in the table for inspection.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from packages.conan_layout import get_conan_package, is_conan_package_current
+from packages.dependency_index import index_binary_dependencies
+from packages.extracted import generate_extracted_artifact, is_extracted_current
+from packages.models import BinaryPackage, Job
+from packages.rust_crate import generate_rust_crate, is_rust_crate_current
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_VISIBILITY_TIMEOUT = 30 * 60  # seconds
+DEFAULT_RETRY_DELAY = 60  # seconds, doubled after every failed attempt
+
+# kind -> handler(**payload), see job_handler()
+JOB_HANDLERS = {}
+
+
+def get_queue_mode():
+    return getattr(settings, 'JOB_QUEUE_MODE', 'immediate')
+
+
+def get_max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+
+def get_visibility_timeout():
+    return getattr(settings, 'JOB_VISIBILITY_TIMEOUT', DEFAULT_VISIBILITY_TIMEOUT)
+
+
+def get_retry_delay(attempts):
+    """Seconds to wait before retrying a job that failed its attempts-th run"""
+    return getattr(settings, 'JOB_RETRY_DELAY', DEFAULT_RETRY_DELAY) * 2 ** max(attempts - 1, 0)
+
+
+def job_handler(kind):
+    """Register a function as the handler of a job kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, **payload):
+    """
+    Queue a job (or run it now in immediate mode).
+
+    In queued mode, call from inside the transaction that writes the rows the
+    job works on; workers only see the job once it commits. A job identical
+    to one still waiting is not queued twice. Immediate jobs never fail the
+    caller - errors are logged.
+
+    Args:
+        kind: Registered handler name
+        payload: JSON-serializable keyword arguments for the handler
+
+    Returns:
+        The queued Job, or None if it was run immediately
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    if get_queue_mode() == 'queued':
+        # An identical job that no worker has picked up yet covers this one
+        waiting = Job.objects.filter(kind=kind, payload=payload, attempts=0).first()
+        return waiting or Job.objects.create(kind=kind, payload=payload)
+
+    try:
+        JOB_HANDLERS[kind](**payload)
+    except Exception:
+        logger.exception("%s job %s failed", kind, payload)
+    return None
+
+
+def enqueue_upload_jobs(binary):
+    """
+    Queue the work derived from an uploaded binary.
+
+    The dependency graph is indexed by the BinaryPackage post_save signal;
+    this adds the extracted artifact (EXTRACTED_PRECOMPUTE_ON_UPLOAD), the
+    Rust crate unless one was uploaded with the binary
+    (RUST_CRATE_GENERATE_ON_UPLOAD), the package served to Conan clients
+    (CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD) and the bundle cache prewarm
+    (BUNDLE_PREWARM_ON_UPLOAD).
+
+    Only in queued mode: each of these re-reads the whole tarball, which an
+    upload request shouldn't wait for. In immediate mode they are built
+    lazily on first download.
+    """
+    if get_queue_mode() != 'queued':
+        return
+    if getattr(settings, 'EXTRACTED_PRECOMPUTE_ON_UPLOAD', True):
+        enqueue('build_extracted', binary_id=binary.pk)
+    if getattr(settings, 'RUST_CRATE_GENERATE_ON_UPLOAD', True) and not is_rust_crate_current(binary):
+        enqueue('build_rust_crate', binary_id=binary.pk)
+    if getattr(settings, 'CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD', True):
+        enqueue('build_conan_package', binary_id=binary.pk)
+    if getattr(settings, 'BUNDLE_PREWARM_ON_UPLOAD', False):
+        enqueue('prewarm_bundle', binary_id=binary.pk)
+
+
+def get_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_job(worker=''):
+    """
+    Claim the next due job.
+
+    Returns:
+        The claimed Job (attempts already counted), or None if no job is due
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(run_after__lte=now, attempts__lt=get_max_attempts())
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.attempts += 1
+        job.run_after = now + timedelta(seconds=get_visibility_timeout())
+        job.locked_by = worker
+        job.save(update_fields=['attempts', 'run_after', 'locked_by'])
+    return job
+
+
+def run_job(job):
+    """
+    Run a claimed job: delete it when done, schedule a retry when it fails.
+
+    Returns:
+        True if the job succeeded
+    """
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        handler(**job.payload)
+    except Exception as e:
+        Job.objects.filter(pk=job.pk).update(
+            run_after=timezone.now() + timedelta(seconds=get_retry_delay(job.attempts)),
+            last_error=f"{type(e).__name__}: {e}",
+            locked_by=''
+        )
+        return False
+
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def run_jobs(worker='', max_jobs=None):
+    """
+    Run due jobs until none is left (or max_jobs have run).
+
+    Several workers can run this at once; every job is run by one of them.
+
+    Returns:
+        (succeeded, failed) job counts
+    """
+    succeeded = failed = 0
+    while max_jobs is None or succeeded + failed < max_jobs:
+        job = claim_job(worker)
+        if job is None:
+            break
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def _get_binary(binary_id):
+    """The binary a job works on, or None if it was deleted since"""
+    return BinaryPackage.objects.select_related('package_version__package').filter(pk=binary_id).first()
+
+
+@job_handler('index_dependencies')
+def index_dependencies_job(binary_id):
+    """Rebuild the BinaryDependency rows of a binary"""
+    binary = _get_binary(binary_id)
+    if binary is not None:
+        index_binary_dependencies(binary)
+
+
+@job_handler('build_extracted')
+def build_extracted_job(binary_id):
+    """Build the extracted-format ZIP of a binary unless it is current"""
+    binary = _get_binary(binary_id)
+    if binary is None or not binary.binary_file or is_extracted_current(binary):
+        return
+    generate_extracted_artifact(binary)
+    logger.info("Built extracted artifact: %s", binary.extracted_file.name)
+
+
+@job_handler('build_rust_crate')
+def build_rust_crate_job(binary_id):
+    """Build the Rust -sys crate of a binary unless it is current"""
+    binary = _get_binary(binary_id)
+    if binary is None or not binary.binary_file or is_rust_crate_current(binary):
+        return
+    generate_rust_crate(binary)
+    logger.info("Built Rust crate: %s", binary.rust_crate_file.name)
+
+
+@job_handler('build_conan_package')
+def build_conan_package_job(binary_id):
+    """Build the Conan package revision of a binary unless it is current"""
+    binary = _get_binary(binary_id)
+    if binary is None or not binary.binary_file or is_conan_package_current(binary):
+        return
+    revision = get_conan_package(binary)
+    logger.info("Built Conan package: %s#%s", binary.package_id, revision.revision)
+
+
+@job_handler('prewarm_bundle')
+def prewarm_bundle_job(binary_id):
+    """Build the bundle of a binary into the bundle cache"""
+    # The views import this module
+    from packages.views.download_views import prewarm_bundle
+
+    binary = _get_binary(binary_id)
+    if binary is not None:
+        prewarm_bundle(binary)
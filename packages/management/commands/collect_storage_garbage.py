@@ -0,0 +1,69 @@
+"""
+Find and delete MinIO objects that no database row references.
+
+Always try --dry-run first: it reports what would be reclaimed without
+deleting anything. Objects younger than the grace period are never touched.
+"""
+from django.core.management.base import BaseCommand
+from packages.storage_cleanup import DEFAULT_BATCH_SIZE
+from packages.storage_gc import collect_garbage, get_grace_period
+
+
+def format_size(size):
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+class Command(BaseCommand):
+    help = 'Mark-and-sweep garbage collection of unreferenced objects in MinIO'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=None,
+            help=f'Keep objects younger than this (default: STORAGE_GC_GRACE_PERIOD, {get_grace_period() / 3600:g}h)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Objects deleted per request (default and maximum: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        grace_period = options['grace_hours'] * 3600 if options['grace_hours'] is not None else None
+
+        def on_unreferenced(name, size):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"  {name} ({format_size(size)})")
+
+        report = collect_garbage(
+            dry_run=options['dry_run'],
+            grace_period=grace_period,
+            batch_size=options['batch_size'],
+            on_unreferenced=on_unreferenced
+        )
+
+        self.stdout.write(f"Referenced objects: {report.references}")
+        self.stdout.write(f"Scanned: {report.scanned} object(s), {format_size(report.scanned_bytes)}")
+        self.stdout.write(
+            f"Unreferenced: {report.unreferenced} object(s), {format_size(report.reclaimable_bytes)} reclaimable"
+        )
+        self.stdout.write(f"Stale blobs: {report.stale_blobs}, expired upload sessions: {report.expired_sessions}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - nothing was deleted'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {report.deleted} object(s), {format_size(report.deleted_bytes)}"
+        ))
+        if report.revived:
+            self.stdout.write(f"Kept {report.revived} object(s) referenced again since the scan started")
+        if report.failed:
+            self.stdout.write(self.style.ERROR(f"Failed to delete {report.failed} object(s)"))
@@ -0,0 +1,43 @@
+"""
+Delete queued objects from MinIO.
+
+Run periodically (cron) or with --loop as a long-running worker; objects of
+deleted packages, versions, binaries and evicted bundles stay in MinIO until
+this runs.
+"""
+import time
+from django.core.management.base import BaseCommand
+from packages.storage_cleanup import DEFAULT_BATCH_SIZE, drain_deletions
+
+
+class Command(BaseCommand):
+    help = 'Delete stored objects queued by package, binary and bundle cache deletions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Objects deleted per DeleteObjects call (default and maximum: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and drain the queue every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10.0,
+            help='Seconds between runs in --loop mode (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = drain_deletions(batch_size=options['batch_size'])
+            if deleted or not options['loop']:
+                self.stdout.write(f"Deleted {deleted} object(s)")
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
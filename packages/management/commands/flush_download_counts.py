@@ -0,0 +1,42 @@
+"""
+Apply buffered downloads to the download counters.
+
+Run periodically (cron) or with --loop as a long-running worker when
+DOWNLOAD_COUNT_MODE = 'buffered'.
+"""
+import time
+from django.core.management.base import BaseCommand
+from packages.download_counts import DEFAULT_BATCH_SIZE, flush_download_counts
+
+
+class Command(BaseCommand):
+    help = 'Fold buffered download records into BinaryPackage and Package download counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Pending downloads applied per transaction (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and flush every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10.0,
+            help='Seconds between flushes in --loop mode (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            applied = flush_download_counts(batch_size=options['batch_size'])
+            if applied or not options['loop']:
+                self.stdout.write(f"Applied {applied} download(s)")
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+"""
+Backfill the BinaryDependency index from stored dependency graphs.
+"""
+from django.core.management.base import BaseCommand
+from packages.models import BinaryPackage
+from packages.dependency_index import index_binary_dependencies
+
+
+class Command(BaseCommand):
+    help = 'Normalize BinaryPackage.dependency_graph into BinaryDependency rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only index binaries that have a graph but no dependency rows yet'
+        )
+
+    def handle(self, *args, **options):
+        binaries = BinaryPackage.objects.select_related('package_version__package').order_by('id')
+        if options['missing_only']:
+            binaries = binaries.filter(graph_dependencies__isnull=True)
+
+        indexed = 0
+        edges = 0
+        for binary in binaries.iterator():
+            edges += index_binary_dependencies(binary)
+            indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} binary package(s), {edges} dependency row(s)"
+        ))
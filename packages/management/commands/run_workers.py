@@ -0,0 +1,82 @@
+"""
+Run queued background jobs (JOB_QUEUE_MODE = 'queued').
+
+Runs the due jobs and exits (cron), or keeps polling with --loop as a
+long-running service. --workers starts that many worker processes, each
+claiming jobs on its own.
+"""
+import functools
+import multiprocessing
+import time
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from packages.jobs import get_worker_name, run_jobs
+
+
+def work(loop, interval, write):
+    """Worker loop: run due jobs, then sleep for interval seconds if looping"""
+    worker = get_worker_name()
+    while True:
+        succeeded, failed = run_jobs(worker)
+        if succeeded or failed or not loop:
+            write(f"{worker}: ran {succeeded + failed} job(s), {failed} failed")
+
+        if not loop:
+            return
+        time.sleep(interval)
+
+
+def worker_process(loop, interval):
+    """Entry point of a worker process"""
+    django.setup()
+    try:
+        work(loop, interval, functools.partial(print, flush=True))
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (extracted artifacts, Rust crates, Conan packages, dependency indexing, bundle prewarming)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (default: 1, runs in this process)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for due jobs every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds between polls when the queue is empty in --loop mode (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            work(options['loop'], options['interval'], self.stdout.write)
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=worker_process, args=(options['loop'], options['interval']))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0005_binarypackage_rust_crate_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BundleCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(db_index=True, help_text='SHA256 of the resolved binary set and bundle options', max_length=64, unique=True)),
+                ('bundle_file', models.FileField(upload_to='bundle_cache/')),
+                ('size', models.BigIntegerField(default=0, help_text='File size in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('hit_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Bundle cache entries',
+                'ordering': ['-last_accessed'],
+            },
+        ),
+    ]
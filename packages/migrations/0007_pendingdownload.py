@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0006_bundlecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingDownload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('binary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='packages.binarypackage')),
+                ('package', models.ForeignKey(blank=True, help_text='Set when the download also counts towards the package total', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='packages.package')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0007_pendingdownload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BinaryDependency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('version', models.CharField(max_length=100)),
+                ('package_id', models.CharField(blank=True, max_length=64)),
+                ('position', models.IntegerField(default=0)),
+                ('binary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='graph_dependencies', to='packages.binarypackage')),
+                ('dependency_binary', models.ForeignKey(blank=True, help_text='Uploaded binary matching name/version/package_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='required_by_binaries', to='packages.binarypackage')),
+            ],
+            options={
+                'verbose_name_plural': 'Binary dependencies',
+                'ordering': ['binary', 'position'],
+                'indexes': [models.Index(fields=['name', 'version', 'package_id'], name='packages_bi_name_834951_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0008_binarydependency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='binarypackage',
+            name='extracted_file',
+            field=models.FileField(blank=True, help_text='Precomputed extracted-format ZIP for non-Conan users', null=True, upload_to='extracted/'),
+        ),
+        migrations.AddField(
+            model_name='binarypackage',
+            name='extracted_size',
+            field=models.BigIntegerField(default=0, help_text='Extracted ZIP size in bytes'),
+        ),
+        migrations.AddField(
+            model_name='binarypackage',
+            name='extracted_source_sha256',
+            field=models.CharField(blank=True, help_text='sha256 of the binary the extracted ZIP was built from', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0009_binarypackage_extracted_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='binarypackage',
+            name='rust_crate_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
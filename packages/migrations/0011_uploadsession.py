@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:37
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0010_binarypackage_rust_crate_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('package_name', models.CharField(max_length=255)),
+                ('version', models.CharField(max_length=100)),
+                ('package_id', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField(help_text='Expected file size in bytes')),
+                ('sha256', models.CharField(help_text='Expected SHA256 checksum', max_length=64)),
+                ('binary_file', models.FileField(help_text='Target object in MinIO', upload_to='binaries/')),
+                ('multipart_upload_id', models.CharField(max_length=255)),
+                ('part_size', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('complete', 'Complete'), ('aborted', 'Aborted'), ('failed', 'Failed')], db_index=True, default='open', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(help_text='When the presigned part URLs stop working')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0011_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(max_length=255, upload_to='blobs/')),
+                ('size', models.BigIntegerField(default=0, help_text='File size in bytes')),
+                ('ref_count', models.IntegerField(db_index=True, default=0, help_text='BinaryPackage files referencing this blob')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last time the reference count changed')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
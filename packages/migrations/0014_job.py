@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0013_pendingdeletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='Registered job handler name', max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Keyword arguments for the handler')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_by', models.CharField(blank=True, help_text='Worker that claimed the job last', max_length=100)),
+            ],
+        ),
+    ]
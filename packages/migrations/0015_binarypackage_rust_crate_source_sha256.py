@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0014_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='binarypackage',
+            name='rust_crate_source_sha256',
+            field=models.CharField(blank=True, help_text='sha256 of the binary the Rust crate was built from', max_length=64),
+        ),
+    ]
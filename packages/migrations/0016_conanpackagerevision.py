@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-15 21:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0015_binarypackage_rust_crate_source_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConanPackageRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.CharField(help_text='Conan package revision (manifest hash)', max_length=32)),
+                ('manifest', models.TextField(help_text='Content of conanmanifest.txt')),
+                ('conaninfo', models.TextField(blank=True, help_text='Content of conaninfo.txt')),
+                ('package_file', models.FileField(help_text='conan_package.tgz', max_length=255, upload_to='blobs/')),
+                ('package_sha256', models.CharField(max_length=64)),
+                ('package_size', models.BigIntegerField(default=0, help_text='File size in bytes')),
+                ('source_sha256', models.CharField(blank=True, help_text='sha256 of the binary the package was built from', max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Revision time reported to Conan')),
+                ('binary', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='conan_revision', to='packages.binarypackage')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-15 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0016_conanpackagerevision'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='binary_file',
+            field=models.FileField(help_text='Staging object in MinIO', upload_to='uploads/'),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('completing', 'Completing'), ('complete', 'Complete'), ('aborted', 'Aborted'), ('failed', 'Failed')], db_index=True, default='open', max_length=20),
+        ),
+    ]
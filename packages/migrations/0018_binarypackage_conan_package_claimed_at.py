@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0017_uploadsession_staging'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='binarypackage',
+            name='conan_package_claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a build of the Conan package was claimed', null=True),
+        ),
+    ]
@@ -5,12 +5,28 @@ from .package import Package
 from .package_version import PackageVersion
 from .binary_package import BinaryPackage
 from .dependency import Dependency
+from .binary_dependency import BinaryDependency
 from .topic import Topic
+from .bundle_cache import BundleCacheEntry
+from .pending_download import PendingDownload
+from .upload_session import UploadSession
+from .stored_blob import StoredBlob
+from .pending_deletion import PendingDeletion
+from .job import Job
+from .conan_package_revision import ConanPackageRevision
 
 __all__ = [
     'Package',
     'PackageVersion',
     'BinaryPackage',
     'Dependency',
+    'BinaryDependency',
     'Topic',
+    'BundleCacheEntry',
+    'PendingDownload',
+    'UploadSession',
+    'StoredBlob',
+    'PendingDeletion',
+    'Job',
+    'ConanPackageRevision',
 ]
@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class BinaryDependency(models.Model):
+    """
+    One dependency of a binary, normalized from BinaryPackage.dependency_graph.
+
+    The Conan graph already lists the full transitive closure, so the edges of a
+    binary are its complete dependency set and can be fetched in one query.
+    dependency_binary links to the matching uploaded binary, if there is one.
+    """
+    binary = models.ForeignKey('BinaryPackage', on_delete=models.CASCADE,
+                               related_name='graph_dependencies')
+    dependency_binary = models.ForeignKey('BinaryPackage', on_delete=models.SET_NULL,
+                                          null=True, blank=True, related_name='required_by_binaries',
+                                          help_text="Uploaded binary matching name/version/package_id")
+
+    # Reference as recorded in the graph
+    name = models.CharField(max_length=255)
+    version = models.CharField(max_length=100)
+    package_id = models.CharField(max_length=64, blank=True)
+
+    # Position of the node in the original graph (keeps bundle ordering stable)
+    position = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['binary', 'position']
+        verbose_name_plural = 'Binary dependencies'
+        indexes = [
+            models.Index(fields=['name', 'version', 'package_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.binary.package_version} -> {self.name}/{self.version}:{self.package_id[:8]}"
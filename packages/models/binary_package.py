@@ -31,6 +31,20 @@ class BinaryPackage(models.Model):
     # Rust crate file (.crate archive)
     rust_crate_file = models.FileField(upload_to='rust_crates/', blank=True, null=True,
                                        help_text="Generated Rust -sys crate archive")
+    rust_crate_sha256 = models.CharField(max_length=64, blank=True)
+    rust_crate_source_sha256 = models.CharField(max_length=64, blank=True,
+                                                help_text="sha256 of the binary the Rust crate was built from")
+
+    # Extracted-format ZIP (include/, lib/, bin/, cmake/) built from binary_file
+    extracted_file = models.FileField(upload_to='extracted/', blank=True, null=True,
+                                      help_text="Precomputed extracted-format ZIP for non-Conan users")
+    extracted_size = models.BigIntegerField(default=0, help_text="Extracted ZIP size in bytes")
+    extracted_source_sha256 = models.CharField(max_length=64, blank=True,
+                                               help_text="sha256 of the binary the extracted ZIP was built from")
+
+    # Conan package build in progress (see packages.conan_layout.get_conan_package)
+    conan_package_claimed_at = models.DateTimeField(null=True, blank=True,
+                                                    help_text="When a build of the Conan package was claimed")
 
     # Checksums
     sha256 = models.CharField(max_length=64, blank=True)
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class BundleCacheEntry(models.Model):
+    """
+    A cached, fully built bundle ZIP stored in MinIO.
+
+    Keyed by a hash of the exact set of binaries (package, version, package_id, sha256)
+    the bundle was built from, so identical requests reuse one stored object.
+    """
+    cache_key = models.CharField(max_length=64, unique=True, db_index=True,
+                                 help_text="SHA256 of the resolved binary set and bundle options")
+    bundle_file = models.FileField(upload_to='bundle_cache/')
+    size = models.BigIntegerField(default=0, help_text="File size in bytes")
+
+    # LRU bookkeeping
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(auto_now_add=True, db_index=True)
+    hit_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-last_accessed']
+        verbose_name_plural = 'Bundle cache entries'
+
+    def __str__(self):
+        return f"Bundle {self.cache_key[:12]} ({self.size} bytes)"
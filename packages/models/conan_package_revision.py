@@ -0,0 +1,27 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ConanPackageRevision(models.Model):
+    """
+    A binary in the layout the Conan v2 remote protocol serves (see packages.conan_layout).
+
+    conan_package.tgz holds the package folder without conaninfo.txt and
+    conanmanifest.txt, which are kept here as text. The revision is the hash
+    of the manifest, like Conan computes it.
+    """
+    binary = models.OneToOneField('BinaryPackage', on_delete=models.CASCADE, related_name='conan_revision')
+    revision = models.CharField(max_length=32, help_text="Conan package revision (manifest hash)")
+    manifest = models.TextField(help_text="Content of conanmanifest.txt")
+    conaninfo = models.TextField(blank=True, help_text="Content of conaninfo.txt")
+
+    package_file = models.FileField(upload_to='blobs/', max_length=255, help_text="conan_package.tgz")
+    package_sha256 = models.CharField(max_length=64)
+    package_size = models.BigIntegerField(default=0, help_text="File size in bytes")
+    source_sha256 = models.CharField(max_length=64, blank=True,
+                                     help_text="sha256 of the binary the package was built from")
+
+    created_at = models.DateTimeField(default=timezone.now, help_text="Revision time reported to Conan")
+
+    def __str__(self):
+        return f"{self.binary.package_id}#{self.revision}"
@@ -0,0 +1,24 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Background work queued for the run_workers command (see packages.jobs).
+
+    A job is visible to workers once run_after has passed. Claiming it pushes
+    run_after out by the visibility timeout, so the job of a worker that died
+    is picked up again; a job that raised is retried with backoff. Finished
+    jobs are deleted.
+    """
+    kind = models.CharField(max_length=50, help_text="Registered job handler name")
+    payload = models.JSONField(default=dict, blank=True, help_text="Keyword arguments for the handler")
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, help_text="Worker that claimed the job last")
+
+    def __str__(self):
+        return f"{self.kind} job {self.payload}"
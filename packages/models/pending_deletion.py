@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class PendingDeletion(models.Model):
+    """
+    A stored object that is no longer referenced and still has to be deleted.
+
+    Written in the same transaction as the delete of the rows that used the
+    object (so a rolled-back delete leaves nothing queued), then drained in
+    batches by the drain_storage_deletions command.
+    """
+    name = models.CharField(max_length=255, help_text="Object name in the default storage")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Failed deletions stay queued for a retry
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Pending deletion of {self.name}"
@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class PendingDownload(models.Model):
+    """
+    Append-only record of a download that hasn't been added to the counters yet.
+
+    Used when DOWNLOAD_COUNT_MODE is 'buffered': downloads insert one small row
+    here instead of updating BinaryPackage/Package, and the
+    flush_download_counts command folds them into download_count in batches.
+    """
+    binary = models.ForeignKey('BinaryPackage', on_delete=models.CASCADE, related_name='+')
+    package = models.ForeignKey('Package', on_delete=models.CASCADE, null=True, blank=True, related_name='+',
+                                help_text="Set when the download also counts towards the package total")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pending download of binary {self.binary_id}"
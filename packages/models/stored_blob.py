@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class StoredBlob(models.Model):
+    """
+    One stored object in MinIO, addressed by the sha256 of its content.
+
+    Binaries and Rust crates are stored under blobs/<sha256[:2]>/<sha256>...,
+    so identical content uploaded under different refs (or re-uploaded by CI)
+    is stored once. ref_count is the number of BinaryPackage file fields
+    (binary_file and rust_crate_file) pointing at the object.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to='blobs/', max_length=255)
+    size = models.BigIntegerField(default=0, help_text="File size in bytes")
+    ref_count = models.IntegerField(default=0, db_index=True,
+                                    help_text="BinaryPackage files referencing this blob")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last time the reference count changed")
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
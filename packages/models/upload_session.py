@@ -0,0 +1,51 @@
+import uuid
+from django.db import models
+
+
+class UploadSession(models.Model):
+    """
+    A direct-to-MinIO upload of a binary, between start and finalize.
+
+    The client uploads the parts of an S3 multipart upload straight to MinIO
+    with presigned URLs, under a staging name of its own (uploads/); finalizing
+    verifies size and sha256 of the assembled object before it is copied to
+    its blob and any BinaryPackage row points at it.
+    """
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETING = 'completing'
+    STATUS_COMPLETE = 'complete'
+    STATUS_ABORTED = 'aborted'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETING, 'Completing'),
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_ABORTED, 'Aborted'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    # Sessions whose staging object is still in use
+    ACTIVE_STATUSES = [STATUS_OPEN, STATUS_COMPLETING]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    # What is being uploaded
+    package_name = models.CharField(max_length=255)
+    version = models.CharField(max_length=100)
+    package_id = models.CharField(max_length=64)
+    size = models.BigIntegerField(help_text="Expected file size in bytes")
+    sha256 = models.CharField(max_length=64, help_text="Expected SHA256 checksum")
+
+    # Where it goes
+    binary_file = models.FileField(upload_to='uploads/', help_text="Staging object in MinIO")
+    multipart_upload_id = models.CharField(max_length=255)
+    part_size = models.BigIntegerField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(help_text="When the presigned part URLs stop working")
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Upload {self.package_name}/{self.version}:{self.package_id} ({self.status})"
@@ -0,0 +1,135 @@
+"""
+Direct-to-MinIO multipart uploads
+
+Large binaries don't need to pass through Django: the server starts an S3
+multipart upload, hands the client one presigned URL per part, and the
+client PUTs the parts straight to MinIO (in parallel). Django only sees the
+small start/finalize requests.
+
+All helpers take the FieldFile of the target object, like storage_utils.
+"""
+import math
+from django.conf import settings
+from storages.backends.s3boto3 import S3Boto3Storage
+from packages.storage_utils import get_object_key, get_storage_key
+
+
+DEFAULT_PART_SIZE = 16 * 1024 * 1024  # 16 MB
+
+# S3 limits: parts are at least 5 MB (except the last) and at most 10000 per upload
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+DEFAULT_SESSION_EXPIRY = 6 * 3600  # seconds
+
+
+def supports_direct_upload(storage):
+    """Direct uploads need an S3-compatible backend (MinIO) that can presign URLs"""
+    return isinstance(storage, S3Boto3Storage)
+
+
+def get_part_size():
+    return max(getattr(settings, 'UPLOAD_PART_SIZE', DEFAULT_PART_SIZE), MIN_PART_SIZE)
+
+
+def get_session_expiry():
+    return getattr(settings, 'UPLOAD_SESSION_EXPIRY', DEFAULT_SESSION_EXPIRY)
+
+
+def plan_parts(size, part_size=None):
+    """
+    Split an upload of `size` bytes into parts.
+
+    The part size grows past the configured one if the file would otherwise
+    need more than MAX_PARTS parts.
+
+    Returns:
+        (part_size, part_count)
+    """
+    part_size = max(part_size or get_part_size(), math.ceil(size / MAX_PARTS))
+    return part_size, max(1, math.ceil(size / part_size))
+
+
+def _client(field_file):
+    return field_file.storage.bucket.meta.client
+
+
+def _params(field_file):
+    return {'Bucket': field_file.storage.bucket_name, 'Key': get_object_key(field_file)}
+
+
+def start_multipart_upload(field_file, content_type='application/gzip'):
+    """
+    Start a multipart upload for the field file's object.
+
+    Returns:
+        The S3 UploadId
+    """
+    response = _client(field_file).create_multipart_upload(ContentType=content_type, **_params(field_file))
+    return response['UploadId']
+
+
+def presign_part_urls(field_file, upload_id, part_count, expires_in=None):
+    """
+    Presigned PUT URLs for parts 1..part_count of a multipart upload.
+
+    Returns:
+        List of {'part_number': n, 'url': url}
+    """
+    client = _client(field_file)
+    expires_in = expires_in or get_session_expiry()
+    return [
+        {
+            'part_number': part_number,
+            'url': client.generate_presigned_url(
+                'upload_part',
+                Params=dict(_params(field_file), UploadId=upload_id, PartNumber=part_number),
+                ExpiresIn=expires_in
+            ),
+        }
+        for part_number in range(1, part_count + 1)
+    ]
+
+
+def complete_multipart_upload(field_file, upload_id, parts):
+    """
+    Assemble the uploaded parts into the final object.
+
+    Args:
+        parts: List of {'part_number': n, 'etag': etag} reported by the client
+    """
+    _client(field_file).complete_multipart_upload(
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [
+            {'PartNumber': int(part['part_number']), 'ETag': part['etag']}
+            for part in sorted(parts, key=lambda part: int(part['part_number']))
+        ]},
+        **_params(field_file)
+    )
+
+
+def abort_multipart_upload(field_file, upload_id):
+    """Abort a multipart upload, releasing the parts stored so far"""
+    _client(field_file).abort_multipart_upload(UploadId=upload_id, **_params(field_file))
+
+
+def copy_object(field_file, name):
+    """
+    Copy a stored object to another name in the same storage.
+
+    On MinIO the copy is done server-side (in parts for large objects);
+    other backends copy through Django.
+
+    Returns:
+        The name the copy was stored under
+    """
+    storage = field_file.storage
+    name = storage.get_available_name(name)
+    if not supports_direct_upload(storage):
+        return storage.save(name, field_file)
+    _client(field_file).copy(
+        {'Bucket': storage.bucket_name, 'Key': get_object_key(field_file)},
+        storage.bucket_name,
+        get_storage_key(storage, name)
+    )
+    return name
@@ -0,0 +1,133 @@
+"""
+Batch resolution of bundle contents
+
+Turns a binary's dependency graph into the list of binaries a bundle is
+built from. Every uploaded dependency is fetched in a single query, with its
+PackageVersion (recipe) and Package preloaded, so the cost of a bundle does
+not grow with the number of graph nodes.
+"""
+import json
+from packages.models import BinaryPackage, BinaryDependency
+
+
+def iter_graph_dependencies(dependency_graph):
+    """
+    Parse the dependency nodes out of a Conan graph.
+
+    Skips the root node ("0", the package itself) and nodes without a
+    name/version reference.
+
+    Args:
+        dependency_graph: Graph dict (or JSON string) from conan graph info
+
+    Yields:
+        Dicts with 'name', 'version' and 'package_id' ('' if the node has none)
+    """
+    if not dependency_graph:
+        return
+    if isinstance(dependency_graph, str):
+        try:
+            dependency_graph = json.loads(dependency_graph)
+        except json.JSONDecodeError:
+            return
+
+    nodes = dependency_graph.get('graph', {}).get('nodes', {})
+    for node_id, node in nodes.items():
+        # Skip root node (the package itself)
+        if node_id == "0":
+            continue
+
+        # Parse package reference (e.g., "boost/1.81.0" or "boost/1.81.0#hash")
+        ref = node.get('ref', '')
+        if '/' not in ref:
+            continue
+
+        dep_name, dep_version_with_hash = ref.split('/', 1)
+        # Remove recipe revision hash if present (e.g., "1.0.0#hash" -> "1.0.0")
+        dep_version = dep_version_with_hash.split('#')[0]
+
+        yield {
+            'name': dep_name,
+            'version': dep_version,
+            'package_id': node.get('package_id') or '',
+        }
+
+
+def find_binaries(dependencies):
+    """
+    Look up the uploaded binaries for a list of dependencies in one query.
+
+    Args:
+        dependencies: Iterable of dicts with 'name', 'version' and 'package_id'
+
+    Returns:
+        Dict mapping (name, version, package_id) to BinaryPackage, with
+        package_version and package preloaded
+    """
+    package_ids = {dep['package_id'] for dep in dependencies if dep['package_id']}
+    if not package_ids:
+        return {}
+
+    candidates = (
+        BinaryPackage.objects.filter(package_id__in=package_ids)
+        .select_related('package_version__package')
+        .defer('dependency_graph')
+    )
+    return {
+        (bin_pkg.package_version.package.name, bin_pkg.package_version.version, bin_pkg.package_id): bin_pkg
+        for bin_pkg in candidates
+    }
+
+
+def resolve_graph(dependency_graph):
+    """
+    Resolve every dependency node of a graph to its uploaded binary.
+
+    Args:
+        dependency_graph: Graph dict (or JSON string) from conan graph info
+
+    Returns:
+        List of dicts in graph order with 'name', 'version', 'package_id' and
+        'binary' (BinaryPackage, or None if not in the registry)
+    """
+    dependencies = list(iter_graph_dependencies(dependency_graph))
+    binaries = find_binaries(dependencies)
+    for dep in dependencies:
+        dep['binary'] = binaries.get((dep['name'], dep['version'], dep['package_id']))
+    return dependencies
+
+
+def resolve_bundle_dependencies(binary):
+    """
+    Resolve the dependency binaries of a bundle's main binary.
+
+    Reads the BinaryDependency index when it exists and falls back to the
+    stored graph otherwise, so a bundle costs one or two queries however
+    large its graph is.
+
+    Args:
+        binary: Main BinaryPackage of the bundle
+
+    Returns:
+        List of dicts in graph order with 'name', 'version', 'package_id' and
+        'binary' (BinaryPackage, or None if not in the registry). Each binary's
+        package_version.recipe_content is available without further queries.
+    """
+    edges = (
+        BinaryDependency.objects.filter(binary=binary)
+        .select_related('dependency_binary__package_version__package')
+        .defer('dependency_binary__dependency_graph')
+        .order_by('position')
+    )
+    dependencies = [
+        {
+            'name': edge.name,
+            'version': edge.version,
+            'package_id': edge.package_id,
+            'binary': edge.dependency_binary,
+        }
+        for edge in edges
+    ]
+    if dependencies:
+        return dependencies
+    return resolve_graph(binary.dependency_graph)
@@ -0,0 +1,171 @@
+"""
+Rust crate bundles
+
+A Rust bundle is a ZIP with the requested crate and the crates of all its
+dependencies under crates/, with every Cargo.toml rewritten to point at its
+sibling crates through path dependencies. The ZIP is transcoded straight
+from the stored .crate tarballs (no scratch directory); manifests are
+rewritten as they pass through. Finished bundles go to the bundle cache,
+keyed by the crates' sha256s.
+"""
+import logging
+import re
+import tarfile
+from packages.compression import get_default_compression_policy
+from packages.extracted import ExtractionError, _iter_members, _write_member
+from packages.storage_utils import open_stream
+from packages.zip_stream import ZipStream
+
+
+logger = logging.getLogger(__name__)
+
+
+def crate_name_for(package_name):
+    """Crate name generated for a Conan package ('my_lib' -> 'my-lib-sys')"""
+    return f"{package_name.replace('_', '-')}-sys"
+
+
+def rewrite_manifest(content, dep_crate_names):
+    """
+    Turn plain version dependencies on bundled crates into path dependencies.
+
+    'zlib-sys = "1.2.13"' becomes
+    'zlib-sys = { version = "1.2.13", path = "../zlib-sys" }'.
+
+    Args:
+        content: Cargo.toml text
+        dep_crate_names: Names of the crates shipped alongside in the bundle
+
+    Returns:
+        Rewritten Cargo.toml text
+    """
+    for dep_name in dep_crate_names:
+        pattern = f'{re.escape(dep_name)} = "([^"]+)"'
+        content = re.sub(
+            pattern,
+            lambda match, name=dep_name: f'{name} = {{ version = "{match.group(1)}", path = "../{name}" }}',
+            content
+        )
+    return content
+
+
+def build_readme(main_crate_name, version, dep_crate_names):
+    """README.md placed in crates/ of every Rust bundle"""
+    readme = f"""# Rust Crate Bundle: {main_crate_name}
+
+This bundle contains {main_crate_name} and all its dependencies.
+
+## Contents
+- {main_crate_name}/ - Main crate
+"""
+    for dep in dep_crate_names:
+        readme += f"- {dep}/ - Dependency\n"
+    readme += f"""
+## Usage
+
+1. Extract this bundle
+2. Copy the crates/ directory to your project
+3. In your Cargo.toml, add:
+   ```toml
+   [dependencies]
+   {main_crate_name} = {{ version = "{version}", path = "crates/{main_crate_name}" }}
+   ```
+4. Run: cargo build
+
+Generated by ConanCrates
+"""
+    return readme
+
+
+def get_bundle_crates(binary, dependencies):
+    """
+    Crates that go into the Rust bundle of a binary, main crate first.
+
+    Args:
+        binary: Main BinaryPackage (with a rust_crate_file)
+        dependencies: Resolved dependencies (see resolve_bundle_dependencies())
+
+    Returns:
+        List of (crate_name, BinaryPackage) - dependencies without an uploaded
+        crate are left out
+    """
+    crates = [(crate_name_for(binary.package_version.package.name), binary)]
+    for dep in dependencies:
+        dep_bin = dep['binary']
+        if dep_bin and dep_bin.rust_crate_file and dep_bin.rust_crate_file.name:
+            crates.append((crate_name_for(dep['name']), dep_bin))
+    return crates
+
+
+def get_cache_members(crates):
+    """
+    Bundle cache members of a Rust bundle, or None if it can't be cached.
+
+    Crates uploaded before their sha256 was recorded have nothing to key
+    on, so bundles containing them are always built fresh.
+    """
+    members = []
+    for _, crate_binary in crates:
+        if not crate_binary.rust_crate_sha256:
+            return None
+        members.append((
+            crate_binary.package_version.package.name,
+            crate_binary.package_version.version,
+            crate_binary.package_id,
+            crate_binary.rust_crate_sha256,
+        ))
+    return members
+
+
+def iter_rust_bundle_zip(crates, readme, policy=None):
+    """
+    Transcode .crate tarballs into a Rust bundle ZIP.
+
+    Generator yielding ZIP bytes. Members are copied into crates/ as they are
+    read from storage; each crate's top-level Cargo.toml is rewritten to use
+    path dependencies on the other crates in the bundle. When two crates
+    produce the same path the first one is kept. Crates that can't be read
+    are skipped.
+
+    Args:
+        crates: List of (crate_name, BinaryPackage), see get_bundle_crates()
+        readme: crates/README.md content
+        policy: Compression policy (defaults to BUNDLE_COMPRESSION_POLICY)
+    """
+    zip_stream = ZipStream(policy=policy or get_default_compression_policy())
+    dep_crate_names = [crate_name for crate_name, _ in crates[1:]]
+    written = set()
+
+    for crate_name, crate_binary in crates:
+        try:
+            source = open_stream(crate_binary.rust_crate_file)
+        except Exception as e:
+            logger.warning(f"  Skipping crate {crate_name}: {e}")
+            continue
+        try:
+            tar = tarfile.open(fileobj=source, mode='r|gz')
+        except (tarfile.TarError, OSError) as e:
+            source.close()
+            logger.warning(f"  Skipping crate {crate_name}: {e}")
+            continue
+
+        try:
+            for member, parts in _iter_members(tar):
+                arcname = '/'.join(('crates',) + parts)
+                if arcname in written:
+                    continue
+                written.add(arcname)
+
+                if parts == (crate_name, 'Cargo.toml') and member.isfile():
+                    manifest = tar.extractfile(member).read().decode('utf-8')
+                    yield from zip_stream.write_str(arcname, rewrite_manifest(manifest, dep_crate_names))
+                else:
+                    yield from _write_member(zip_stream, tar, member, arcname)
+        except (ExtractionError, UnicodeDecodeError) as e:
+            logger.warning(f"  Stopped reading crate {crate_name}: {e}")
+        finally:
+            tar.close()
+            source.close()
+
+    yield from zip_stream.write_str('crates/README.md', readme)
+    yield from zip_stream.close()
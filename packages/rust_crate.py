@@ -0,0 +1,284 @@
+"""
+Server-side Rust crate generation
+
+Every binary gets a Rust -sys crate (.crate archive, a tar.gz) derived from
+its stored Conan tarball and dependency_graph:
+
+- lib/*.a, *.lib, *.so, *.dylib are copied to native/current/
+- include/ is copied as-is
+- Cargo.toml (with a path dependency per graph dependency), build.rs
+  (linking the libraries statically), src/lib.rs and README.md are generated
+
+The tarball is read in one sequential pass from storage and the crate is
+written to a temporary file, then stored as a content-addressed blob. The
+output is deterministic (fixed gzip/tar timestamps), so rebuilding a crate
+from the same binary reuses the stored blob.
+
+Crates are built by a build_rust_crate job after upload (see packages.jobs),
+or on first download for binaries that don't have a current one.
+"""
+import gzip
+import io
+import tarfile
+import tempfile
+from pathlib import PurePosixPath
+from django.core.files import File
+from django.db import transaction
+from packages.blobs import CRATE_SUFFIX, acquire_blob, discard_upload, release_file, store_upload
+from packages.extracted import _is_recipe_path, _is_safe_link, _iter_members, _open_tar_stream, map_extracted_path
+from packages.models import BinaryPackage
+from packages.resolver import iter_graph_dependencies
+from packages.rust_bundle import crate_name_for
+
+
+# Library files copied into native/current/ (direct children of lib/)
+LIBRARY_SUFFIXES = ('.a', '.lib', '.so', '.dylib')
+
+
+def library_name(filename):
+    """
+    Name to link a library file with.
+
+    Only Unix-style libraries (.a, .so, .dylib) have their "lib" prefix
+    stripped; Windows .lib files don't follow that convention.
+    """
+    path = PurePosixPath(filename)
+    name = path.stem
+    if name.startswith('lib') and path.suffix in ('.a', '.so', '.dylib'):
+        name = name[3:]
+    return name
+
+
+def build_cargo_toml(package_name, version, dependencies):
+    """Cargo.toml of a -sys crate, with path dependencies on sibling crates"""
+    crate_name = crate_name_for(package_name)
+
+    dependencies_section = ""
+    if dependencies:
+        dependencies_section = "\n[dependencies]\n"
+        for dep in dependencies:
+            dep_crate_name = crate_name_for(dep['name'])
+            # Use path dependencies so crates work when extracted together
+            dependencies_section += f'{dep_crate_name} = {{ version = "{dep["version"]}", path = "../{dep_crate_name}" }}\n'
+
+    return f'''[package]
+name = "{crate_name}"
+version = "{version}"
+edition = "2021"
+links = "{package_name}"
+
+# Include the binaries and headers in the published crate
+include = [
+    "src/**/*",
+    "native/**/*",
+    "include/**/*",
+    "build.rs",
+    "Cargo.toml",
+]
+
+[lib]
+name = "{crate_name.replace('-', '_')}"
+path = "src/lib.rs"
+{dependencies_section}'''
+
+
+def build_build_rs(libraries):
+    """build.rs linking the crate's libraries statically from native/current/"""
+    lib_links = '\n    '.join(f'println!("cargo:rustc-link-lib=static={name}");' for name in libraries)
+    return f'''fn main() {{
+    // Tell cargo where to find the pre-compiled libraries
+    let manifest_dir = std::env::var("CARGO_MANIFEST_DIR").unwrap();
+    let lib_path = std::path::Path::new(&manifest_dir).join("native/current");
+
+    println!("cargo:rustc-link-search=native={{}}", lib_path.display());
+
+    // Link the libraries
+    {lib_links}
+
+    // Re-run if libraries change
+    println!("cargo:rerun-if-changed=native/");
+}}
+'''
+
+
+def build_lib_rs(package_name):
+    """src/lib.rs placeholder for the crate's FFI declarations"""
+    return f'''//! Rust FFI bindings for {package_name}
+//!
+//! This crate provides pre-compiled binaries for {package_name}.
+//! The binaries are linked statically.
+
+#![allow(non_upper_case_globals)]
+#![allow(non_camel_case_types)]
+#![allow(non_snake_case)]
+
+// Add FFI declarations here, or generate them with bindgen from the C
+// headers in include/
+//
+// Example:
+// extern "C" {{
+//     pub fn my_function() -> i32;
+// }}
+'''
+
+
+def build_crate_readme(package_name, version, package_id, libraries):
+    """README.md of a -sys crate"""
+    crate_name = crate_name_for(package_name)
+    library_list = '\n'.join(f"- {name}" for name in libraries)
+    return f'''# {crate_name}
+
+Rust FFI bindings for {package_name} {version}.
+
+This crate contains pre-compiled binaries from the Conan package.
+
+## Libraries included:
+
+{library_list}
+
+## Usage
+
+Add this to your `Cargo.toml`:
+
+```toml
+[dependencies]
+{crate_name} = "{version}"
+```
+
+## Building
+
+This crate includes pre-compiled static libraries and does not require compilation
+of the C/C++ source code. The libraries are linked during the Rust build process.
+
+## Source
+
+Generated by ConanCrates from Conan package: {package_name}/{version}:{package_id}
+'''
+
+
+def _add_text(tar, arcname, text):
+    data = text.encode('utf-8')
+    info = tarfile.TarInfo(arcname)
+    info.size = len(data)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_rust_crate(binary, output):
+    """
+    Write the .crate archive of a binary to a file object.
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    package_name = binary.package_version.package.name
+    version = binary.package_version.version
+    crate_name = crate_name_for(package_name)
+    libraries = []
+
+    # mtime=0 and no filename keep the gzip header (and so the blob) stable
+    with gzip.GzipFile(filename='', fileobj=output, mode='wb', mtime=0) as gz, \
+            tarfile.open(fileobj=gz, mode='w') as crate:
+        source, tar = _open_tar_stream(binary)
+        try:
+            for member, parts in _iter_members(tar):
+                if _is_recipe_path(parts):
+                    continue
+                path = map_extracted_path(parts)
+                if path is None:
+                    continue
+
+                top, _, rest = path.partition('/')
+                if top == 'include' and rest:
+                    arcname = f'{crate_name}/{path}'
+                elif top == 'lib' and '/' not in rest and rest.endswith(LIBRARY_SUFFIXES) and member.isfile():
+                    arcname = f'{crate_name}/native/current/{rest}'
+                    if library_name(rest) not in libraries:
+                        libraries.append(library_name(rest))
+                else:
+                    continue
+                if member.issym() and not _is_safe_link(arcname, member.linkname):
+                    continue
+
+                info = tarfile.TarInfo(arcname)
+                info.type = member.type
+                info.size = member.size if member.isfile() else 0
+                info.linkname = member.linkname
+                info.mode = (member.mode & 0o777) or 0o644
+                info.mtime = member.mtime
+                crate.addfile(info, tar.extractfile(member) if member.isfile() else None)
+        finally:
+            tar.close()
+            source.close()
+
+        dependencies = list(iter_graph_dependencies(binary.dependency_graph))
+        _add_text(crate, f'{crate_name}/Cargo.toml', build_cargo_toml(package_name, version, dependencies))
+        _add_text(crate, f'{crate_name}/build.rs', build_build_rs(libraries))
+        _add_text(crate, f'{crate_name}/src/lib.rs', build_lib_rs(package_name))
+        _add_text(crate, f'{crate_name}/README.md',
+                  build_crate_readme(package_name, version, binary.package_id, libraries))
+
+
+def is_rust_crate_current(binary):
+    """
+    Check whether the stored crate belongs to the current binary_file.
+
+    Crates without a recorded source (uploaded before crates were built on
+    the server) are kept as they are.
+    """
+    return bool(
+        binary.rust_crate_file
+        and binary.rust_crate_file.name
+        and binary.rust_crate_source_sha256 in ('', binary.sha256)
+    )
+
+
+def generate_rust_crate(binary):
+    """
+    Build the Rust crate of a binary and store it in binary.rust_crate_file.
+
+    The crate replaces any previously stored one, unless the binary was
+    re-uploaded while it was being built (the newer upload builds its own).
+
+    Returns:
+        The rust_crate_file FieldFile
+
+    Raises:
+        ExtractionError: If the tarball can't be read or unpacked
+    """
+    filename = f"{crate_name_for(binary.package_version.package.name)}-{binary.package_version.version}.crate"
+
+    with tempfile.TemporaryFile() as tmp:
+        write_rust_crate(binary, tmp)
+        tmp.seek(0)
+        ingested = store_upload(File(tmp, name=filename), CRATE_SUFFIX, scan=False)
+
+    with transaction.atomic():
+        current = BinaryPackage.objects.select_for_update().get(pk=binary.pk)
+        if current.sha256 != binary.sha256:
+            discard_upload(ingested.name)
+            return current.rust_crate_file
+
+        replaced = current.rust_crate_file
+        binary.rust_crate_file = acquire_blob(ingested)
+        binary.rust_crate_sha256 = ingested.sha256
+        binary.rust_crate_source_sha256 = binary.sha256
+        binary.save(update_fields=['rust_crate_file', 'rust_crate_sha256', 'rust_crate_source_sha256'])
+
+    release_file(replaced)
+    return binary.rust_crate_file
+
+
+def get_rust_crate(binary):
+    """
+    Get the stored Rust crate of a binary, building it on first use.
+
+    Returns:
+        The rust_crate_file FieldFile, or None if the binary has no crate and
+        no tarball to build one from
+    """
+    if is_rust_crate_current(binary):
+        return binary.rust_crate_file
+    if not binary.binary_file or not binary.binary_file.name:
+        return binary.rust_crate_file if binary.rust_crate_file and binary.rust_crate_file.name else None
+    return generate_rust_crate(binary)
@@ -1,44 +1,70 @@
 """
-Signal handlers for cleaning up MinIO files when database objects are deleted.
+Signal handlers for cleaning up MinIO files when database objects are deleted,
+and for keeping the dependency graph index in sync with BinaryPackage
+(through an index_dependencies job, see packages.jobs).
+
+Files are not deleted here: their names are queued as PendingDeletion rows
+in the deleting transaction and removed in batches by the
+drain_storage_deletions command (see packages.storage_cleanup).
 """
-from django.db.models.signals import post_delete, pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import Package, PackageVersion, BinaryPackage
+from .models import Package, PackageVersion, BinaryPackage, BinaryDependency, BundleCacheEntry, ConanPackageRevision
+from .jobs import enqueue, get_queue_mode
+from .blobs import release_file
+from .storage_cleanup import schedule_deletion
 
 
 @receiver(pre_delete, sender=BinaryPackage)
 def delete_binary_files(sender, instance, **kwargs):
     """
-    Delete binary_file and rust_crate_file from MinIO when BinaryPackage is deleted.
+    Clean up MinIO when a BinaryPackage is deleted.
+
+    binary_file and rust_crate_file are released (blobs shared with other
+    binaries stay; see packages.blobs), extracted_file is queued for deletion.
     """
-    # Delete binary file if it exists
-    if instance.binary_file:
-        filename = instance.binary_file.name
-        try:
-            instance.binary_file.delete(save=False)
-            print(f"✓ Deleted binary file from MinIO: {filename}")
-        except Exception as e:
-            print(f"✗ Error deleting binary file {filename}: {e}")
+    release_file(instance.binary_file)
+    release_file(instance.rust_crate_file)
+    schedule_deletion(instance.extracted_file.name)
 
-    # Delete rust crate file if it exists
-    if instance.rust_crate_file:
-        filename = instance.rust_crate_file.name
-        try:
-            instance.rust_crate_file.delete(save=False)
-            print(f"✓ Deleted rust crate file from MinIO: {filename}")
-        except Exception as e:
-            print(f"✗ Error deleting rust crate file {filename}: {e}")
+
+@receiver(pre_delete, sender=ConanPackageRevision)
+def delete_conan_package_file(sender, instance, **kwargs):
+    """
+    Release the conan_package.tgz blob when a Conan package revision is deleted
+    (also when its BinaryPackage is).
+    """
+    release_file(instance.package_file)
 
 
 @receiver(pre_delete, sender=PackageVersion)
 def delete_package_version_files(sender, instance, **kwargs):
     """
-    Delete recipe_file from MinIO when PackageVersion is deleted.
+    Queue recipe_file for deletion from MinIO when PackageVersion is deleted.
+    """
+    schedule_deletion(instance.recipe_file.name)
+
+
+@receiver(pre_delete, sender=BundleCacheEntry)
+def delete_bundle_cache_file(sender, instance, **kwargs):
+    """
+    Queue the cached bundle ZIP for deletion when a cache entry is evicted.
+    """
+    schedule_deletion(instance.bundle_file.name)
+
+
+@receiver(post_save, sender=BinaryPackage)
+def index_binary_dependency_graph(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Rebuild the BinaryDependency rows whenever dependency_graph may have changed.
+
+    In queued mode the stale rows are dropped right away and a worker
+    rebuilds them; until then reads index the binary on first use.
     """
-    if instance.recipe_file:
-        filename = instance.recipe_file.name
-        try:
-            instance.recipe_file.delete(save=False)
-            print(f"✓ Deleted recipe file from MinIO: {filename}")
-        except Exception as e:
-            print(f"✗ Error deleting recipe file {filename}: {e}")
+    if raw:
+        return
+    if update_fields is not None and 'dependency_graph' not in update_fields:
+        return
+    if get_queue_mode() == 'queued':
+        BinaryDependency.objects.filter(binary=instance).delete()
+    enqueue('index_dependencies', binary_id=instance.pk)
@@ -0,0 +1,127 @@
+"""
+Queued deletion of stored objects
+
+Deleting database rows never talks to MinIO. The signal handlers (and blob
+release) only queue the object names as PendingDeletion rows, inside the
+transaction of the delete: a cascade over thousands of binaries costs one
+small INSERT per row, a rolled-back delete queues nothing, and the objects
+are only deleted once the delete has been committed.
+
+drain_deletions() (the drain_storage_deletions command, from cron or with
+--loop) then removes the objects with S3 DeleteObjects, up to 1000 keys per
+call. Other storage backends are deleted name by name.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from storages.backends.s3boto3 import S3Boto3Storage
+from packages.models import PendingDeletion
+from packages.storage_utils import get_storage_key
+
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+DEFAULT_BATCH_SIZE = 1000
+
+# Objects that failed this many times are left queued for inspection
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def get_max_attempts():
+    return getattr(settings, 'STORAGE_DELETION_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+
+def schedule_deletion(*names):
+    """
+    Queue stored objects for deletion.
+
+    Call from inside the transaction that stops referencing them; the
+    objects are deleted by drain_deletions() after it commits.
+
+    Args:
+        names: Object names in the default storage (empty names are ignored)
+    """
+    names = [name for name in names if name]
+    if names:
+        PendingDeletion.objects.bulk_create([PendingDeletion(name=name) for name in names])
+
+
+def delete_objects(storage, names):
+    """
+    Delete stored objects in one batch.
+
+    Returns:
+        Dict of name -> error message for the objects that could not be deleted
+    """
+    if not isinstance(storage, S3Boto3Storage):
+        errors = {}
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception as e:
+                errors[name] = str(e)
+        return errors
+
+    keys = {get_storage_key(storage, name): name for name in names}
+    response = storage.bucket.meta.client.delete_objects(
+        Bucket=storage.bucket_name,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+    )
+    # Missing keys count as deleted; only real failures are reported
+    return {
+        keys[error['Key']]: f"{error.get('Code')}: {error.get('Message')}"
+        for error in response.get('Errors', [])
+    }
+
+
+def drain_deletions(batch_size=DEFAULT_BATCH_SIZE, storage=None):
+    """
+    Delete queued objects from storage, batch_size at a time.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    drainers can run at once. Objects that fail stay queued with their
+    error and are retried up to STORAGE_DELETION_MAX_ATTEMPTS times.
+
+    Returns:
+        Number of objects deleted
+    """
+    storage = storage or default_storage
+    batch_size = min(batch_size, DEFAULT_BATCH_SIZE)
+    deleted = 0
+    failed = set()  # retried on the next run, not in this one
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                PendingDeletion.objects.select_for_update(skip_locked=True)
+                .filter(attempts__lt=get_max_attempts())
+                .exclude(pk__in=failed)
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                break
+
+            names = sorted({pending.name for pending in batch})
+            try:
+                errors = delete_objects(storage, names)
+            except Exception as e:
+                errors = {name: str(e) for name in names}
+
+            batch_failed = {pending.pk for pending in batch if pending.name in errors}
+            PendingDeletion.objects.filter(pk__in=[pending.pk for pending in batch]).exclude(
+                pk__in=batch_failed
+            ).delete()
+            for pending in batch:
+                if pending.pk in batch_failed:
+                    PendingDeletion.objects.filter(pk=pending.pk).update(
+                        attempts=F('attempts') + 1,
+                        last_error=errors[pending.name]
+                    )
+            failed |= batch_failed
+            deleted += len(names) - len(errors)
+
+        if len(errors) == len(names):
+            # Nothing went through (e.g. MinIO unreachable) - try again next run
+            break
+
+    return deleted
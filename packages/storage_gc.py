@@ -0,0 +1,281 @@
+"""
+Garbage collection of orphaned objects in MinIO
+
+Mark and sweep over the bucket:
+
+1. Mark: every name referenced by a FileField of the packages models is
+   written to an on-disk set (a temporary SQLite database), so memory use
+   doesn't grow with the number of objects. Blobs nobody has referenced
+   for the grace period and open upload sessions that have expired don't
+   count as references.
+2. Sweep: the bucket listing is streamed page by page (only the prefixes
+   the models upload to); objects that aren't in the set and are older than
+   the grace period are deleted in batches of up to 1000 keys.
+
+The grace period protects uploads in flight, whose object is written before
+the row that references it is committed. Objects that became referenced
+after the mark phase (an upload reviving an unreferenced blob) are caught by
+checking every batch against the database again right before it is deleted.
+"""
+import os
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from django.utils import timezone
+from storages.backends.s3boto3 import S3Boto3Storage
+from packages.models import PendingDeletion, StoredBlob, UploadSession
+from packages.multipart import abort_multipart_upload
+from packages.storage_cleanup import DEFAULT_BATCH_SIZE, delete_objects
+
+
+DEFAULT_GRACE_PERIOD = 24 * 3600  # seconds
+
+# Rows read per query while marking
+MARK_CHUNK_SIZE = 5000
+
+
+def get_grace_period():
+    return getattr(settings, 'STORAGE_GC_GRACE_PERIOD', DEFAULT_GRACE_PERIOD)
+
+
+class ReferenceSet:
+    """
+    Set of object names kept in a temporary SQLite database on disk.
+
+    Lookups are indexed, and only SQLite's page cache is held in memory.
+    """
+
+    def __init__(self):
+        fd, self._path = tempfile.mkstemp(suffix='.sqlite3', prefix='conancrates-gc-')
+        os.close(fd)
+        self._db = sqlite3.connect(self._path)
+        self._db.execute('CREATE TABLE refs (name TEXT PRIMARY KEY) WITHOUT ROWID')
+
+    def update(self, names):
+        self._db.executemany('INSERT OR IGNORE INTO refs VALUES (?)', ((name,) for name in names))
+        self._db.commit()
+
+    def __contains__(self, name):
+        return self._db.execute('SELECT 1 FROM refs WHERE name = ?', (name,)).fetchone() is not None
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM refs').fetchone()[0]
+
+    def close(self):
+        self._db.close()
+        os.remove(self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@dataclass
+class GarbageReport:
+    """What a garbage collection run found (and deleted)"""
+    references: int = 0
+    scanned: int = 0
+    scanned_bytes: int = 0
+    unreferenced: int = 0
+    reclaimable_bytes: int = 0
+    deleted: int = 0
+    deleted_bytes: int = 0
+    failed: int = 0
+    revived: int = 0
+    stale_blobs: int = 0
+    expired_sessions: int = 0
+
+
+def file_fields():
+    """(model, field) for every FileField of the packages app"""
+    return [
+        (model, field)
+        for model in apps.get_app_config('packages').get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField)
+    ]
+
+
+def managed_prefixes():
+    """Bucket prefixes the models upload to; nothing else is ever swept"""
+    prefixes = sorted({
+        str(field.upload_to).split('%')[0]
+        for _, field in file_fields()
+        if isinstance(field.upload_to, str) and field.upload_to
+    })
+    # Drop prefixes nested in another one, so no object is listed twice
+    return [
+        prefix for prefix in prefixes
+        if not any(prefix != other and prefix.startswith(other) for other in prefixes)
+    ]
+
+
+def live_rows(model, cutoff):
+    """Rows of a model whose files count as references"""
+    if model is StoredBlob:
+        # Unreferenced blobs are kept for the grace period (a re-upload revives them)
+        return model.objects.filter(models.Q(ref_count__gt=0) | models.Q(updated_at__gte=cutoff))
+    if model is UploadSession:
+        return model.objects.filter(status__in=UploadSession.ACTIVE_STATUSES, expires_at__gte=timezone.now())
+    return model.objects.all()
+
+
+def iter_referenced_names(cutoff):
+    """All object names referenced from the database, one query per field"""
+    for model, field in file_fields():
+        yield from (
+            live_rows(model, cutoff).exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+            .values_list(field.attname, flat=True).iterator(chunk_size=MARK_CHUNK_SIZE)
+        )
+    # Queued deletions are the drainer's job
+    yield from PendingDeletion.objects.values_list('name', flat=True).iterator(chunk_size=MARK_CHUNK_SIZE)
+
+
+def referenced_now(names, cutoff):
+    """Those of the given names that the database references at this moment"""
+    names = list(names)
+    referenced = set()
+    for model, field in file_fields():
+        referenced.update(
+            live_rows(model, cutoff).filter(**{f'{field.attname}__in': names})
+            .values_list(field.attname, flat=True)
+        )
+    referenced.update(PendingDeletion.objects.filter(name__in=names).values_list('name', flat=True))
+    return referenced
+
+
+def iter_stored_objects(storage, prefix):
+    """
+    Stream (name, size, last_modified) of the stored objects below a prefix.
+
+    On MinIO/S3 the listing is paged (1000 keys per request); other backends
+    are walked with listdir().
+    """
+    if isinstance(storage, S3Boto3Storage):
+        location = storage.location.strip('/')
+        key_prefix = f"{location}/{prefix}" if location else prefix
+        paginator = storage.bucket.meta.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=storage.bucket_name, Prefix=key_prefix):
+            for obj in page.get('Contents', []):
+                name = obj['Key'][len(location) + 1:] if location else obj['Key']
+                yield name, obj['Size'], obj['LastModified']
+        return
+
+    directory = prefix.rstrip('/')
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        name = f"{directory}/{filename}"
+        yield name, storage.size(name), storage.get_modified_time(name)
+    for subdirectory in directories:
+        yield from iter_stored_objects(storage, f"{directory}/{subdirectory}/")
+
+
+def expire_upload_sessions(dry_run=False):
+    """
+    Abort open upload sessions past their expiry, releasing their uploaded parts.
+
+    Returns:
+        Number of sessions expired
+    """
+    sessions = UploadSession.objects.filter(status__in=UploadSession.ACTIVE_STATUSES, expires_at__lt=timezone.now())
+    if dry_run:
+        return sessions.count()
+
+    expired = 0
+    for session in sessions.iterator():
+        try:
+            abort_multipart_upload(session.binary_file, session.multipart_upload_id)
+        except Exception as e:
+            print(f"Warning: Could not abort upload session {session.id}: {e}")
+        session.status = UploadSession.STATUS_ABORTED
+        session.save(update_fields=['status'])
+        expired += 1
+    return expired
+
+
+def collect_garbage(dry_run=False, grace_period=None, batch_size=DEFAULT_BATCH_SIZE, storage=None,
+                    on_unreferenced=None):
+    """
+    Find (and unless dry_run, delete) stored objects nothing references.
+
+    Args:
+        dry_run: Only report; nothing is deleted or changed
+        grace_period: Seconds an object must be unreferenced/old before it is
+            deleted (default STORAGE_GC_GRACE_PERIOD)
+        batch_size: Objects per delete request (at most 1000)
+        on_unreferenced: Optional callback(name, size) for every object found
+
+    Returns:
+        GarbageReport
+    """
+    storage = storage or default_storage
+    if grace_period is None:
+        grace_period = get_grace_period()
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+    batch_size = min(batch_size, DEFAULT_BATCH_SIZE)
+    report = GarbageReport()
+
+    report.expired_sessions = expire_upload_sessions(dry_run)
+    stale_blobs = StoredBlob.objects.filter(ref_count=0, updated_at__lt=cutoff)
+
+    with ReferenceSet() as references:
+        references.update(iter_referenced_names(cutoff))
+        report.references = len(references)
+
+        # Stale blob rows go before their objects, so no upload can pick
+        # them up once the objects are gone
+        if dry_run:
+            report.stale_blobs = stale_blobs.count()
+        else:
+            report.stale_blobs, _ = stale_blobs.delete()
+
+        batch = {}
+
+        def flush():
+            # Uploads since the mark phase may have revived some of these
+            for name in referenced_now(batch, cutoff):
+                report.revived += 1
+                del batch[name]
+            if not batch:
+                return
+            try:
+                errors = delete_objects(storage, list(batch))
+            except Exception as e:
+                errors = {name: str(e) for name in batch}
+            report.failed += len(errors)
+            for name, size in batch.items():
+                if name not in errors:
+                    report.deleted += 1
+                    report.deleted_bytes += size
+            batch.clear()
+
+        for prefix in managed_prefixes():
+            for name, size, last_modified in iter_stored_objects(storage, prefix):
+                report.scanned += 1
+                report.scanned_bytes += size
+                if name in references or last_modified >= cutoff:
+                    continue
+
+                report.unreferenced += 1
+                report.reclaimable_bytes += size
+                if on_unreferenced is not None:
+                    on_unreferenced(name, size)
+
+                if not dry_run:
+                    batch[name] = size
+                    if len(batch) >= batch_size:
+                        flush()
+
+        if batch:
+            flush()
+
+    return report
@@ -0,0 +1,118 @@
+"""
+Helpers for reading stored package files
+
+Wraps the storage backend so views can read large binaries in chunks
+instead of loading whole objects into memory.
+"""
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+
+def get_object_key(field_file):
+    """
+    Get the full object key for a stored file.
+
+    Args:
+        field_file: FieldFile from a FileField (e.g. binary.binary_file)
+
+    Returns:
+        Object key in the bucket (includes the storage location prefix)
+    """
+    return get_storage_key(field_file.storage, field_file.name)
+
+
+def get_storage_key(storage, name):
+    """Object key of a stored file name in an S3 storage's bucket"""
+    return storage._normalize_name(clean_name(name))
+
+
+def open_stream(field_file):
+    """
+    Open a stored file for sequential, chunked reading.
+
+    On MinIO/S3 this returns the raw response body so reads are pulled
+    from the network on demand. (Opening the FieldFile would first download
+    the whole object into a spooled temp file.) Other backends fall back to
+    a regular file handle.
+
+    Args:
+        field_file: FieldFile from a FileField (e.g. binary.binary_file)
+
+    Returns:
+        File-like object supporting read(size) and close()
+    """
+    storage = field_file.storage
+    if isinstance(storage, S3Boto3Storage):
+        response = storage.bucket.Object(get_object_key(field_file)).get()
+        return response['Body']
+
+    return storage.open(field_file.name, 'rb')
+
+
+class _BoundedReader:
+    """Read at most `length` bytes from a file object, then report EOF"""
+
+    def __init__(self, fileobj, length):
+        self._fileobj = fileobj
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fileobj.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fileobj.close()
+
+
+def open_range(field_file, start, end):
+    """
+    Open a byte range of a stored file for sequential reading.
+
+    On MinIO/S3 this is a ranged GET, so only the requested bytes leave the
+    bucket. Other backends seek into a regular file handle.
+
+    Args:
+        field_file: FieldFile from a FileField
+        start: First byte offset
+        end: Last byte offset (inclusive)
+
+    Returns:
+        File-like object supporting read(size) and close()
+    """
+    storage = field_file.storage
+    if isinstance(storage, S3Boto3Storage):
+        response = storage.bucket.Object(get_object_key(field_file)).get(Range=f'bytes={start}-{end}')
+        return response['Body']
+
+    fileobj = storage.open(field_file.name, 'rb')
+    fileobj.seek(start)
+    return _BoundedReader(fileobj, end - start + 1)
+
+
+def presigned_url(field_file, filename=None, content_type=None):
+    """
+    Build a presigned MinIO/S3 URL for direct client downloads.
+
+    Args:
+        field_file: FieldFile from a FileField
+        filename: Download filename baked into Content-Disposition (optional)
+        content_type: Content-Type the object is served with (optional)
+
+    Returns:
+        Signed URL string, or None if the storage backend can't presign URLs
+    """
+    storage = field_file.storage
+    if not isinstance(storage, S3Boto3Storage) or not storage.querystring_auth:
+        return None
+
+    parameters = {}
+    if filename:
+        parameters['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
+    if content_type:
+        parameters['ResponseContentType'] = content_type
+    return storage.url(field_file.name, parameters=parameters)
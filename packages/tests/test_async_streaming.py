@@ -0,0 +1,113 @@
+"""
+Tests for async download streaming under ASGI
+"""
+from django.test import TestCase, AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage
+from packages.async_streaming import aiter_chunks, aiter_file
+from unittest.mock import MagicMock, patch
+import io
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+async def collect(async_chunks):
+    return [chunk async for chunk in async_chunks]
+
+
+class AsyncIteratorTests(TestCase):
+    """Tests for the sync-to-async chunk adapters"""
+
+    async def test_file_is_read_in_chunks(self):
+        fileobj = io.BytesIO(b'x' * 10)
+
+        chunks = await collect(aiter_file(fileobj, 4))
+
+        self.assertEqual(chunks, [b'xxxx', b'xxxx', b'xx'])
+        self.assertTrue(fileobj.closed)
+
+    async def test_generator_is_closed_on_disconnect(self):
+        closed = []
+
+        def generate():
+            try:
+                yield b'a'
+                yield b'b'
+            finally:
+                closed.append(True)
+
+        chunks = aiter_chunks(generate())
+        self.assertEqual(await chunks.__anext__(), b'a')
+        await chunks.aclose()
+
+        self.assertEqual(closed, [True])
+
+    async def test_worker_thread_connections_are_closed(self):
+        connection = MagicMock(in_atomic_block=False)
+        with patch('packages.async_streaming.connections') as connections:
+            connections.all.return_value = [connection]
+
+            chunks = await collect(aiter_chunks(iter([b'a', b'b'])))
+
+        self.assertEqual(chunks, [b'a', b'b'])
+        connections.all.assert_called_with(initialized_only=True)
+        self.assertEqual(connection.close.call_count, 3)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, BUNDLE_CACHE_ENABLED=False)
+class AsyncDownloadTests(TestCase):
+    """Tests for download views served through the ASGI handler"""
+
+    def setUp(self):
+        package = Package.objects.create(name='zlib')
+        version = PackageVersion.objects.create(package=package, version='1.2.13', recipe_content='recipe')
+        self.binary = BinaryPackage.objects.create(
+            package_version=version,
+            package_id='zlib123',
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release',
+            file_size=10,
+            sha256='abc123'
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(b'0123456789'))
+        self.url = reverse('packages:download_binary', args=['zlib', '1.2.13', 'zlib123'])
+
+    async def test_binary_is_streamed_asynchronously(self):
+        response = await AsyncClient().get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join(await collect(response.streaming_content)), b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertIn('zlib-1.2.13-zlib123.tar.gz', response['Content-Disposition'])
+
+    async def test_range_is_streamed_asynchronously(self):
+        response = await AsyncClient().get(self.url, headers={'Range': 'bytes=2-5'})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(await collect(response.streaming_content)), b'2345')
+
+    async def test_bundle_is_streamed_asynchronously(self):
+        url = reverse('packages:download_bundle', args=['zlib', '1.2.13'])
+
+        response = await AsyncClient().get(url)
+
+        self.assertTrue(response.is_async)
+        content = b''.join(await collect(response.streaming_content))
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            self.assertEqual(zipf.read('zlib-1.2.13/zlib-1.2.13-zlib123.tar.gz'), b'0123456789')
+
+    def test_wsgi_requests_stay_synchronous(self):
+        response = Client().get(self.url)
+
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
@@ -0,0 +1,161 @@
+"""
+Tests for content-addressed binary and crate storage
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from packages.models import Package, PackageVersion, BinaryPackage, StoredBlob
+from packages.blobs import BINARY_SUFFIX, blob_name, release_file
+from packages.storage_cleanup import drain_deletions
+from unittest.mock import patch
+import hashlib
+import io
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_tarball(conaninfo=b'[settings]\nos=Windows\narch=x86\n', padding=b''):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for path, data in (('conaninfo.txt', conaninfo), ('lib/zlib.a', b'library' + padding)):
+            info = tarfile.TarInfo(path)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, EXTRACTED_PRECOMPUTE_ON_UPLOAD=False,
+                   RUST_CRATE_GENERATE_ON_UPLOAD=False, CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD=False)
+class BlobUploadTests(TestCase):
+    """Tests for deduplicated uploads through the simple upload endpoint"""
+
+    def setUp(self):
+        self.client = Client()
+        self.tarball = make_tarball()
+        self.sha256 = hashlib.sha256(self.tarball).hexdigest()
+
+    def _upload(self, package_id, tarball=None, **extra):
+        data = {
+            'recipe': SimpleUploadedFile('conanfile.py', b'class Zlib: pass'),
+            'package_name': 'zlib',
+            'version': '1.2.13',
+            'package_id': package_id,
+        }
+        if tarball is not None:
+            data['binary'] = SimpleUploadedFile('zlib.tar.gz', tarball)
+        data.update(extra)
+        return self.client.post(reverse('packages:simple_upload'), data)
+
+    def test_identical_binaries_are_stored_once(self):
+        self._upload('abc', self.tarball)
+        self._upload('def', self.tarball)
+
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.sha256, self.sha256)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertTrue(blob.file.name.startswith(f'blobs/{self.sha256[:2]}/{self.sha256}'))
+        names = set(BinaryPackage.objects.values_list('binary_file', flat=True))
+        self.assertEqual(names, {blob.file.name})
+
+    def test_announced_sha256_is_stored_in_one_pass(self):
+        with patch('packages.blobs.inspect_upload', side_effect=AssertionError('extra read')):
+            response = self._upload('abc', self.tarball, binary_sha256=self.sha256)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BinaryPackage.objects.get().binary_file.read(), self.tarball)
+
+    def test_known_content_needs_only_its_sha256(self):
+        self._upload('abc', self.tarball)
+
+        with patch('packages.ingest.IngestReader', side_effect=AssertionError('re-read')):
+            response = self._upload('def', binary_sha256=self.sha256)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['package']['size'], len(self.tarball))
+        binary = BinaryPackage.objects.get(package_id='def')
+        self.assertEqual((binary.os, binary.arch, binary.sha256), ('Windows', 'x86', self.sha256))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+    def test_unknown_sha256_without_binary_is_rejected(self):
+        response = self._upload('abc', binary_sha256='0' * 64)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_sha256_mismatch_stores_nothing(self):
+        response = self._upload('abc', self.tarball, binary_sha256='0' * 64)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob_name('0' * 64, BINARY_SUFFIX)))
+
+    def test_reupload_releases_previous_blob(self):
+        self._upload('abc', self.tarball)
+        self._upload('abc', make_tarball(padding=b'v2'))
+
+        old = StoredBlob.objects.get(pk=self.sha256)
+        self.assertEqual(old.ref_count, 0)
+        # Unreferenced blobs stay until garbage collected
+        self.assertTrue(default_storage.exists(old.file.name))
+        self.assertEqual(StoredBlob.objects.exclude(pk=self.sha256).get().ref_count, 1)
+
+    def test_same_content_reupload_keeps_one_reference(self):
+        self._upload('abc', self.tarball)
+        self._upload('abc', self.tarball)
+
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_identical_crates_are_stored_once(self):
+        crate = b'crate bytes'
+        self._upload('abc', self.tarball, rust_crate=SimpleUploadedFile('zlib-sys-1.2.13.crate', crate))
+        self._upload('def', self.tarball, rust_crate=SimpleUploadedFile('zlib-sys-1.2.13.crate', crate))
+
+        blob = StoredBlob.objects.get(pk=hashlib.sha256(crate).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertTrue(blob.file.name.endswith('.crate'))
+
+    def test_check_blob_exists(self):
+        url = reverse('packages:check_blob_exists', args=[self.sha256])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self._upload('abc', self.tarball)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['size'], len(self.tarball))
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class BlobReleaseTests(TestCase):
+    """Tests for releasing blobs when binaries are deleted"""
+
+    def setUp(self):
+        package = Package.objects.create(name='zlib')
+        self.version = PackageVersion.objects.create(package=package, version='1.2.13')
+
+    def test_deleting_binary_releases_its_blob(self):
+        name = default_storage.save('blobs/ab/abc.tar.gz', ContentFile(b'data'))
+        StoredBlob.objects.create(sha256='abc', file=name, size=4, ref_count=2)
+        first = BinaryPackage.objects.create(package_version=self.version, package_id='one', binary_file=name)
+        BinaryPackage.objects.create(package_version=self.version, package_id='two', binary_file=name)
+
+        first.delete()
+
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_files_from_before_blobs_are_deleted(self):
+        binary = BinaryPackage.objects.create(package_version=self.version, package_id='one')
+        binary.binary_file.save('zlib.tar.gz', ContentFile(b'data'))
+        name = binary.binary_file.name
+
+        release_file(binary.binary_file)
+        drain_deletions()
+
+        self.assertFalse(default_storage.exists(name))
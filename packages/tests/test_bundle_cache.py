@@ -0,0 +1,148 @@
+"""
+Tests for the content-addressed bundle cache
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage, BundleCacheEntry
+from packages.bundle_cache import cache_while_streaming, compute_cache_key, evict_bundles
+import io
+import json
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class CacheKeyTests(TestCase):
+    """Tests for bundle cache key computation"""
+
+    def test_key_ignores_member_order(self):
+        members = [('zlib', '1.2.13', 'aaa', 'sha1'), ('boost', '1.81.0', 'bbb', 'sha2')]
+        self.assertEqual(
+            compute_cache_key('conan', members),
+            compute_cache_key('conan', list(reversed(members)))
+        )
+
+    def test_key_changes_with_content(self):
+        key = compute_cache_key('conan', [('zlib', '1.2.13', 'aaa', 'sha1')])
+        self.assertNotEqual(key, compute_cache_key('conan', [('zlib', '1.2.13', 'aaa', 'sha2')]))
+        self.assertNotEqual(key, compute_cache_key('rust', [('zlib', '1.2.13', 'aaa', 'sha1')]))
+        self.assertNotEqual(key, compute_cache_key('conan', [('zlib', '1.2.13', 'aaa', 'sha1')], compression='store'))
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class BundleCacheStorageTests(TestCase):
+    """Tests for storing and evicting cached bundles"""
+
+    def test_partial_stream_is_not_cached(self):
+        """A client disconnect mid-stream must not leave a truncated bundle"""
+        stream = cache_while_streaming('a' * 64, iter([b'chunk1', b'chunk2']))
+        next(stream)
+        stream.close()
+
+        self.assertFalse(BundleCacheEntry.objects.exists())
+
+    def test_complete_stream_is_cached(self):
+        chunks = list(cache_while_streaming('a' * 64, iter([b'chunk1', b'chunk2'])))
+
+        self.assertEqual(chunks, [b'chunk1', b'chunk2'])
+        entry = BundleCacheEntry.objects.get(cache_key='a' * 64)
+        self.assertEqual(entry.size, 12)
+        self.assertEqual(entry.bundle_file.read(), b'chunk1chunk2')
+
+    @override_settings(BUNDLE_CACHE_MAX_ENTRY_SIZE=5)
+    def test_oversized_bundle_is_not_cached(self):
+        list(cache_while_streaming('a' * 64, iter([b'chunk1', b'chunk2'])))
+        self.assertFalse(BundleCacheEntry.objects.exists())
+
+    def test_evicts_least_recently_used(self):
+        list(cache_while_streaming('a' * 64, iter([b'x' * 10])))
+        list(cache_while_streaming('b' * 64, iter([b'x' * 10])))
+
+        evicted = evict_bundles(max_size=15)
+
+        self.assertEqual(evicted, 1)
+        self.assertEqual(
+            list(BundleCacheEntry.objects.values_list('cache_key', flat=True)),
+            ['b' * 64]
+        )
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class CachedBundleDownloadTests(TestCase):
+    """Tests that download_bundle reuses cached bundles"""
+
+    def setUp(self):
+        self.client = Client()
+        self.package = Package.objects.create(name='zlib')
+        self.version = PackageVersion.objects.create(package=self.package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=self.version,
+            package_id='zlib123',
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release',
+            sha256='abc'
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(b'data'))
+        self.url = reverse('packages:download_bundle', args=['zlib', '1.2.13'])
+
+    def test_second_request_served_from_cache(self):
+        first = b''.join(self.client.get(self.url).streaming_content)
+        self.assertEqual(BundleCacheEntry.objects.count(), 1)
+
+        response = self.client.get(self.url)
+        second = b''.join(response.streaming_content)
+
+        self.assertEqual(first, second)
+        self.assertIn('zlib-1.2.13-bundle.zip', response['Content-Disposition'])
+        self.assertEqual(BundleCacheEntry.objects.get().hit_count, 1)
+        with zipfile.ZipFile(io.BytesIO(second)) as zipf:
+            self.assertEqual(zipf.read('zlib-1.2.13/zlib-1.2.13-zlib123.tar.gz'), b'data')
+
+    def test_new_binary_content_misses_cache(self):
+        b''.join(self.client.get(self.url).streaming_content)
+
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(sha256='def')
+        b''.join(self.client.get(self.url).streaming_content)
+
+        self.assertEqual(BundleCacheEntry.objects.count(), 2)
+
+    def test_new_recipe_misses_cache(self):
+        b''.join(self.client.get(self.url).streaming_content)
+
+        PackageVersion.objects.filter(pk=self.version.pk).update(recipe_content='class Zlib: pass')
+        response = self.client.get(self.url)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zipf:
+            self.assertEqual(zipf.read('zlib-1.2.13/conanfile.py'), b'class Zlib: pass')
+        self.assertEqual(BundleCacheEntry.objects.count(), 2)
+
+    def test_other_platform_filters_miss_cache(self):
+        b''.join(self.client.get(self.url).streaming_content)
+
+        # Same binary content and recipe, resolved for another requested platform
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(os='Windows')
+        response = self.client.get(self.url, {'os': 'Windows'})
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zipf:
+            self.assertEqual(json.loads(zipf.read('bundle_info.json'))['platform']['os'], 'Windows')
+        self.assertEqual(BundleCacheEntry.objects.count(), 2)
+
+    def test_binary_without_sha256_is_not_cached(self):
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(sha256='')
+
+        b''.join(self.client.get(self.url).streaming_content)
+
+        self.assertFalse(BundleCacheEntry.objects.exists())
+
+    @override_settings(BUNDLE_CACHE_ENABLED=False)
+    def test_cache_can_be_disabled(self):
+        b''.join(self.client.get(self.url).streaming_content)
+        self.assertFalse(BundleCacheEntry.objects.exists())
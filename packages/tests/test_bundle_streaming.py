@@ -0,0 +1,98 @@
+"""
+Tests for streamed bundle downloads
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage
+from packages.zip_stream import ZipStream
+import io
+import json
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class ZipStreamTests(TestCase):
+    """Tests for the incremental ZIP writer"""
+
+    def test_stream_produces_valid_zip(self):
+        """Chunks concatenated together form a readable archive"""
+        stream = ZipStream(chunk_size=16)
+        payload = b'x' * 1000
+
+        chunks = []
+        chunks.extend(stream.write_str('README.txt', 'hello'))
+        chunks.extend(stream.write_file('data/blob.bin', io.BytesIO(payload), size=len(payload)))
+        chunks.extend(stream.close())
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zipf:
+            self.assertEqual(zipf.read('README.txt'), b'hello')
+            self.assertEqual(zipf.read('data/blob.bin'), payload)
+            self.assertIsNone(zipf.testzip())
+
+    def test_file_is_copied_in_chunks(self):
+        """Large files are emitted as multiple chunks, not one buffer"""
+        stream = ZipStream(policy='store', chunk_size=100)
+        chunks = list(stream.write_file('blob.bin', io.BytesIO(b'a' * 1000)))
+
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class StreamingBundleTests(TestCase):
+    """Tests for download_bundle streaming"""
+
+    def setUp(self):
+        self.client = Client()
+
+        self.package = Package.objects.create(name='zlib', description='Compression library')
+        self.version = PackageVersion.objects.create(
+            package=self.package,
+            version='1.2.13',
+            recipe_content='class ZlibConan: pass'
+        )
+        self.binary = BinaryPackage.objects.create(
+            package_version=self.version,
+            package_id='zlib123',
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release',
+            file_size=4
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(b'data'))
+
+    def _get_bundle(self):
+        url = reverse('packages:download_bundle', args=['zlib', '1.2.13'])
+        return self.client.get(url)
+
+    def test_bundle_is_streamed(self):
+        """Bundle is returned as a streaming response"""
+        response = self._get_bundle()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('zlib-1.2.13-bundle.zip', response['Content-Disposition'])
+
+    def test_bundle_contents(self):
+        """Streamed bundle contains metadata, recipe and binary"""
+        response = self._get_bundle()
+        content = b''.join(response.streaming_content)
+
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            names = zipf.namelist()
+            self.assertIn('bundle_info.json', names)
+            self.assertIn('README.txt', names)
+            self.assertEqual(zipf.read('zlib-1.2.13/conanfile.py'), b'class ZlibConan: pass')
+            self.assertEqual(zipf.read('zlib-1.2.13/zlib-1.2.13-zlib123.tar.gz'), b'data')
+
+            info = json.loads(zipf.read('bundle_info.json'))
+            self.assertEqual(info['contents'][0]['package_id'], 'zlib123')
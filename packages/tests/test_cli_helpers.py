@@ -9,6 +9,8 @@ from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 import sys
 import os
+import shutil
+from io import StringIO
 
 # Add parent directory to path so we can import the CLI tool module
 cli_module_path = os.path.join(os.path.dirname(__file__), '..', '..')
@@ -212,5 +214,208 @@ build_type=Release
         self.assertIsNone(settings)
 
 
+class TestUploadPackagesParallel(unittest.TestCase):
+    """Test parallel uploads keep per-package output together and in order."""
+
+    @patch('conancrates.conancrates.upload_single_package')
+    def test_output_is_ordered_and_not_interleaved(self, mock_upload):
+        """Each package's log is printed as one block, in input order."""
+        import io
+        import time
+
+        def fake_upload(server_url, pkg_ref, profile, package_id=None):
+            # First package finishes last
+            delay = 0.2 if pkg_ref == 'a/1.0' else 0.0
+            print(f"  start {pkg_ref}")
+            time.sleep(delay)
+            print(f"  end {pkg_ref}")
+            return 1 if pkg_ref == 'c/1.0' else 0
+
+        mock_upload.side_effect = fake_upload
+        packages = [('a/1.0', 'aaaaaaaa1'), ('b/1.0', 'bbbbbbbb2'), ('c/1.0', 'cccccccc3')]
+
+        stdout = io.StringIO()
+        with patch('sys.stdout', stdout):
+            results = cli.upload_packages_parallel('http://server', packages, 'default', jobs=3)
+
+        self.assertEqual([(ref, result) for ref, _, result, _ in results],
+                         [('a/1.0', 0), ('b/1.0', 0), ('c/1.0', 1)])
+
+        lines = [line.strip() for line in stdout.getvalue().splitlines() if line.strip()]
+        starts = [i for i, line in enumerate(lines) if line.startswith('start')]
+        ends = [i for i, line in enumerate(lines) if line.startswith('end')]
+        self.assertEqual([lines[i] for i in starts], ['start a/1.0', 'start b/1.0', 'start c/1.0'])
+        # Every end line directly follows its own start line
+        self.assertEqual(ends, [i + 1 for i in starts])
+
+    @patch('conancrates.conancrates.upload_single_package')
+    def test_worker_exception_counts_as_failure(self, mock_upload):
+        import io
+
+        mock_upload.side_effect = RuntimeError('boom')
+
+        with patch('sys.stdout', io.StringIO()) as stdout:
+            results = cli.upload_packages_parallel('http://server', [('a/1.0', 'aaaaaaaa1')], 'default', jobs=2)
+
+        self.assertEqual(results[0][2], 1)
+        self.assertIn('boom', stdout.getvalue())
+
+
+
+class TestCheckPackagesExist(unittest.TestCase):
+    """Test the bulk existence check used by the upload planner."""
+
+    @patch('conancrates.conancrates.HttpSession.post')
+    def test_returns_existing_packages(self, mock_post):
+        """Should send all packages in one request and return the existing ones."""
+        mock_post.return_value = Mock(status_code=200)
+        mock_post.return_value.json.return_value = {'packages': [
+            {'name': 'zlib', 'version': '1.2.13', 'package_id': 'abc', 'exists': True},
+            {'name': 'boost', 'version': '1.81.0', 'package_id': 'def', 'exists': False},
+        ]}
+
+        result = cli.check_packages_exist('http://server', [('zlib/1.2.13', 'abc'), ('boost/1.81.0', 'def')])
+
+        self.assertEqual(result, {('zlib/1.2.13', 'abc')})
+        self.assertEqual(mock_post.call_count, 1)
+        sent = mock_post.call_args.kwargs['json']['packages']
+        self.assertEqual(sent[1], {'name': 'boost', 'version': '1.81.0', 'package_id': 'def'})
+
+    @patch('conancrates.conancrates.HttpSession.post')
+    def test_returns_none_when_unsupported(self, mock_post):
+        """Should return None so callers can fall back to per-package checks."""
+        mock_post.return_value = Mock(status_code=404)
+
+        self.assertIsNone(cli.check_packages_exist('http://server', [('zlib/1.2.13', 'abc')]))
+
+
+
+class TestHttpSession(unittest.TestCase):
+    """Test the shared HTTP session configuration."""
+
+    def test_shared_session_is_reused(self):
+        session = cli.configure_http_session(retries=5)
+
+        self.assertIs(cli.get_http_session(), session)
+        adapter = session.get_adapter('https://example.com')
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertNotIn('POST', adapter.max_retries.allowed_methods)
+
+    @patch('requests.Session.request')
+    def test_default_timeout_is_applied(self, mock_request):
+        session = cli.HttpSession(timeout=(1, 2))
+
+        session.get('http://server/ping')
+        session.get('http://server/ping', timeout=30)
+
+        self.assertEqual(mock_request.call_args_list[0].kwargs['timeout'], (1, 2))
+        self.assertEqual(mock_request.call_args_list[1].kwargs['timeout'], 30)
+
+    def test_compression_can_be_disabled(self):
+        self.assertEqual(cli.HttpSession(compression=False).headers['Accept-Encoding'], 'identity')
+
+
+class TestUploadBinaryDirect(unittest.TestCase):
+    """Test direct-to-MinIO uploads through upload sessions."""
+
+    def setUp(self):
+        import tempfile
+        tmp = tempfile.NamedTemporaryFile(suffix='.tar.gz', delete=False)
+        tmp.write(b'0123456789')
+        tmp.close()
+        self.path = Path(tmp.name)
+        self.addCleanup(os.remove, tmp.name)
+
+    @patch('conancrates.conancrates.HttpSession.put')
+    @patch('conancrates.conancrates.HttpSession.post')
+    def test_parts_are_uploaded_to_presigned_urls(self, mock_post, mock_put):
+        """Each part is PUT with its byte range and its ETag is reported."""
+        mock_post.return_value = Mock(status_code=200, json=lambda: {
+            'session_id': 's1',
+            'part_size': 4,
+            'parts': [{'part_number': n, 'url': f'http://minio/p{n}'} for n in (1, 2, 3)],
+        })
+        mock_put.side_effect = lambda url, data: Mock(status_code=200, headers={'ETag': f'"{data.decode()}"'})
+
+        session_id, parts = cli.upload_binary_direct('http://server', self.path, 'zlib', '1.2.13', 'abc')
+
+        self.assertEqual(session_id, 's1')
+        self.assertEqual(parts, [
+            {'part_number': 1, 'etag': '"0123"'},
+            {'part_number': 2, 'etag': '"4567"'},
+            {'part_number': 3, 'etag': '"89"'},
+        ])
+        request = mock_post.call_args.kwargs['json']
+        self.assertEqual(request['size'], 10)
+        self.assertEqual(request['sha256'], cli.file_sha256(self.path))
+
+    @patch('conancrates.conancrates.HttpSession.post')
+    def test_unsupported_server_returns_none(self, mock_post):
+        """Servers without upload sessions fall back to the regular upload."""
+        mock_post.return_value = Mock(status_code=501)
+
+        self.assertIsNone(cli.upload_binary_direct('http://server', self.path, 'zlib', '1.2.13', 'abc'))
+
+    @patch('conancrates.conancrates.time.sleep')
+    @patch('conancrates.conancrates.HttpSession.delete')
+    @patch('conancrates.conancrates.HttpSession.put')
+    @patch('conancrates.conancrates.HttpSession.post')
+    def test_failed_part_aborts_session(self, mock_post, mock_put, mock_delete, _):
+        """A part that keeps failing aborts the session."""
+        mock_post.return_value = Mock(status_code=200, json=lambda: {
+            'session_id': 's1', 'part_size': 10, 'parts': [{'part_number': 1, 'url': 'http://minio/p1'}],
+        })
+        mock_put.return_value = Mock(status_code=500, text='boom')
+
+        with self.assertRaises(RuntimeError):
+            cli.upload_binary_direct('http://server', self.path, 'zlib', '1.2.13', 'abc')
+
+        self.assertEqual(mock_put.call_count, cli.get_http_session().retries + 1)
+        mock_delete.assert_called_once_with('http://server/api/package/upload-sessions/s1')
+
+
+class TestUploadKnownContent(unittest.TestCase):
+    """Test that content the server already stores is not uploaded again."""
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.recipe = Path(self.tmpdir) / 'conanfile.py'
+        self.recipe.write_text('class Zlib: pass')
+        self.binary = Path(self.tmpdir) / 'zlib.tar.gz'
+        self.binary.write_bytes(b'0123456789')
+
+    def _upload(self, mock_get, mock_post, exists):
+        mock_get.return_value = Mock(status_code=200 if exists else 404, json=lambda: {'exists': exists})
+        mock_post.return_value = Mock(status_code=200, json=lambda: {'package': {
+            'name': 'zlib', 'version': '1.2.13', 'package_id': 'abc', 'size': 10, 'sha256': 'x',
+        }})
+        with patch('sys.stdout', new_callable=StringIO):
+            self.assertTrue(cli.upload_package('http://server', self.recipe, self.binary, 'zlib/1.2.13', 'abc'))
+        return mock_post.call_args.kwargs
+
+    @patch('conancrates.conancrates.get_conan_version', return_value='2.0.0')
+    @patch('conancrates.conancrates.HttpSession.post')
+    @patch('conancrates.conancrates.HttpSession.get')
+    def test_known_binary_is_not_sent(self, mock_get, mock_post, _):
+        """Only the sha256 is sent when the server has the binary."""
+        request = self._upload(mock_get, mock_post, exists=True)
+
+        mock_get.assert_called_once_with(f'http://server/api/blobs/{cli.file_sha256(self.binary)}')
+        self.assertNotIn('binary', request['files'])
+        self.assertEqual(request['data']['binary_sha256'], cli.file_sha256(self.binary))
+
+    @patch('conancrates.conancrates.get_conan_version', return_value='2.0.0')
+    @patch('conancrates.conancrates.HttpSession.post')
+    @patch('conancrates.conancrates.HttpSession.get')
+    def test_new_binary_is_sent_with_sha256(self, mock_get, mock_post, _):
+        """New binaries are uploaded along with their sha256."""
+        request = self._upload(mock_get, mock_post, exists=False)
+
+        self.assertIn('binary', request['files'])
+        self.assertEqual(request['data']['binary_sha256'], cli.file_sha256(self.binary))
+
+
 if __name__ == '__main__':
     unittest.main()
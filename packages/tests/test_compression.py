@@ -0,0 +1,85 @@
+"""
+Tests for the bundle compression policy
+"""
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage
+from packages.compression import compress_type_for, get_compression_policy, is_compressed
+import io
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00'
+
+
+class CompressionPolicyTests(TestCase):
+    """Tests for compression policy selection"""
+
+    def test_detects_compressed_by_extension(self):
+        self.assertTrue(is_compressed('zlib-1.2.13-abc.tar.gz'))
+        self.assertTrue(is_compressed('crates/zlib-sys-1.2.13.crate'))
+        self.assertFalse(is_compressed('README.txt'))
+
+    def test_detects_compressed_by_magic_bytes(self):
+        self.assertTrue(is_compressed('lib/archive.bin', GZIP_HEADER))
+        self.assertFalse(is_compressed('lib/libz.a', b'!<arch>\n'))
+
+    def test_auto_policy(self):
+        self.assertEqual(compress_type_for('auto', 'pkg.tar.gz'), zipfile.ZIP_STORED)
+        self.assertEqual(compress_type_for('auto', 'bundle_info.json'), zipfile.ZIP_DEFLATED)
+
+    def test_store_and_deflate_policies(self):
+        self.assertEqual(compress_type_for('store', 'README.txt'), zipfile.ZIP_STORED)
+        self.assertEqual(compress_type_for('deflate', 'pkg.tar.gz'), zipfile.ZIP_DEFLATED)
+
+    def test_policy_from_query_param(self):
+        factory = RequestFactory()
+        self.assertEqual(get_compression_policy(factory.get('/', {'compression': 'store'})), 'store')
+        self.assertEqual(get_compression_policy(factory.get('/', {'compression': 'bogus'})), 'auto')
+        self.assertEqual(get_compression_policy(factory.get('/')), 'auto')
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class BundleCompressionTests(TestCase):
+    """Tests that bundle endpoints honour the compression policy"""
+
+    def setUp(self):
+        self.client = Client()
+        self.package = Package.objects.create(name='zlib')
+        self.version = PackageVersion.objects.create(package=self.package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=self.version,
+            package_id='zlib123',
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release'
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(GZIP_HEADER + b'payload'))
+
+    def _bundle_infos(self, **params):
+        url = reverse('packages:download_bundle', args=['zlib', '1.2.13'])
+        response = self.client.get(url, params)
+        content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            return {info.filename: info.compress_type for info in zipf.infolist()}
+
+    def test_auto_stores_binaries_and_deflates_text(self):
+        infos = self._bundle_infos()
+        self.assertEqual(infos['zlib-1.2.13/zlib-1.2.13-zlib123.tar.gz'], zipfile.ZIP_STORED)
+        self.assertEqual(infos['bundle_info.json'], zipfile.ZIP_DEFLATED)
+
+    def test_store_policy(self):
+        infos = self._bundle_infos(compression='store')
+        self.assertTrue(all(ct == zipfile.ZIP_STORED for ct in infos.values()))
+
+    def test_deflate_policy(self):
+        infos = self._bundle_infos(compression='deflate')
+        self.assertEqual(infos['zlib-1.2.13/zlib-1.2.13-zlib123.tar.gz'], zipfile.ZIP_DEFLATED)
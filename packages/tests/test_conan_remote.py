@@ -0,0 +1,246 @@
+"""
+Tests for the Conan v2 remote protocol (revisions and files API)
+"""
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from unittest.mock import patch
+from datetime import timedelta
+from packages.conan_layout import (
+    is_conan_package_current, manifest_revision, package_folder_path, parse_manifest, recipe_revision
+)
+from packages.models import Package, PackageVersion, BinaryPackage, ConanPackageRevision, StoredBlob
+import hashlib
+import io
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+RECIPE = 'from conan import ConanFile\n\nclass Zlib(ConanFile):\n    name = "zlib"\n'
+CONANINFO = b'[settings]\narch=x86_64\nos=Windows\n\n[options]\nshared=False\n'
+
+
+def make_tarball(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, DOWNLOAD_DELIVERY_MODE='stream')
+class ConanRemoteTests(TestCase):
+    """Tests for serving recipes and binaries to the Conan client"""
+
+    def setUp(self):
+        self.client = Client()
+        package = Package.objects.create(name='zlib')
+        self.version = PackageVersion.objects.create(package=package, version='1.3', recipe_content=RECIPE)
+        self.binary = BinaryPackage.objects.create(package_version=self.version, package_id='zlib1', sha256='bin1')
+        # `conan cache save` layout
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(make_tarball({
+            'pkglist.json': b'{}',
+            'zlib5e3f/e/conanfile.py': RECIPE.encode(),
+            'b/zlib9a8b/p/conaninfo.txt': CONANINFO,
+            'b/zlib9a8b/p/include/zlib.h': b'int deflate();',
+            'b/zlib9a8b/p/lib/libz.a': b'archive',
+        })))
+        self.rrev = recipe_revision(RECIPE)
+
+    def url(self, name, *args):
+        return reverse(f'packages:{name}', args=['zlib', '1.3', '_', '_'] + list(args))
+
+    def get_prev(self):
+        return self.client.get(self.url('conan_package_latest', self.rrev, 'zlib1')).json()['revision']
+
+    def test_ping_announces_revisions(self):
+        response = self.client.get(reverse('packages:api_ping'))
+
+        self.assertEqual(response['X-Conan-Server-Capabilities'], 'revisions')
+
+    def test_recipe_revision_and_files(self):
+        latest = self.client.get(self.url('conan_recipe_latest')).json()
+        self.assertEqual(latest['revision'], self.rrev)
+        self.assertEqual(self.client.get(self.url('conan_recipe_revisions')).json()['revisions'][0], latest)
+
+        files = self.client.get(self.url('conan_recipe_files', self.rrev)).json()['files']
+        self.assertEqual(sorted(files), ['conanfile.py', 'conanmanifest.txt'])
+
+        conanfile = self.client.get(self.url('conan_recipe_file', self.rrev, 'conanfile.py'))
+        self.assertEqual(conanfile.content.decode(), RECIPE)
+        manifest = self.client.get(self.url('conan_recipe_file', self.rrev, 'conanmanifest.txt')).content.decode()
+        self.assertEqual(parse_manifest(manifest), {'conanfile.py': md5(RECIPE.encode())})
+        self.assertEqual(manifest_revision(parse_manifest(manifest)), self.rrev)
+
+    def test_unknown_references_are_not_found(self):
+        self.assertEqual(self.client.get(self.url('conan_recipe_files', 'stale')).status_code, 404)
+        self.assertEqual(self.client.get(self.url('conan_package_latest', self.rrev, 'other')).status_code, 404)
+        response = self.client.get(reverse('packages:conan_recipe_latest', args=['zlib', '1.3', 'user', 'stable']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_package_files(self):
+        prev = self.get_prev()
+
+        files = self.client.get(self.url('conan_package_files', self.rrev, 'zlib1', prev)).json()['files']
+        self.assertEqual(sorted(files), ['conan_package.tgz', 'conaninfo.txt', 'conanmanifest.txt'])
+
+        conaninfo = self.client.get(self.url('conan_package_file', self.rrev, 'zlib1', prev, 'conaninfo.txt'))
+        self.assertEqual(conaninfo.content, CONANINFO)
+
+        manifest = self.client.get(self.url('conan_package_file', self.rrev, 'zlib1', prev, 'conanmanifest.txt'))
+        file_sums = parse_manifest(manifest.content.decode())
+        self.assertEqual(file_sums, {
+            'conaninfo.txt': md5(CONANINFO),
+            'include/zlib.h': md5(b'int deflate();'),
+            'lib/libz.a': md5(b'archive'),
+        })
+        self.assertEqual(manifest_revision(file_sums), prev)
+
+        response = self.client.get(self.url('conan_package_file', self.rrev, 'zlib1', prev, 'conan_package.tgz'))
+        self.assertEqual(response.status_code, 200)
+        with tarfile.open(fileobj=io.BytesIO(b''.join(response.streaming_content)), mode='r:gz') as tar:
+            self.assertEqual(sorted(tar.getnames()), ['include/zlib.h', 'lib/libz.a'])
+
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.download_count, 1)
+
+    def test_package_tgz_revalidation(self):
+        prev = self.get_prev()
+        url = self.url('conan_package_file', self.rrev, 'zlib1', prev, 'conan_package.tgz')
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_rebuilt_package_keeps_revision(self):
+        prev = self.get_prev()
+        revision = ConanPackageRevision.objects.get()
+        revision.source_sha256 = 'stale'
+        revision.save()
+
+        self.assertEqual(self.get_prev(), prev)
+        self.assertEqual(StoredBlob.objects.get(pk=revision.package_sha256).ref_count, 1)
+
+    def test_package_without_sha256_is_never_current(self):
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(sha256='')
+        self.get_prev()
+        self.binary.refresh_from_db()
+
+        self.assertFalse(is_conan_package_current(self.binary))
+
+    def test_current_package_is_not_rebuilt(self):
+        self.get_prev()
+
+        with patch('packages.conan_layout.build_conan_package') as build:
+            self.get_prev()
+
+        build.assert_not_called()
+
+    def test_build_claim_is_released(self):
+        self.get_prev()
+
+        self.binary.refresh_from_db()
+        self.assertIsNone(self.binary.conan_package_claimed_at)
+
+    def test_request_waits_for_claimed_build(self):
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(conan_package_claimed_at=timezone.now())
+
+        def finish_other_build(seconds):
+            BinaryPackage.objects.update(conan_package_claimed_at=None)
+
+        with patch('packages.conan_layout.time.sleep', side_effect=finish_other_build) as sleep:
+            self.get_prev()
+
+        sleep.assert_called_once()
+        self.assertTrue(ConanPackageRevision.objects.filter(binary=self.binary).exists())
+
+    def test_expired_build_claim_is_taken_over(self):
+        stale = timezone.now() - timedelta(hours=1)
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(conan_package_claimed_at=stale)
+
+        with patch('packages.conan_layout.time.sleep') as sleep:
+            self.get_prev()
+
+        sleep.assert_not_called()
+        self.binary.refresh_from_db()
+        self.assertIsNone(self.binary.conan_package_claimed_at)
+
+    def test_search_binaries(self):
+        self.get_prev()
+        BinaryPackage.objects.create(package_version=self.version, package_id='unbuilt', os='Linux', arch='armv8')
+        BinaryPackage.objects.filter(package_id='unbuilt').update(binary_file='blobs/unbuilt.tar.gz')
+
+        results = self.client.get(self.url('conan_search_revision_binaries', self.rrev)).json()
+
+        self.assertEqual(results['zlib1']['settings'], {'arch': 'x86_64', 'os': 'Windows'})
+        self.assertEqual(results['zlib1']['options'], {'shared': 'False'})
+        self.assertEqual(results['unbuilt']['settings'], {'os': 'Linux', 'arch': 'armv8'})
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class ConanSearchTests(TestCase):
+    """Tests for the recipe search"""
+
+    def setUp(self):
+        for name, versions in [('zlib', ['1.2', '1.3']), ('zstd', ['1.5']), ('openssl', ['3.0'])]:
+            package = Package.objects.create(name=name)
+            for version in versions:
+                PackageVersion.objects.create(package=package, version=version, recipe_content=RECIPE)
+
+    def search(self, **params):
+        return Client().get(reverse('packages:conan_search'), params).json()
+
+    def test_pattern(self):
+        self.assertEqual(self.search(q='z*')['results'], ['zlib/1.2', 'zlib/1.3', 'zstd/1.5'])
+        self.assertEqual(self.search(q='ZLIB/*')['results'], ['zlib/1.2', 'zlib/1.3'])
+        self.assertEqual(self.search(q='ZLIB/*', ignorecase='False')['results'], [])
+
+    def test_pagination(self):
+        result = self.search(q='*', page=2, page_size=3)
+
+        self.assertEqual(result['results'], ['zstd/1.5'])
+        self.assertEqual((result['page'], result['pages'], result['total']), (2, 2, 4))
+
+
+class ConanLayoutTests(TestCase):
+    """Tests for mapping stored tarballs to the package folder"""
+
+    def test_package_folder_path(self):
+        self.assertEqual(package_folder_path(('b', 'zlib9a8b', 'p', 'lib', 'libz.a')), 'lib/libz.a')
+        self.assertEqual(package_folder_path(('p', 'b', 'zlib9a8b', 'p', 'conaninfo.txt')), 'conaninfo.txt')
+        self.assertEqual(package_folder_path(('lib', 'libz.a')), 'lib/libz.a')
+        self.assertIsNone(package_folder_path(('pkglist.json',)))
+        self.assertIsNone(package_folder_path(('zlib5e3f', 'e', 'conanfile.py')))
+        self.assertIsNone(package_folder_path(('b', 'zlib9a8b', 'd', 'metadata', 'sign')))
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, EXTRACTED_PRECOMPUTE_ON_UPLOAD=False,
+                   RUST_CRATE_GENERATE_ON_UPLOAD=False, CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD=False)
+class ConanUploadTests(TestCase):
+    """Tests for the v1 package upload endpoint"""
+
+    def test_settings_come_from_conaninfo(self):
+        package = Package.objects.create(name='zlib')
+        PackageVersion.objects.create(package=package, version='1.3')
+        tarball = make_tarball({'conaninfo.txt': CONANINFO, 'include/zlib.h': b'int x;'})
+
+        response = Client().post(
+            reverse('packages:api_upload_package', args=['zlib', '1.3', 'zlib1']),
+            {'file': SimpleUploadedFile('conan_package.tgz', tarball)}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BinaryPackage.objects.get(package_id='zlib1').os, 'Windows')
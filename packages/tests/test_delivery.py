@@ -0,0 +1,149 @@
+"""
+Tests for stored file delivery (streamed vs presigned redirect)
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage
+from unittest.mock import patch
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class DeliveryModeTests(TestCase):
+    """Tests for download_binary and download_rust_crate delivery modes"""
+
+    def setUp(self):
+        self.client = Client()
+        self.package = Package.objects.create(name='zlib')
+        self.version = PackageVersion.objects.create(package=self.package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=self.version,
+            package_id='zlib123',
+            file_size=4
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(b'data'))
+        self.binary.rust_crate_file.save('zlib-sys-1.2.13.crate', ContentFile(b'crate'))
+        self.binary_url = reverse('packages:download_binary', args=['zlib', '1.2.13', 'zlib123'])
+        self.crate_url = reverse('packages:download_rust_crate', args=['zlib', '1.2.13', 'zlib123'])
+
+    def test_proxy_mode_streams_binary(self):
+        response = self.client.get(self.binary_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'data')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertIn('zlib-1.2.13-zlib123.tar.gz', response['Content-Disposition'])
+
+    def test_proxy_mode_streams_rust_crate(self):
+        response = self.client.get(self.crate_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'crate')
+        self.assertIn('zlib-sys-1.2.13.crate', response['Content-Disposition'])
+
+    @override_settings(DOWNLOAD_DELIVERY_MODE='redirect')
+    @patch('packages.views.download_views.presigned_url')
+    def test_redirect_mode(self, mock_presigned):
+        mock_presigned.return_value = 'http://minio.local/signed'
+
+        response = self.client.get(self.binary_url)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'http://minio.local/signed')
+        _, kwargs = mock_presigned.call_args
+        self.assertEqual(kwargs['filename'], 'zlib-1.2.13-zlib123.tar.gz')
+
+    @override_settings(DOWNLOAD_DELIVERY_MODE='redirect')
+    def test_redirect_mode_falls_back_without_presigning(self):
+        """Storage backends that can't presign URLs are streamed instead"""
+        response = self.client.get(self.crate_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'crate')
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class ConditionalDownloadTests(TestCase):
+    """Tests for ETag, conditional GET and Range support on stored downloads"""
+
+    def setUp(self):
+        self.client = Client()
+        package = Package.objects.create(name='zlib')
+        version = PackageVersion.objects.create(package=package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=version,
+            package_id='zlib123',
+            file_size=10,
+            sha256='abc123',
+            rust_crate_sha256='crate456'
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(b'0123456789'))
+        self.binary.rust_crate_file.save('zlib-sys-1.2.13.crate', ContentFile(b'crate'))
+        self.url = reverse('packages:download_binary', args=['zlib', '1.2.13', 'zlib123'])
+
+    def _download_count(self):
+        self.binary.refresh_from_db()
+        return self.binary.download_count
+
+    def test_cache_headers(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['ETag'], '"abc123"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_if_none_match_returns_304(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"abc123"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"abc123"')
+        self.assertEqual(self._download_count(), 0)
+
+    def test_changed_etag_returns_file(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"old"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._download_count(), 1)
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        # Resuming a download doesn't count as a new one
+        self.assertEqual(self._download_count(), 0)
+
+    def test_open_ended_and_suffix_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=7-')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(response['Content-Range'], 'bytes 7-9/10')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-30')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_serves_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"old"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_rust_crate_etag(self):
+        url = reverse('packages:download_rust_crate', args=['zlib', '1.2.13', 'zlib123'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"crate456"')
+
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,117 @@
+"""
+Tests for the dependency graph index
+"""
+from io import StringIO
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.management import call_command
+from packages.models import Package, PackageVersion, BinaryPackage, BinaryDependency
+from packages.dependency_index import (
+    get_dependency_edges,
+    index_binary_dependencies,
+    iter_graph_dependencies,
+)
+
+
+def make_graph(*refs):
+    """Build a conan graph info dict with (ref, package_id) dependency nodes"""
+    nodes = {'0': {'ref': 'app/1.0'}}
+    for index, (ref, package_id) in enumerate(refs, 1):
+        nodes[str(index)] = {'ref': ref, 'package_id': package_id}
+    return {'graph': {'nodes': nodes}}
+
+
+class DependencyIndexTests(TestCase):
+    """Tests for building and reading BinaryDependency rows"""
+
+    def setUp(self):
+        self.client = Client()
+        self.zlib = self._create_binary('zlib', '1.2.13', 'zlib123')
+        self.app = self._create_binary(
+            'app', '1.0', 'app123',
+            graph=make_graph(('zlib/1.2.13#rev1', 'zlib123'), ('openssl/3.0.0', 'ssl123'))
+        )
+
+    def _create_binary(self, name, version, package_id, graph=None):
+        package, _ = Package.objects.get_or_create(name=name)
+        package_version, _ = PackageVersion.objects.get_or_create(package=package, version=version)
+        return BinaryPackage.objects.create(
+            package_version=package_version,
+            package_id=package_id,
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release',
+            dependency_graph=graph or {}
+        )
+
+    def test_iter_graph_dependencies(self):
+        """Root node is skipped and recipe revisions are stripped"""
+        graph = make_graph(('zlib/1.2.13#abc', 'zlib123'), ('header-only/1.0', None))
+        graph['graph']['nodes']['9'] = {'ref': 'conanfile'}
+
+        self.assertEqual(list(iter_graph_dependencies(graph)), [
+            {'name': 'zlib', 'version': '1.2.13', 'package_id': 'zlib123'},
+            {'name': 'header-only', 'version': '1.0', 'package_id': ''},
+        ])
+
+    def test_index_built_on_save(self):
+        """Saving a binary indexes its graph and links uploaded dependencies"""
+        edges = list(self.app.graph_dependencies.order_by('position'))
+
+        self.assertEqual([(e.name, e.version) for e in edges], [('zlib', '1.2.13'), ('openssl', '3.0.0')])
+        self.assertEqual(edges[0].dependency_binary, self.zlib)
+        self.assertIsNone(edges[1].dependency_binary)
+
+    def test_late_upload_links_existing_edges(self):
+        """A dependency uploaded after its dependents is linked to them"""
+        openssl = self._create_binary('openssl', '3.0.0', 'ssl123')
+
+        edge = self.app.graph_dependencies.get(name='openssl')
+        self.assertEqual(edge.dependency_binary, openssl)
+
+    def test_graph_update_reindexes(self):
+        self.app.dependency_graph = make_graph(('zlib/1.2.13', 'zlib123'))
+        self.app.save()
+
+        self.assertEqual(self.app.graph_dependencies.count(), 1)
+
+    def test_unindexed_binary_is_indexed_on_read(self):
+        BinaryDependency.objects.all().delete()
+
+        edges = get_dependency_edges(self.app)
+
+        self.assertEqual(len(edges), 2)
+        self.assertEqual(edges[0].dependency_binary, self.zlib)
+
+    def test_edges_load_in_one_query(self):
+        """Dependency binaries come with their version and package preloaded"""
+        with self.assertNumQueries(1):
+            edges = get_dependency_edges(self.app)
+            self.assertEqual(edges[0].dependency_binary.package_version.package.name, 'zlib')
+
+    def test_bundle_preview_uses_index(self):
+        """Query count of bundle_preview does not grow with the number of dependencies"""
+        url = reverse('packages:bundle_preview', args=['app', '1.0'])
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+
+        files = response.json()['files']
+        self.assertEqual([f['package'] for f in files], ['app', 'zlib', 'openssl'])
+        self.assertIn('note', files[2])
+
+    def test_backfill_command(self):
+        BinaryDependency.objects.all().delete()
+        out = StringIO()
+
+        call_command('index_dependency_graphs', stdout=out)
+
+        self.assertEqual(BinaryDependency.objects.count(), 2)
+        self.assertIn('2 dependency row(s)', out.getvalue())
+
+    def test_index_is_idempotent(self):
+        index_binary_dependencies(self.app)
+        index_binary_dependencies(self.app)
+
+        self.assertEqual(self.app.graph_dependencies.count(), 2)
@@ -0,0 +1,77 @@
+"""
+Tests for download accounting
+"""
+from io import StringIO
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.management import call_command
+from packages.models import Package, PackageVersion, BinaryPackage, PendingDownload
+from packages.download_counts import flush_download_counts, record_download
+
+
+class DownloadCountTests(TestCase):
+    """Tests for immediate and buffered download counting"""
+
+    def setUp(self):
+        self.client = Client()
+        self.package = Package.objects.create(name='zlib')
+        self.version = PackageVersion.objects.create(package=self.package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=self.version,
+            package_id='zlib123',
+            dependency_graph={'graph': {'nodes': {'0': {'ref': 'zlib/1.2.13'}}}}
+        )
+
+    def test_immediate_count_does_not_lose_updates(self):
+        """Stale in-memory instances must not overwrite each other's increments"""
+        stale_a = BinaryPackage.objects.get(pk=self.binary.pk)
+        stale_b = BinaryPackage.objects.get(pk=self.binary.pk)
+
+        record_download(stale_a, package=self.package)
+        record_download(stale_b, package=self.package)
+
+        self.binary.refresh_from_db()
+        self.package.refresh_from_db()
+        self.assertEqual(self.binary.download_count, 2)
+        self.assertEqual(self.package.download_count, 2)
+
+    def test_immediate_count_leaves_other_fields_alone(self):
+        BinaryPackage.objects.filter(pk=self.binary.pk).update(dependency_graph={'changed': True})
+
+        record_download(self.binary)
+
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.dependency_graph, {'changed': True})
+
+    @override_settings(DOWNLOAD_COUNT_MODE='buffered')
+    def test_buffered_count_is_applied_on_flush(self):
+        record_download(self.binary, package=self.package)
+        record_download(self.binary, package=self.package)
+        record_download(self.binary)
+
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.download_count, 0)
+        self.assertEqual(PendingDownload.objects.count(), 3)
+
+        applied = flush_download_counts(batch_size=2)
+
+        self.assertEqual(applied, 3)
+        self.assertFalse(PendingDownload.objects.exists())
+        self.binary.refresh_from_db()
+        self.package.refresh_from_db()
+        self.assertEqual(self.binary.download_count, 3)
+        self.assertEqual(self.package.download_count, 2)
+
+    @override_settings(DOWNLOAD_COUNT_MODE='buffered')
+    def test_download_view_buffers_count(self):
+        url = reverse('packages:download_binary', args=['zlib', '1.2.13', 'zlib123'])
+        self.client.get(url)
+
+        self.assertEqual(PendingDownload.objects.count(), 1)
+
+        out = StringIO()
+        call_command('flush_download_counts', stdout=out)
+
+        self.assertIn('Applied 1 download(s)', out.getvalue())
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.download_count, 1)
@@ -0,0 +1,281 @@
+"""
+Tests for precomputed extracted-format artifacts
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage, PendingDeletion
+from packages.extracted import (
+    generate_extracted_artifact, is_extracted_current, iter_extracted_zip,
+    iter_extracted_bundle_zip, iter_fetched_tarballs
+)
+from unittest.mock import patch
+import io
+import stat
+import tarfile
+import threading
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_tarball(files, symlinks=None):
+    """Build a .tar.gz from a {path: bytes} dict (and {path: target} symlinks)"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        for path, data in files.items():
+            info = tarfile.TarInfo(path)
+            info.size = len(data)
+            info.mode = 0o755 if '/bin/' in f'/{path}' else 0o644
+            tar.addfile(info, io.BytesIO(data))
+        for path, target in (symlinks or {}).items():
+            info = tarfile.TarInfo(path)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target
+            tar.addfile(info)
+    return buffer.getvalue()
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class ExtractedArtifactTests(TestCase):
+    """Tests for building and serving the extracted ZIP"""
+
+    def setUp(self):
+        self.client = Client()
+        package = Package.objects.create(name='zlib')
+        version = PackageVersion.objects.create(package=package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=version,
+            package_id='zlib123',
+            os='Linux',
+            sha256='first'
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(make_tarball({
+            'include/zlib.h': b'/* header */',
+            'lib/libz.a': b'archive',
+            'conaninfo.txt': b'[settings]',
+        })))
+        self.url = reverse('packages:download_extracted_binary', args=['zlib', '1.2.13', 'zlib123'])
+
+    def _download(self, url=None):
+        response = self.client.get(url or self.url)
+        content = b''.join(response.streaming_content)
+        return response, zipfile.ZipFile(io.BytesIO(content))
+
+    def test_generate_artifact(self):
+        generate_extracted_artifact(self.binary)
+
+        self.binary.refresh_from_db()
+        self.assertTrue(is_extracted_current(self.binary))
+        with self.binary.extracted_file.open('rb') as f:
+            names = zipfile.ZipFile(io.BytesIO(f.read())).namelist()
+        self.assertEqual(sorted(names), ['README.txt', 'include/zlib.h', 'lib/libz.a'])
+
+    def test_first_download_builds_artifact_lazily(self):
+        response, zipf = self._download()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(zipf.read('include/zlib.h'), b'/* header */')
+        self.binary.refresh_from_db()
+        self.assertTrue(self.binary.extracted_file)
+        self.assertEqual(int(response['Content-Length']), self.binary.extracted_size)
+
+    def test_stored_artifact_is_served_without_rebuilding(self):
+        generate_extracted_artifact(self.binary)
+        self.binary.refresh_from_db()
+        stored_name = self.binary.extracted_file.name
+
+        self._download()
+
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.extracted_file.name, stored_name)
+        self.assertEqual(self.binary.download_count, 1)
+
+    def test_resumed_range_is_not_counted(self):
+        generate_extracted_artifact(self.binary)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+
+        self.assertEqual(response.status_code, 206)
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.download_count, 0)
+
+    def test_reupload_makes_artifact_stale(self):
+        generate_extracted_artifact(self.binary)
+        self.binary.sha256 = 'second'
+        self.binary.save()
+
+        self.assertFalse(is_extracted_current(self.binary))
+
+    def test_rebuild_queues_replaced_artifact_for_deletion(self):
+        old_name = generate_extracted_artifact(self.binary).name
+        self.binary.sha256 = 'second'
+        self.binary.save()
+
+        generate_extracted_artifact(self.binary)
+
+        self.binary.refresh_from_db()
+        self.assertNotEqual(self.binary.extracted_file.name, old_name)
+        self.assertTrue(PendingDeletion.objects.filter(name=old_name).exists())
+
+    def test_non_default_compression_is_built_on_the_fly(self):
+        response, zipf = self._download(self.url + '?compression=store')
+
+        self.assertEqual(zipf.getinfo('lib/libz.a').compress_type, zipfile.ZIP_STORED)
+        self.binary.refresh_from_db()
+        self.assertFalse(self.binary.extracted_file)
+
+    def test_broken_tarball_returns_error(self):
+        self.binary.binary_file.save('broken.tar.gz', ContentFile(b'not a tarball'))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 500)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class TarToZipTranscoderTests(TestCase):
+    """Tests for streaming tarballs into extracted ZIPs without scratch disk"""
+
+    def setUp(self):
+        self.client = Client()
+
+    def _create_binary(self, name, files, symlinks=None, graph=None):
+        package = Package.objects.create(name=name)
+        version = PackageVersion.objects.create(package=package, version='1.0')
+        binary = BinaryPackage.objects.create(
+            package_version=version,
+            package_id=f'{name}123',
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release',
+            dependency_graph=graph or {}
+        )
+        binary.binary_file.save(f'{name}.tar.gz', ContentFile(make_tarball(files, symlinks)))
+        return binary
+
+    def _read_zip(self, chunks):
+        return zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    @patch('tempfile.TemporaryDirectory', side_effect=AssertionError('no scratch disk'))
+    def test_transcodes_without_scratch_directory(self, _):
+        binary = self._create_binary('zlib', {
+            'p/include/zlib.h': b'header',
+            'p/bin/tool': b'#!/bin/sh',
+            'e/conanfile.py': b'recipe',
+        }, symlinks={'p/lib/libz.so': 'libz.so.1'})
+
+        zipf = self._read_zip(iter_extracted_zip(binary))
+
+        self.assertEqual(sorted(zipf.namelist()), ['README.txt', 'bin/tool', 'include/zlib.h', 'lib/libz.so'])
+        self.assertEqual((zipf.getinfo('bin/tool').external_attr >> 16) & 0o777, 0o755)
+        link = zipf.getinfo('lib/libz.so')
+        self.assertTrue(stat.S_ISLNK(link.external_attr >> 16))
+        self.assertEqual(zipf.read(link), b'libz.so.1')
+
+    def test_symlinks_out_of_the_archive_are_skipped(self):
+        binary = self._create_binary('evil', {'lib/libz.so.1': b'library'}, symlinks={
+            'lib/libz.so': 'libz.so.1',
+            'lib/passwd': '/etc/passwd',
+            'lib/escape': '../../home/user/.ssh/authorized_keys',
+            'include/zlib/config.h': '../../lib/libz.so.1',
+        })
+
+        zipf = self._read_zip(iter_extracted_zip(binary))
+
+        self.assertEqual(
+            sorted(zipf.namelist()),
+            ['README.txt', 'include/zlib/config.h', 'lib/libz.so', 'lib/libz.so.1']
+        )
+
+    def test_falls_back_to_all_files(self):
+        binary = self._create_binary('data', {'share/data.txt': b'data', 'conaninfo.txt': b'x'})
+
+        zipf = self._read_zip(iter_extracted_zip(binary))
+
+        self.assertEqual(sorted(zipf.namelist()), ['README.txt', 'share/data.txt'])
+
+    def test_large_member_is_copied_in_chunks(self):
+        payload = b'x' * (300 * 1024)
+        binary = self._create_binary('big', {'lib/libbig.a': payload})
+
+        with self.settings(BUNDLE_STREAM_CHUNK_SIZE=16 * 1024):
+            chunks = list(iter_extracted_zip(binary, policy='store'))
+
+        self.assertLessEqual(max(len(chunk) for chunk in chunks), 64 * 1024)
+        self.assertEqual(self._read_zip(chunks).read('lib/libbig.a'), payload)
+
+    def test_bundle_interlaces_packages(self):
+        """include/ per package, flat lib/ with renamed clashes, merged cmake/"""
+        self._create_binary('zlib', {
+            'include/zlib.h': b'zlib header',
+            'lib/libcommon.a': b'zlib lib',
+            'cmake/zlib-config.cmake': b'zlib cmake',
+        })
+        self._create_binary('app', {
+            'include/app.h': b'app header',
+            'lib/libcommon.a': b'app lib',
+            'cmake/app-config.cmake': b'app cmake',
+        }, graph={'graph': {'nodes': {'0': {'ref': 'app/1.0'}, '1': {'ref': 'zlib/1.0', 'package_id': 'zlib123'}}}})
+
+        url = reverse('packages:download_extracted_bundle', args=['app', '1.0'])
+        response = self.client.get(url)
+        zipf = self._read_zip(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(zipf.read('include/app/app.h'), b'app header')
+        self.assertEqual(zipf.read('include/zlib/zlib.h'), b'zlib header')
+        self.assertEqual(zipf.read('lib/libcommon.a'), b'app lib')
+        self.assertEqual(zipf.read('lib/zlib_libcommon.a'), b'zlib lib')
+        self.assertIn('cmake/zlib-config.cmake', zipf.namelist())
+        self.assertIn('cmake/app-config.cmake', zipf.namelist())
+
+    def _bundle_entries(self, *binaries):
+        return [(binary, binary.package_version.package.name, '1.0') for binary in binaries]
+
+    def test_parallel_bundle_matches_serial_build(self):
+        entries = self._bundle_entries(
+            self._create_binary('a', {'lib/libcommon.a': b'a', 'include/a.h': b'a'}),
+            self._create_binary('b', {'lib/libcommon.a': b'b', 'include/b.h': b'b'}),
+            self._create_binary('c', {'lib/libcommon.a': b'c', 'bin/tool': b'c'}),
+        )
+
+        serial = b''.join(iter_extracted_bundle_zip(entries, 'readme', policy='store', workers=1))
+        parallel = b''.join(iter_extracted_bundle_zip(entries, 'readme', policy='store', workers=3))
+
+        self.assertEqual(serial, parallel)
+        zipf = self._read_zip([parallel])
+        self.assertEqual(zipf.read('lib/libcommon.a'), b'a')
+        self.assertEqual(zipf.read('lib/c_libcommon.a'), b'c')
+
+    def test_bundle_skips_unreadable_tarball(self):
+        broken = self._create_binary('broken', {})
+        broken.binary_file.save('broken.tar.gz', ContentFile(b'not a tarball'))
+        entries = self._bundle_entries(broken, self._create_binary('zlib', {'include/zlib.h': b'h'}))
+
+        zipf = self._read_zip(iter_extracted_bundle_zip(entries, 'readme', workers=2))
+
+        self.assertEqual(sorted(zipf.namelist()), ['README.txt', 'include/zlib/zlib.h'])
+
+    def test_fetches_run_concurrently_and_yield_in_order(self):
+        entries = self._bundle_entries(
+            self._create_binary('a', {'include/a.h': b'a'}),
+            self._create_binary('b', {'include/b.h': b'b'}),
+        )
+        # Each fetch waits for the other: only passes if both run at once
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fetch(binary):
+            barrier.wait()
+            return io.BytesIO(binary.package_id.encode())
+
+        with patch('packages.extracted._fetch_tarball', side_effect=fetch):
+            results = [future.result().getvalue() for _, future in iter_fetched_tarballs(entries, workers=2)]
+
+        self.assertEqual(results, [b'a123', b'b123'])
@@ -0,0 +1,140 @@
+"""
+Tests for single-pass upload ingestion
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from packages.models import BinaryPackage
+from packages.ingest import ConaninfoScanner, scan_conaninfo
+from unittest.mock import patch
+import hashlib
+import io
+import os
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+CONANINFO = b'[settings]\narch=armv8\nbuild_type=Debug\ncompiler=clang\ncompiler.version=15\nos=Macos\n'
+
+
+def make_tarball(files, format=tarfile.PAX_FORMAT):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz', format=format) as tar:
+        for path, data in files:
+            info = tarfile.TarInfo(path)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def feed_in_chunks(scanner, data, size=1000):
+    for offset in range(0, len(data), size):
+        scanner.feed(data[offset:offset + size])
+
+
+class ConaninfoScannerTests(TestCase):
+    """Tests for the push-based conaninfo.txt scanner"""
+
+    def test_finds_conaninfo_after_other_members(self):
+        for tar_format in (tarfile.PAX_FORMAT, tarfile.GNU_FORMAT, tarfile.USTAR_FORMAT):
+            data = make_tarball([
+                ('p/lib/libbig.a', os.urandom(200 * 1024)),
+                ('p/conaninfo.txt', CONANINFO),
+            ], format=tar_format)
+            scanner = ConaninfoScanner()
+
+            feed_in_chunks(scanner, data)
+
+            self.assertTrue(scanner.done)
+            self.assertEqual(scanner.content, CONANINFO.decode())
+
+    def test_long_member_names(self):
+        data = make_tarball([
+            ('p/' + 'deep/' * 40 + 'conaninfo.txt', CONANINFO),
+        ], format=tarfile.GNU_FORMAT)
+        scanner = ConaninfoScanner()
+
+        feed_in_chunks(scanner, data)
+
+        self.assertEqual(scanner.content, CONANINFO.decode())
+
+    def test_stops_inflating_once_found(self):
+        data = make_tarball([
+            ('p/conaninfo.txt', CONANINFO),
+            ('p/lib/libbig.a', os.urandom(500 * 1024)),
+        ])
+        scanner = ConaninfoScanner()
+
+        with patch.object(scanner, '_consume', wraps=scanner._consume) as consume:
+            feed_in_chunks(scanner, data, size=16 * 1024)
+
+        self.assertEqual(scanner.content, CONANINFO.decode())
+        self.assertLess(consume.call_count, 5)
+
+    def test_not_a_tarball(self):
+        scanner = ConaninfoScanner()
+
+        scanner.feed(b'definitely not gzip' * 100)
+
+        self.assertTrue(scanner.done)
+        self.assertIsNone(scanner.content)
+
+    def test_scan_conaninfo_rewinds(self):
+        fileobj = io.BytesIO(make_tarball([('conaninfo.txt', CONANINFO)]))
+
+        self.assertEqual(scan_conaninfo(fileobj), CONANINFO.decode())
+        self.assertEqual(fileobj.tell(), 0)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, EXTRACTED_PRECOMPUTE_ON_UPLOAD=False,
+                   RUST_CRATE_GENERATE_ON_UPLOAD=False, CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD=False)
+class SinglePassUploadTests(TestCase):
+    """Tests for the simple upload endpoint storing binaries in one pass"""
+
+    def setUp(self):
+        self.client = Client()
+        self.tarball = make_tarball([
+            ('p/include/zlib.h', b'header'),
+            ('p/conaninfo.txt', CONANINFO),
+        ])
+
+    def _upload(self, **extra):
+        data = {
+            'recipe': SimpleUploadedFile('conanfile.py', b'class Zlib: pass'),
+            'binary': SimpleUploadedFile('zlib.tar.gz', self.tarball),
+            'package_name': 'zlib',
+            'version': '1.2.13',
+        }
+        data.update(extra)
+        return self.client.post(reverse('packages:simple_upload'), data)
+
+    @patch('packages.views.simple_upload.extract_conaninfo', side_effect=AssertionError('extra read'))
+    def test_upload_hashes_inspects_and_stores(self, _):
+        response = self._upload(
+            package_id='abc123',
+            rust_crate=SimpleUploadedFile('zlib-sys-1.2.13.crate', b'crate bytes')
+        )
+
+        self.assertEqual(response.status_code, 200)
+        binary = BinaryPackage.objects.get(package_id='abc123')
+        self.assertEqual(binary.sha256, hashlib.sha256(self.tarball).hexdigest())
+        self.assertEqual(binary.file_size, len(self.tarball))
+        self.assertEqual(binary.binary_file.read(), self.tarball)
+        self.assertEqual(
+            (binary.os, binary.arch, binary.compiler, binary.compiler_version, binary.build_type),
+            ('Macos', 'armv8', 'clang', '15', 'Debug')
+        )
+        self.assertEqual(binary.rust_crate_sha256, hashlib.sha256(b'crate bytes').hexdigest())
+        self.assertEqual(binary.rust_crate_file.read(), b'crate bytes')
+
+    def test_upload_without_package_id_uses_settings(self):
+        response = self._upload()
+
+        self.assertEqual(response.status_code, 200)
+        binary = BinaryPackage.objects.get()
+        self.assertEqual(binary.os, 'Macos')
+        self.assertEqual(binary.sha256, hashlib.sha256(self.tarball).hexdigest())
@@ -0,0 +1,189 @@
+"""
+Tests for the background job queue
+"""
+from datetime import timedelta
+from io import StringIO
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from packages.jobs import JOB_HANDLERS, claim_job, enqueue, run_jobs
+from packages.models import Package, PackageVersion, BinaryPackage, BinaryDependency, BundleCacheEntry, Job
+from packages.views.download_views import prewarm_bundle
+from unittest.mock import MagicMock, patch
+import io
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_tarball():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for name, data in [('conaninfo.txt', b'[settings]\nos=Linux\n'), ('include/zlib.h', b'int x;')]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def make_binary(name='zlib', package_id='zlib1', graph=None):
+    package, _ = Package.objects.get_or_create(name=name)
+    version, _ = PackageVersion.objects.get_or_create(package=package, version='1.0')
+    return BinaryPackage.objects.create(
+        package_version=version, package_id=package_id, os='Linux', arch='x86_64',
+        compiler='gcc', compiler_version='11', build_type='Release', dependency_graph=graph or {}
+    )
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, JOB_QUEUE_MODE='queued')
+class QueuedUploadTests(TestCase):
+    """Tests for uploads handing their derived work to the queue"""
+
+    def test_upload_queues_derived_artifacts(self):
+        response = Client().post(reverse('packages:simple_upload'), {
+            'recipe': SimpleUploadedFile('conanfile.py', b'class Zlib: pass'),
+            'binary': SimpleUploadedFile('zlib.tar.gz', make_tarball()),
+            'package_name': 'zlib',
+            'version': '1.0',
+            'package_id': 'zlib1',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        binary = BinaryPackage.objects.get()
+        self.assertFalse(binary.extracted_file)
+        self.assertEqual(
+            sorted(Job.objects.values_list('kind', flat=True)),
+            ['build_conan_package', 'build_extracted', 'build_rust_crate', 'index_dependencies']
+        )
+
+        self.assertEqual(run_jobs(), (4, 0))
+
+        binary.refresh_from_db()
+        self.assertTrue(binary.extracted_file)
+        self.assertTrue(binary.rust_crate_file)
+        self.assertTrue(binary.conan_revision.package_file)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_QUEUE_MODE='immediate')
+    def test_immediate_upload_leaves_artifacts_to_first_download(self):
+        response = Client().post(reverse('packages:simple_upload'), {
+            'recipe': SimpleUploadedFile('conanfile.py', b'class Zlib: pass'),
+            'binary': SimpleUploadedFile('zlib.tar.gz', make_tarball()),
+            'package_name': 'zlib',
+            'version': '1.0',
+            'package_id': 'zlib1',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        binary = BinaryPackage.objects.get()
+        self.assertFalse(binary.extracted_file)
+        self.assertFalse(binary.rust_crate_file)
+        self.assertFalse(Job.objects.exists())
+
+    def test_dependency_index_is_rebuilt_by_worker(self):
+        make_binary('openssl', 'ssl1')
+        graph = {'graph': {'nodes': {'0': {'ref': 'app/1.0'}, '1': {'ref': 'openssl/1.0', 'package_id': 'ssl1'}}}}
+        app = make_binary('app', 'app1', graph=graph)
+
+        self.assertFalse(BinaryDependency.objects.filter(binary=app).exists())
+        run_jobs()
+
+        self.assertEqual(BinaryDependency.objects.get(binary=app).dependency_binary.package_id, 'ssl1')
+
+    def test_rolled_back_transaction_queues_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                make_binary()
+                raise RuntimeError('rollback')
+
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_QUEUE_MODE='immediate')
+    def test_immediate_mode_runs_jobs_in_request(self):
+        handler = MagicMock()
+        with patch.dict(JOB_HANDLERS, {'build_extracted': handler}):
+            self.assertIsNone(enqueue('build_extracted', binary_id=1))
+
+        handler.assert_called_once_with(binary_id=1)
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(JOB_QUEUE_MODE='queued', JOB_RETRY_DELAY=60, JOB_MAX_ATTEMPTS=2)
+class WorkerTests(TestCase):
+    """Tests for claiming, retrying and giving up on jobs"""
+
+    def setUp(self):
+        self.handler = MagicMock()
+        handlers = patch.dict(JOB_HANDLERS, {'test': self.handler})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def _make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        self.handler.side_effect = [RuntimeError('boom'), None]
+        job = enqueue('test', value=1)
+
+        self.assertEqual(run_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=30))
+        self.assertEqual(run_jobs(), (0, 0))
+
+        self._make_due(job)
+        self.assertEqual(run_jobs(), (1, 0))
+        self.assertFalse(Job.objects.exists())
+
+    def test_claimed_job_is_invisible_until_timeout(self):
+        job = enqueue('test')
+        self.assertEqual(claim_job('dead-worker').pk, job.pk)
+
+        self.assertEqual(run_jobs(), (0, 0))
+
+        self._make_due(job)
+        self.assertEqual(run_jobs(), (1, 0))
+        self.handler.assert_called_once_with()
+
+    def test_exhausted_job_is_kept(self):
+        self.handler.side_effect = RuntimeError('boom')
+        job = enqueue('test')
+        for _ in range(3):
+            run_jobs()
+            self._make_due(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(self.handler.call_count, 2)
+
+    def test_command_runs_due_jobs(self):
+        enqueue('test')
+        out = StringIO()
+
+        call_command('run_workers', stdout=out)
+
+        self.assertIn('ran 1 job(s), 0 failed', out.getvalue())
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, BUNDLE_CACHE_ENABLED=True)
+class BundlePrewarmTests(TestCase):
+    """Tests for building a binary's bundle into the cache"""
+
+    def test_prewarm_fills_bundle_cache(self):
+        binary = make_binary()
+        binary.sha256 = 'zlib-sha'
+        binary.binary_file.save('zlib.tar.gz', ContentFile(make_tarball()))
+
+        self.assertTrue(prewarm_bundle(binary))
+        self.assertEqual(BundleCacheEntry.objects.count(), 1)
+        self.assertFalse(prewarm_bundle(binary))
@@ -0,0 +1,68 @@
+"""
+Tests for the bulk package existence check API
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage
+import json
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class PackageExistsTests(TestCase):
+    """Tests for POST /api/package/exists"""
+
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('packages:check_packages_exist')
+
+        package = Package.objects.create(name='zlib')
+        version = PackageVersion.objects.create(package=package, version='1.2.13')
+        binary = BinaryPackage.objects.create(package_version=version, package_id='zlib123', sha256='abc')
+        binary.binary_file.save('zlib.tar.gz', ContentFile(b'data'))
+        # Row without a stored file doesn't count as uploaded
+        BinaryPackage.objects.create(package_version=version, package_id='nofile')
+
+    def _check(self, packages):
+        return self.client.post(self.url, json.dumps({'packages': packages}), content_type='application/json')
+
+    def test_reports_existing_and_missing_in_order(self):
+        with self.assertNumQueries(1):
+            response = self._check([
+                {'name': 'boost', 'version': '1.81.0', 'package_id': 'boost1'},
+                {'name': 'zlib', 'version': '1.2.13', 'package_id': 'zlib123'},
+                {'name': 'zlib', 'version': '1.2.13', 'package_id': 'nofile'},
+                {'name': 'zlib', 'version': '1.3', 'package_id': 'zlib123'},
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([p['exists'] for p in data['packages']], [False, True, False, False])
+        self.assertEqual(data['existing'], 1)
+        self.assertEqual(data['missing'], 3)
+
+    def test_sha256_comparison(self):
+        response = self._check([
+            {'name': 'zlib', 'version': '1.2.13', 'package_id': 'zlib123', 'sha256': 'abc'},
+            {'name': 'zlib', 'version': '1.2.13', 'package_id': 'zlib123', 'sha256': 'other'},
+        ])
+
+        self.assertEqual([p['sha256_matches'] for p in response.json()['packages']], [True, False])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.post(self.url, 'nope', content_type='application/json').status_code, 400)
+        self.assertEqual(self._check([{'name': 'zlib'}]).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_batch_limit(self):
+        from packages.views import simple_upload
+        packages = [{'name': 'a', 'version': '1', 'package_id': str(i)}
+                    for i in range(simple_upload.MAX_EXISTS_BATCH + 1)]
+
+        self.assertEqual(self._check(packages).status_code, 400)
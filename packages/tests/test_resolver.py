@@ -0,0 +1,80 @@
+"""
+Tests for batch resolution of bundle contents
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage, BinaryDependency
+from packages.resolver import resolve_bundle_dependencies, resolve_graph
+import io
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, BUNDLE_CACHE_ENABLED=False)
+class ResolverTests(TestCase):
+    """Tests for resolving dependency binaries in bulk"""
+
+    DEPENDENCY_COUNT = 12
+
+    def setUp(self):
+        self.client = Client()
+        nodes = {'0': {'ref': 'app/1.0'}}
+        for index in range(self.DEPENDENCY_COUNT):
+            self._create_binary(f'dep{index}', '1.0', f'id{index}', recipe=f'class Dep{index}: pass')
+            nodes[str(index + 1)] = {'ref': f'dep{index}/1.0#rev', 'package_id': f'id{index}'}
+        nodes['missing'] = {'ref': 'missing/2.0', 'package_id': 'nope'}
+        self.graph = {'graph': {'nodes': nodes}}
+        self.app = self._create_binary('app', '1.0', 'app123', graph=self.graph)
+
+    def _create_binary(self, name, version, package_id, graph=None, recipe=''):
+        package = Package.objects.create(name=name)
+        package_version = PackageVersion.objects.create(
+            package=package, version=version, recipe_content=recipe
+        )
+        binary = BinaryPackage.objects.create(
+            package_version=package_version,
+            package_id=package_id,
+            os='Linux',
+            arch='x86_64',
+            compiler='gcc',
+            compiler_version='11',
+            build_type='Release',
+            dependency_graph=graph or {},
+            file_size=4
+        )
+        binary.binary_file.save(f'{name}.tar.gz', ContentFile(b'data'))
+        return binary
+
+    def test_resolve_graph_in_one_query(self):
+        with self.assertNumQueries(1):
+            resolved = resolve_graph(self.graph)
+            recipes = [dep['binary'].package_version.recipe_content for dep in resolved if dep['binary']]
+
+        self.assertEqual(len(resolved), self.DEPENDENCY_COUNT + 1)
+        self.assertIsNone(resolved[-1]['binary'])
+        self.assertEqual(recipes[0], 'class Dep0: pass')
+
+    def test_unindexed_binary_falls_back_to_graph(self):
+        BinaryDependency.objects.all().delete()
+
+        with self.assertNumQueries(2):
+            resolved = resolve_bundle_dependencies(self.app)
+
+        self.assertEqual(resolved[0]['binary'].package_version.package.name, 'dep0')
+
+    def test_bundle_queries_do_not_grow_with_dependencies(self):
+        """Binaries and recipes of every dependency come from one query"""
+        url = reverse('packages:download_bundle', args=['app', '1.0'])
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+            content = b''.join(response.streaming_content)
+
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            self.assertEqual(zipf.read('dep11-1.0/conanfile.py'), b'class Dep11: pass')
+            self.assertEqual(zipf.read('dep11-1.0/dep11-1.0-id11.tar.gz'), b'data')
@@ -0,0 +1,132 @@
+"""
+Tests for Rust crate bundles
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from packages.models import Package, PackageVersion, BinaryPackage, BundleCacheEntry
+from packages.rust_bundle import rewrite_manifest
+from unittest.mock import patch
+import io
+import tarfile
+import zipfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_crate(crate_name, files):
+    """Build a .crate tarball with every file under <crate_name>/"""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for path, data in files.items():
+            info = tarfile.TarInfo(f'{crate_name}/{path}')
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class ManifestRewriteTests(TestCase):
+    """Tests for Cargo.toml path dependency rewriting"""
+
+    def test_bundled_dependencies_get_paths(self):
+        content = '[dependencies]\nzlib-sys = "1.2.13"\nserde = "1.0"\n'
+
+        rewritten = rewrite_manifest(content, ['zlib-sys'])
+
+        self.assertIn('zlib-sys = { version = "1.2.13", path = "../zlib-sys" }', rewritten)
+        self.assertIn('serde = "1.0"', rewritten)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class RustBundleTests(TestCase):
+    """Tests for download_rust_bundle"""
+
+    def setUp(self):
+        self.client = Client()
+        self.zlib = self._create_binary('zlib', '1.2.13', {
+            'Cargo.toml': b'[package]\nname = "zlib-sys"\n',
+            'src/lib.rs': b'// zlib',
+        })
+        self.app = self._create_binary('my_app', '1.0', {
+            'Cargo.toml': b'[dependencies]\nzlib-sys = "1.2.13"\n',
+            'src/lib.rs': b'// app',
+        }, graph={'graph': {'nodes': {
+            '0': {'ref': 'my_app/1.0'},
+            '1': {'ref': 'zlib/1.2.13', 'package_id': 'zlib123'},
+        }}})
+        self.url = reverse('packages:download_rust_bundle', args=['my_app', '1.0', 'my_app123'])
+
+    def _create_binary(self, name, version, files, graph=None):
+        package = Package.objects.create(name=name)
+        package_version = PackageVersion.objects.create(package=package, version=version)
+        binary = BinaryPackage.objects.create(
+            package_version=package_version,
+            package_id=f'{name}123',
+            dependency_graph=graph or {'graph': {'nodes': {}}},
+            rust_crate_sha256=f'{name}-sha'
+        )
+        crate_name = f"{name.replace('_', '-')}-sys"
+        binary.rust_crate_file.save(f'{crate_name}-{version}.crate', ContentFile(make_crate(crate_name, files)))
+        return binary
+
+    def _read_zip(self, response):
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    @patch('tempfile.mkdtemp', side_effect=AssertionError('no scratch directory'))
+    def test_bundle_links_crates_in_stream(self, _):
+        response = self.client.get(self.url)
+        zipf = self._read_zip(response)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('my-app-sys-bundle.zip', response['Content-Disposition'])
+        self.assertEqual(sorted(zipf.namelist()), [
+            'crates/README.md',
+            'crates/my-app-sys/Cargo.toml',
+            'crates/my-app-sys/src/lib.rs',
+            'crates/zlib-sys/Cargo.toml',
+            'crates/zlib-sys/src/lib.rs',
+        ])
+        self.assertIn(
+            b'zlib-sys = { version = "1.2.13", path = "../zlib-sys" }',
+            zipf.read('crates/my-app-sys/Cargo.toml')
+        )
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self._read_zip(self.client.get(self.url))
+        entry = BundleCacheEntry.objects.get()
+
+        second = self._read_zip(self.client.get(self.url))
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.hit_count, 1)
+        self.assertEqual(second.namelist(), first.namelist())
+        self.app.refresh_from_db()
+        self.assertEqual(self.app.download_count, 2)
+
+    def test_resumed_cached_bundle_is_not_counted(self):
+        self._read_zip(self.client.get(self.url))
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+
+        self.assertEqual(response.status_code, 206)
+        self.app.refresh_from_db()
+        self.assertEqual(self.app.download_count, 1)
+
+    def test_new_dependency_crate_changes_cache_key(self):
+        self._read_zip(self.client.get(self.url))
+        BinaryPackage.objects.filter(pk=self.zlib.pk).update(rust_crate_sha256='zlib-sha-2')
+
+        self._read_zip(self.client.get(self.url))
+
+        self.assertEqual(BundleCacheEntry.objects.count(), 2)
+
+    def test_crates_without_sha256_are_not_cached(self):
+        BinaryPackage.objects.filter(pk=self.zlib.pk).update(rust_crate_sha256='')
+
+        self._read_zip(self.client.get(self.url))
+
+        self.assertFalse(BundleCacheEntry.objects.exists())
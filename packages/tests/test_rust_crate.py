@@ -0,0 +1,117 @@
+"""
+Tests for server-side Rust crate generation
+"""
+from django.core.files.base import ContentFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from packages.models import Package, PackageVersion, BinaryPackage, StoredBlob
+from packages.rust_crate import generate_rust_crate, get_rust_crate, is_rust_crate_current, library_name
+import io
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_tarball(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def read_crate(field_file):
+    with field_file.open('rb') as f, tarfile.open(fileobj=f, mode='r:gz') as tar:
+        return {member.name: tar.extractfile(member).read() for member in tar.getmembers()}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class RustCrateGenerationTests(TestCase):
+    """Tests for deriving the -sys crate from a stored Conan tarball"""
+
+    def setUp(self):
+        package = Package.objects.create(name='my_zlib')
+        version = PackageVersion.objects.create(package=package, version='1.2.13')
+        self.binary = BinaryPackage.objects.create(
+            package_version=version,
+            package_id='zlib123',
+            sha256='binary1',
+            dependency_graph={'graph': {'nodes': {
+                '0': {'ref': 'my_zlib/1.2.13'},
+                '1': {'ref': 'bzip2/1.0.8#rev', 'package_id': 'bz1'},
+            }}}
+        )
+        self.binary.binary_file.save('zlib.tar.gz', ContentFile(make_tarball({
+            'conaninfo.txt': b'[settings]\nos=Linux\n',
+            'include/zlib.h': b'int deflate();',
+            'include/sub/zconf.h': b'#define Z 1',
+            'lib/libz.a': b'static archive',
+            'lib/zlib.lib': b'windows library',
+            'lib/cmake/zlib-config.cmake': b'# cmake',
+            'bin/minigzip': b'tool',
+        })))
+
+    def test_library_name(self):
+        self.assertEqual(library_name('libz.a'), 'z')
+        self.assertEqual(library_name('libfoo.lib'), 'libfoo')
+        self.assertEqual(library_name('zlib.lib'), 'zlib')
+
+    def test_crate_layout(self):
+        files = read_crate(generate_rust_crate(self.binary))
+
+        self.assertEqual(sorted(files), [
+            'my-zlib-sys/Cargo.toml',
+            'my-zlib-sys/README.md',
+            'my-zlib-sys/build.rs',
+            'my-zlib-sys/include/sub/zconf.h',
+            'my-zlib-sys/include/zlib.h',
+            'my-zlib-sys/native/current/libz.a',
+            'my-zlib-sys/native/current/zlib.lib',
+            'my-zlib-sys/src/lib.rs',
+        ])
+        self.assertEqual(files['my-zlib-sys/native/current/libz.a'], b'static archive')
+        cargo_toml = files['my-zlib-sys/Cargo.toml'].decode()
+        self.assertIn('name = "my-zlib-sys"', cargo_toml)
+        self.assertIn('bzip2-sys = { version = "1.0.8", path = "../bzip2-sys" }', cargo_toml)
+        build_rs = files['my-zlib-sys/build.rs'].decode()
+        self.assertIn('cargo:rustc-link-lib=static=z"', build_rs)
+        self.assertIn('cargo:rustc-link-lib=static=zlib"', build_rs)
+
+    def test_rebuild_reuses_blob(self):
+        generate_rust_crate(self.binary)
+        first = self.binary.rust_crate_sha256
+        self.binary.rust_crate_source_sha256 = 'stale'
+
+        generate_rust_crate(self.binary)
+
+        self.assertEqual(self.binary.rust_crate_sha256, first)
+        self.assertEqual(StoredBlob.objects.get(pk=first).ref_count, 1)
+        self.assertTrue(is_rust_crate_current(self.binary))
+
+    def test_reuploaded_binary_makes_crate_stale(self):
+        generate_rust_crate(self.binary)
+
+        self.binary.sha256 = 'binary2'
+
+        self.assertFalse(is_rust_crate_current(self.binary))
+
+    def test_crate_without_binary_is_unavailable(self):
+        binary = BinaryPackage.objects.create(package_version=self.binary.package_version, package_id='empty')
+
+        self.assertIsNone(get_rust_crate(binary))
+
+    def test_download_builds_crate_on_first_request(self):
+        url = reverse('packages:download_rust_crate', args=['my_zlib', '1.2.13', 'zlib123'])
+
+        response = Client().get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('my-zlib-sys-1.2.13.crate', response['Content-Disposition'])
+        self.binary.refresh_from_db()
+        self.assertEqual(self.binary.rust_crate_source_sha256, 'binary1')
@@ -171,6 +171,25 @@ class RustCrateDownloadTests(TestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    def test_rust_crate_by_settings_skips_binaries_without_files(self):
+        """Test that binaries with neither a crate nor a tarball (NULL files) don't match"""
+        BinaryPackage.objects.create(
+            package_version=self.version,
+            package_id='def456',
+            os='Windows',
+            arch='x86_64',
+            rust_crate_file=None,
+            binary_file=None
+        )
+        url = reverse('packages:rust_crate_by_settings_api', kwargs={
+            'package_name': 'testlib',
+            'version': '1.0.0'
+        })
+
+        response = self.client.get(url, {'os': 'Windows'})
+
+        self.assertEqual(response.status_code, 404)
+
     def test_rust_crate_by_settings_partial_match(self):
         """Test that API works with partial settings (filters are optional)"""
         url = reverse('packages:rust_crate_by_settings_api', kwargs={
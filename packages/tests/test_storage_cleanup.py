@@ -0,0 +1,101 @@
+"""
+Tests for queued, batched deletion of stored objects
+"""
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage, default_storage
+from packages.models import Package, PackageVersion, BinaryPackage, PendingDeletion
+from packages.storage_cleanup import drain_deletions, schedule_deletion
+from storages.backends.s3boto3 import S3Boto3Storage
+from unittest.mock import MagicMock, PropertyMock, patch
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class DeletionQueueTests(TestCase):
+    """Tests for queueing deletions from signals and draining the queue"""
+
+    def setUp(self):
+        self.package = Package.objects.create(name='zlib')
+        version = PackageVersion.objects.create(package=self.package, version='1.2.13')
+        version.recipe_file.save('conanfile.py', ContentFile(b'recipe'))
+        self.names = [version.recipe_file.name]
+        for n in range(3):
+            binary = BinaryPackage.objects.create(package_version=version, package_id=f'zlib{n}')
+            binary.binary_file.save(f'zlib{n}.tar.gz', ContentFile(b'binary'))
+            self.names.append(binary.binary_file.name)
+
+    def test_cascade_delete_only_queues_names(self):
+        with patch.object(InMemoryStorage, 'delete', side_effect=AssertionError('deleted in request')):
+            self.package.delete()
+
+        self.assertEqual(sorted(PendingDeletion.objects.values_list('name', flat=True)), sorted(self.names))
+        self.assertTrue(all(default_storage.exists(name) for name in self.names))
+
+    def test_drain_deletes_queued_objects(self):
+        self.package.delete()
+
+        self.assertEqual(drain_deletions(), len(self.names))
+
+        self.assertFalse(any(default_storage.exists(name) for name in self.names))
+        self.assertFalse(PendingDeletion.objects.exists())
+
+    def test_rolled_back_delete_queues_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.package.delete()
+                raise RuntimeError('rollback')
+
+        self.assertFalse(PendingDeletion.objects.exists())
+        self.assertEqual(BinaryPackage.objects.count(), 3)
+
+
+class BatchDeleteTests(TestCase):
+    """Tests for draining into S3 DeleteObjects calls (client mocked)"""
+
+    def setUp(self):
+        self.storage = S3Boto3Storage(bucket_name='conancrates', access_key='key', secret_key='secret')
+        self.client = MagicMock()
+        self.client.delete_objects.return_value = {}
+        bucket = patch.object(S3Boto3Storage, 'bucket', new_callable=PropertyMock,
+                              return_value=MagicMock(meta=MagicMock(client=self.client)))
+        bucket.start()
+        self.addCleanup(bucket.stop)
+
+    def test_objects_are_deleted_1000_per_call(self):
+        schedule_deletion(*[f'binaries/{n}.tar.gz' for n in range(2500)])
+
+        self.assertEqual(drain_deletions(storage=self.storage), 2500)
+
+        batches = [call.kwargs['Delete']['Objects'] for call in self.client.delete_objects.call_args_list]
+        self.assertEqual([len(batch) for batch in batches], [1000, 1000, 500])
+        self.assertEqual(batches[0][0], {'Key': 'binaries/0.tar.gz'})
+        self.assertFalse(PendingDeletion.objects.exists())
+
+    def test_failed_objects_stay_queued(self):
+        schedule_deletion('binaries/ok.tar.gz', 'binaries/denied.tar.gz')
+        self.client.delete_objects.return_value = {
+            'Errors': [{'Key': 'binaries/denied.tar.gz', 'Code': 'AccessDenied', 'Message': 'no'}]
+        }
+
+        self.assertEqual(drain_deletions(storage=self.storage), 1)
+
+        pending = PendingDeletion.objects.get()
+        self.assertEqual(pending.name, 'binaries/denied.tar.gz')
+        self.assertEqual(pending.attempts, 1)
+        self.assertIn('AccessDenied', pending.last_error)
+
+    def test_unreachable_storage_stops_draining(self):
+        schedule_deletion('binaries/a.tar.gz')
+        self.client.delete_objects.side_effect = ConnectionError('minio down')
+
+        self.assertEqual(drain_deletions(storage=self.storage), 0)
+
+        self.assertEqual(self.client.delete_objects.call_count, 1)
+        self.assertEqual(PendingDeletion.objects.get().attempts, 1)
@@ -0,0 +1,150 @@
+"""
+Tests for the orphaned-object garbage collector
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from packages.models import Package, PackageVersion, BinaryPackage, StoredBlob, UploadSession
+from packages.storage_gc import ReferenceSet, collect_garbage, iter_stored_objects, managed_prefixes
+from storages.backends.s3boto3 import S3Boto3Storage
+from unittest.mock import MagicMock, PropertyMock, patch
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class ReferenceSetTests(TestCase):
+    """Tests for the on-disk reference set"""
+
+    def test_membership(self):
+        with ReferenceSet() as references:
+            references.update(f'binaries/{n}.tar.gz' for n in range(1000))
+            references.update(['binaries/1.tar.gz'])
+
+            self.assertEqual(len(references), 1000)
+            self.assertIn('binaries/999.tar.gz', references)
+            self.assertNotIn('binaries/1000.tar.gz', references)
+
+    def test_managed_prefixes(self):
+        self.assertEqual(
+            managed_prefixes(),
+            ['binaries/', 'blobs/', 'bundle_cache/', 'extracted/', 'recipes/', 'rust_crates/', 'uploads/']
+        )
+
+
+class GarbageCollectionTests(TestCase):
+    """Tests for mark and sweep over the default storage"""
+
+    def setUp(self):
+        # A fresh in-memory storage per test: the sweep sees every object in it
+        storages = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+        version = PackageVersion.objects.create(package=Package.objects.create(name='zlib'), version='1.2.13')
+        binary = BinaryPackage.objects.create(package_version=version, package_id='zlib1')
+        binary.binary_file.save('zlib.tar.gz', ContentFile(b'binary'))
+        self.referenced = binary.binary_file.name
+
+        self.live_blob = default_storage.save('blobs/aa/aa.tar.gz', ContentFile(b'live'))
+        StoredBlob.objects.create(sha256='aa', file=self.live_blob, size=4, ref_count=1)
+        self.stale_blob = default_storage.save('blobs/bb/bb.tar.gz', ContentFile(b'stale'))
+        StoredBlob.objects.create(sha256='bb', file=self.stale_blob, size=5, ref_count=0)
+
+        self.orphan = default_storage.save('binaries/orphan.tar.gz', ContentFile(b'orphan bytes'))
+        self.unmanaged = default_storage.save('backups/db.sqlite3', ContentFile(b'backup'))
+
+    def test_dry_run_reports_without_deleting(self):
+        found = []
+
+        report = collect_garbage(dry_run=True, grace_period=0, on_unreferenced=lambda name, size: found.append(name))
+
+        self.assertEqual(sorted(found), sorted([self.orphan, self.stale_blob]))
+        self.assertEqual(report.reclaimable_bytes, len(b'orphan bytes') + len(b'stale'))
+        self.assertEqual(report.stale_blobs, 1)
+        self.assertEqual(report.deleted, 0)
+        self.assertTrue(default_storage.exists(self.orphan))
+        self.assertTrue(StoredBlob.objects.filter(pk='bb').exists())
+
+    def test_unreferenced_objects_are_deleted(self):
+        report = collect_garbage(grace_period=0)
+
+        self.assertEqual(report.deleted, 2)
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertFalse(default_storage.exists(self.stale_blob))
+        self.assertFalse(StoredBlob.objects.filter(pk='bb').exists())
+        for name in (self.referenced, self.live_blob, self.unmanaged):
+            self.assertTrue(default_storage.exists(name))
+
+    def test_object_referenced_after_marking_is_kept(self):
+        def revive(name, size):
+            # An upload reusing the object between the mark and the sweep
+            if name == self.stale_blob:
+                StoredBlob.objects.create(sha256='bb', file=self.stale_blob, size=5, ref_count=1)
+
+        report = collect_garbage(grace_period=0, on_unreferenced=revive)
+
+        self.assertEqual(report.revived, 1)
+        self.assertEqual(report.deleted, 1)
+        self.assertTrue(default_storage.exists(self.stale_blob))
+        self.assertFalse(default_storage.exists(self.orphan))
+
+    def test_grace_period_protects_recent_objects(self):
+        report = collect_garbage(grace_period=3600)
+
+        self.assertEqual(report.unreferenced, 0)
+        self.assertTrue(default_storage.exists(self.orphan))
+        self.assertTrue(StoredBlob.objects.filter(pk='bb').exists())
+
+    @patch('packages.storage_gc.abort_multipart_upload')
+    def test_expired_upload_sessions_are_aborted(self, mock_abort):
+        session = UploadSession.objects.create(
+            package_name='zlib', version='1.2.13', package_id='zlib2', size=1, sha256='cc',
+            binary_file='blobs/cc/cc.tar.gz', multipart_upload_id='upload-1', part_size=1,
+            expires_at=timezone.now() - timedelta(hours=1)
+        )
+
+        report = collect_garbage(grace_period=0)
+
+        self.assertEqual(report.expired_sessions, 1)
+        mock_abort.assert_called_once()
+        session.refresh_from_db()
+        self.assertEqual(session.status, UploadSession.STATUS_ABORTED)
+
+    def test_command_dry_run(self):
+        out = StringIO()
+
+        call_command('collect_storage_garbage', '--dry-run', '--grace-hours', '0', stdout=out)
+
+        self.assertIn('Unreferenced: 2 object(s)', out.getvalue())
+        self.assertIn('Dry run', out.getvalue())
+        self.assertTrue(default_storage.exists(self.orphan))
+
+
+class BucketListingTests(TestCase):
+    """Tests for streaming the MinIO bucket listing (client mocked)"""
+
+    def test_listing_is_paged_and_strips_location(self):
+        modified = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': 'media/binaries/a.tar.gz', 'Size': 1, 'LastModified': modified}]},
+            {'Contents': [{'Key': 'media/binaries/b.tar.gz', 'Size': 2, 'LastModified': modified}]},
+        ]
+        storage = S3Boto3Storage(bucket_name='conancrates', location='media', access_key='key', secret_key='secret')
+
+        with patch.object(S3Boto3Storage, 'bucket', new_callable=PropertyMock,
+                          return_value=MagicMock(meta=MagicMock(client=client))):
+            objects = list(iter_stored_objects(storage, 'binaries/'))
+
+        self.assertEqual(objects, [('binaries/a.tar.gz', 1, modified), ('binaries/b.tar.gz', 2, modified)])
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            Bucket='conancrates', Prefix='media/binaries/'
+        )
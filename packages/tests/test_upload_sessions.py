@@ -0,0 +1,199 @@
+"""
+Tests for direct-to-MinIO upload sessions
+"""
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from packages.models import BinaryPackage, StoredBlob, UploadSession
+from packages.multipart import MAX_PARTS, MIN_PART_SIZE, plan_parts, presign_part_urls
+from storages.backends.s3boto3 import S3Boto3Storage
+from unittest.mock import patch
+import hashlib
+import io
+import json
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_tarball():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        data = b'[settings]\nos=Windows\narch=x86\n'
+        info = tarfile.TarInfo('conaninfo.txt')
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class PartPlanTests(TestCase):
+    """Tests for multipart part planning and URL presigning"""
+
+    def test_plan_parts(self):
+        self.assertEqual(plan_parts(40, part_size=MIN_PART_SIZE), (MIN_PART_SIZE, 1))
+        self.assertEqual(plan_parts(3 * MIN_PART_SIZE + 1, part_size=MIN_PART_SIZE), (MIN_PART_SIZE, 4))
+
+    def test_part_size_grows_past_part_limit(self):
+        part_size, part_count = plan_parts(MAX_PARTS * MIN_PART_SIZE * 2, part_size=MIN_PART_SIZE)
+
+        self.assertEqual(part_count, MAX_PARTS)
+        self.assertEqual(part_size, 2 * MIN_PART_SIZE)
+
+    def test_presigned_part_urls(self):
+        """Presigning is local - no MinIO needed"""
+        storage = S3Boto3Storage(
+            bucket_name='conancrates', endpoint_url='http://minio:9000',
+            access_key='key', secret_key='secret', region_name='us-east-1'
+        )
+        session = UploadSession(binary_file='binaries/zlib.tar.gz')
+        session.binary_file.storage = storage
+
+        parts = presign_part_urls(session.binary_file, 'upload-1', 2, expires_in=60)
+
+        self.assertEqual([part['part_number'] for part in parts], [1, 2])
+        self.assertTrue(parts[1]['url'].startswith('http://minio:9000/conancrates/binaries/zlib.tar.gz?'))
+        self.assertIn('partNumber=2', parts[1]['url'])
+        self.assertIn('uploadId=upload-1', parts[1]['url'])
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, EXTRACTED_PRECOMPUTE_ON_UPLOAD=False,
+                   RUST_CRATE_GENERATE_ON_UPLOAD=False, CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD=False)
+class UploadSessionTests(TestCase):
+    """Tests for the start/complete/abort endpoints (MinIO calls mocked)"""
+
+    def setUp(self):
+        self.client = Client()
+        self.tarball = make_tarball()
+        self.sha256 = hashlib.sha256(self.tarball).hexdigest()
+
+        patches = {
+            'supports_direct_upload': patch('packages.views.upload_sessions.supports_direct_upload', return_value=True),
+            'start': patch('packages.views.upload_sessions.start_multipart_upload', return_value='upload-1'),
+            'presign': patch('packages.views.upload_sessions.presign_part_urls',
+                             side_effect=lambda field_file, upload_id, count: [
+                                 {'part_number': n, 'url': f'http://minio/part{n}'} for n in range(1, count + 1)
+                             ]),
+            'complete': patch('packages.views.upload_sessions.complete_multipart_upload', side_effect=self._assemble),
+            'abort': patch('packages.views.upload_sessions.abort_multipart_upload'),
+        }
+        self.mocks = {name: p.start() for name, p in patches.items()}
+        for p in patches.values():
+            self.addCleanup(p.stop)
+        self.uploaded = self.tarball
+
+    def _assemble(self, field_file, upload_id, parts):
+        """Stand-in for MinIO assembling the parts the client uploaded"""
+        field_file.storage.save(field_file.name, ContentFile(self.uploaded))
+
+    def _start(self, **overrides):
+        payload = {'package_name': 'zlib', 'version': '1.2.13', 'package_id': 'abc123',
+                   'size': len(self.tarball), 'sha256': self.sha256}
+        payload.update(overrides)
+        return self.client.post(reverse('packages:start_upload_session'),
+                                 data=json.dumps(payload), content_type='application/json')
+
+    def _complete(self, session_id):
+        return self.client.post(reverse('packages:complete_upload_session', args=[session_id]), {
+            'recipe': SimpleUploadedFile('conanfile.py', b'class Zlib: pass'),
+            'parts': json.dumps([{'part_number': 1, 'etag': '"etag1"'}]),
+        })
+
+    def test_start_returns_part_urls(self):
+        response = self._start()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['parts'], [{'part_number': 1, 'url': 'http://minio/part1'}])
+        session = UploadSession.objects.get(pk=data['session_id'])
+        self.assertEqual(session.multipart_upload_id, 'upload-1')
+        self.assertEqual(session.status, UploadSession.STATUS_OPEN)
+
+    def test_start_skips_known_content(self):
+        self._complete(self._start().json()['session_id'])
+
+        response = self._start(package_id='def456')
+
+        self.assertEqual(response.json(), {'status': 'success', 'exists': True})
+        self.assertEqual(UploadSession.objects.count(), 1)
+
+    def test_start_rejects_bad_checksum(self):
+        self.assertEqual(self._start(sha256='nothex').status_code, 400)
+
+    def test_start_needs_s3_storage(self):
+        self.mocks['supports_direct_upload'].return_value = False
+
+        self.assertEqual(self._start().status_code, 501)
+
+    def test_complete_verifies_and_creates_binary(self):
+        session_id = self._start().json()['session_id']
+
+        response = self._complete(session_id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['package']['sha256'], self.sha256)
+        binary = BinaryPackage.objects.get(package_id='abc123')
+        self.assertEqual(binary.binary_file.read(), self.tarball)
+        self.assertEqual(binary.binary_file.name, StoredBlob.objects.get(pk=self.sha256).file.name)
+        self.assertEqual((binary.os, binary.arch), ('Windows', 'x86'))
+        self.assertEqual(UploadSession.objects.get(pk=session_id).status, UploadSession.STATUS_COMPLETE)
+
+    def test_checksum_mismatch_fails_session(self):
+        session_id = self._start().json()['session_id']
+        self.uploaded = self.tarball + b'tampered'
+
+        response = self._complete(session_id)
+
+        self.assertEqual(response.status_code, 400)
+        session = UploadSession.objects.get(pk=session_id)
+        self.assertEqual(session.status, UploadSession.STATUS_FAILED)
+        self.assertFalse(session.binary_file.storage.exists(session.binary_file.name))
+        self.assertFalse(BinaryPackage.objects.exists())
+
+    def test_parts_are_staged_outside_the_blob(self):
+        session_id = self._start().json()['session_id']
+        staging_name = UploadSession.objects.get(pk=session_id).binary_file.name
+
+        self._complete(session_id)
+
+        blob = StoredBlob.objects.get(pk=self.sha256)
+        self.assertTrue(staging_name.startswith('uploads/'))
+        self.assertNotEqual(blob.file.name, staging_name)
+        self.assertFalse(blob.file.storage.exists(staging_name))
+
+    def test_mismatch_leaves_stored_blob_alone(self):
+        first = self._start().json()['session_id']
+        second = self._start(package_id='def456').json()['session_id']
+        self._complete(first)
+        self.uploaded = self.tarball + b'tampered'
+
+        self.assertEqual(self._complete(second).status_code, 400)
+
+        blob = StoredBlob.objects.get(pk=self.sha256)
+        self.assertEqual(blob.file.read(), self.tarball)
+
+    def test_session_being_completed_cannot_be_completed_again(self):
+        session_id = self._start().json()['session_id']
+        UploadSession.objects.filter(pk=session_id).update(status=UploadSession.STATUS_COMPLETING)
+
+        self.assertEqual(self._complete(session_id).status_code, 409)
+        self.mocks['complete'].assert_not_called()
+
+    def test_completed_session_cannot_be_reused(self):
+        session_id = self._start().json()['session_id']
+        self._complete(session_id)
+
+        self.assertEqual(self._complete(session_id).status_code, 409)
+
+    def test_abort(self):
+        session_id = self._start().json()['session_id']
+
+        response = self.client.delete(reverse('packages:abort_upload_session', args=[session_id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.mocks['abort'].assert_called_once()
+        self.assertEqual(UploadSession.objects.get(pk=session_id).status, UploadSession.STATUS_ABORTED)
@@ -0,0 +1,106 @@
+"""
+Tests for the transactional upload write path
+"""
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from packages.models import Package, PackageVersion, BinaryPackage, Dependency, StoredBlob
+from packages.views.simple_upload import record_dependencies
+from unittest.mock import patch
+import io
+import tarfile
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+RECIPE = b'''
+class Boost:
+    description = "Boost libraries"
+    license = "BSL-1.0"
+    requires = ["zlib/1.2.13", "bzip2/1.0.8"]
+'''
+
+
+def make_tarball(os_name):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        data = f'[settings]\nos={os_name}\n'.encode()
+        info = tarfile.TarInfo('conaninfo.txt')
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, EXTRACTED_PRECOMPUTE_ON_UPLOAD=False,
+                   RUST_CRATE_GENERATE_ON_UPLOAD=False, CONAN_PACKAGE_PRECOMPUTE_ON_UPLOAD=False)
+class UploadUpsertTests(TestCase):
+    """Tests for upserting package, version, binary and dependency rows"""
+
+    def setUp(self):
+        self.client = Client()
+
+    def _upload(self, package_id, os_name='Linux', recipe=RECIPE):
+        return self.client.post(reverse('packages:simple_upload'), {
+            'recipe': SimpleUploadedFile('conanfile.py', recipe),
+            'binary': SimpleUploadedFile('boost.tar.gz', make_tarball(os_name)),
+            'package_name': 'boost',
+            'version': '1.81.0',
+            'package_id': package_id,
+        })
+
+    def test_binaries_of_one_version_share_its_rows(self):
+        self.assertEqual(self._upload('linux1').status_code, 200)
+        self.assertEqual(self._upload('windows1', 'Windows').status_code, 200)
+
+        self.assertEqual(Package.objects.filter(name='boost').count(), 1)
+        version = PackageVersion.objects.get(package__name='boost')
+        self.assertEqual(version.binaries.count(), 2)
+        self.assertEqual(version.package.license, 'BSL-1.0')
+
+    def test_recipe_requirements_become_dependencies(self):
+        self._upload('linux1')
+        self._upload('windows1', 'Windows', recipe=RECIPE.replace(b'zlib/1.2.13', b'zlib/1.3'))
+
+        version = PackageVersion.objects.get(package__name='boost')
+        requirements = {
+            dep.requires_package.name: dep.version_requirement
+            for dep in Dependency.objects.filter(package_version=version)
+        }
+        self.assertEqual(requirements, {'zlib': '1.3', 'bzip2': '1.0.8'})
+        self.assertEqual(Package.objects.get(name='zlib').description, 'Dependency: zlib')
+
+    def test_existing_package_metadata_kept_without_description(self):
+        Package.objects.create(name='boost', description='Curated', license='BSL-1.0')
+
+        self._upload('linux1', recipe=b'class Boost: pass')
+
+        self.assertEqual(Package.objects.get(name='boost').description, 'Curated')
+
+    def test_failed_write_leaves_no_rows(self):
+        with patch('packages.views.simple_upload.record_dependencies', side_effect=RuntimeError('boom')):
+            response = self._upload('linux1')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Package.objects.filter(name='boost').exists())
+        self.assertFalse(BinaryPackage.objects.exists())
+        self.assertFalse(StoredBlob.objects.filter(ref_count__gt=0).exists())
+
+    def test_dependency_queries_do_not_grow_with_requirements(self):
+        package = Package.objects.create(name='boost')
+        version = PackageVersion.objects.create(package=package, version='1.81.0')
+
+        def count_queries(requirements):
+            with CaptureQueriesContext(connection) as queries:
+                record_dependencies(version, requirements)
+            return len(queries)
+
+        few = count_queries([('zlib', '1.2.13')])
+        many = count_queries([(f'dep{n}', '1.0') for n in range(20)])
+
+        self.assertEqual(few, many)
+        self.assertEqual(Dependency.objects.filter(package_version=version).count(), 21)
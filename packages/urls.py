@@ -1,9 +1,13 @@
 from django.urls import path
 from . import views
-from .views import upload_views, simple_upload
+from .views import upload_views, simple_upload, upload_sessions, conan_remote
 
 app_name = 'packages'
 
+# Conan v2 API references (user/channel are '_' for references without them)
+CONAN_RECIPE = 'v2/v2/conans/<str:name>/<str:version>/<str:user>/<str:channel>'
+CONAN_PACKAGE = f'{CONAN_RECIPE}/revisions/<str:rrev>/packages/<str:package_id>'
+
 urlpatterns = [
     # Web UI
     path('', views.index, name='index'),
@@ -50,6 +54,15 @@ urlpatterns = [
 
     # Simple unified upload API
     path('api/package/upload', simple_upload.upload_package, name='simple_upload'),
+    path('api/package/exists', simple_upload.check_packages_exist, name='check_packages_exist'),
+    path('api/blobs/<str:sha256>', simple_upload.check_blob_exists, name='check_blob_exists'),
+
+    # Direct-to-MinIO upload sessions (large binaries)
+    path('api/package/upload-sessions', upload_sessions.start_upload_session, name='start_upload_session'),
+    path('api/package/upload-sessions/<uuid:session_id>', upload_sessions.abort_upload_session,
+         name='abort_upload_session'),
+    path('api/package/upload-sessions/<uuid:session_id>/complete', upload_sessions.complete_upload_session,
+         name='complete_upload_session'),
 
     # Conan V2 client uses REST API v1 (confusing naming!)
     # Remote URL: /v2 -> API paths: /v2/v1/...
@@ -63,4 +76,21 @@ urlpatterns = [
     path('v2/v1/conans/<str:package_name>/<str:package_version>/recipe/manifest',
          upload_views.get_recipe_manifest, name='api_recipe_manifest'),
     path('v2/v1/conans/search', upload_views.search_packages, name='api_search'),
+
+    # Conan v2 revisions/files API (conan install -r <remote>): /v2/v2/...
+    path('v2/v2/users/check_credentials', upload_views.check_credentials, name='conan_check_credentials'),
+    path('v2/v2/conans/search', conan_remote.search_recipes, name='conan_search'),
+    path(f'{CONAN_RECIPE}/latest', conan_remote.recipe_latest, name='conan_recipe_latest'),
+    path(f'{CONAN_RECIPE}/revisions', conan_remote.recipe_revisions, name='conan_recipe_revisions'),
+    path(f'{CONAN_RECIPE}/search', conan_remote.search_binaries, name='conan_search_binaries'),
+    path(f'{CONAN_RECIPE}/revisions/<str:rrev>/search', conan_remote.search_binaries,
+         name='conan_search_revision_binaries'),
+    path(f'{CONAN_RECIPE}/revisions/<str:rrev>/files', conan_remote.recipe_files, name='conan_recipe_files'),
+    path(f'{CONAN_RECIPE}/revisions/<str:rrev>/files/<path:path>', conan_remote.recipe_file,
+         name='conan_recipe_file'),
+    path(f'{CONAN_PACKAGE}/latest', conan_remote.package_latest, name='conan_package_latest'),
+    path(f'{CONAN_PACKAGE}/revisions', conan_remote.package_revisions, name='conan_package_revisions'),
+    path(f'{CONAN_PACKAGE}/revisions/<str:prev>/files', conan_remote.package_files, name='conan_package_files'),
+    path(f'{CONAN_PACKAGE}/revisions/<str:prev>/files/<path:path>', conan_remote.package_file,
+         name='conan_package_file'),
 ]
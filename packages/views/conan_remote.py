@@ -0,0 +1,362 @@
+"""
+Conan v2 remote protocol (read side) for ConanCrates
+
+Lets the stock Conan client use ConanCrates as a remote:
+
+    conan remote add conancrates http://server:8000/v2
+    conan install --requires=zlib/1.2.13 -r conancrates
+
+The client lists recipe and package revisions, then downloads the files of
+a revision one by one (in parallel, with its own cache). Recipes are served
+from PackageVersion.recipe_content, packages from the binary's
+ConanPackageRevision (see packages.conan_layout). Only references without
+user/channel exist on this server.
+
+URL layout (below the remote URL):
+- v2/conans/search?q=<pattern> - recipe search
+- v2/conans/<name>/<version>/_/_/latest and .../revisions
+- v2/conans/<name>/<version>/_/_/revisions/<rrev>/files[/<file>]
+- .../revisions/<rrev>/search - binaries with their settings and options
+- .../revisions/<rrev>/packages/<package_id>/latest and .../revisions
+- .../revisions/<rrev>/packages/<package_id>/revisions/<prev>/files[/<file>]
+"""
+import datetime
+import fnmatch
+import logging
+import re
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from packages.conan_layout import (
+    CONAN_MANIFEST,
+    CONANFILE,
+    CONANINFO,
+    PACKAGE_TGZ,
+    get_conan_package,
+    md5_text,
+    parse_conaninfo_sections,
+    recipe_manifest,
+)
+from packages.conditional import counts_as_download, get_cache_control, make_etag
+from packages.download_counts import record_download
+from packages.extracted import ExtractionError
+from packages.models import BinaryPackage, PackageVersion
+from packages.views.download_views import stored_file_response
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SEARCH_PAGE_SIZE = 100
+DEFAULT_SEARCH_MAX_PAGE_SIZE = 1000
+
+
+class NotFound(Exception):
+    """The requested reference or revision doesn't exist (404 for the Conan client)"""
+    pass
+
+
+def get_search_max_page_size():
+    return getattr(settings, 'CONAN_SEARCH_MAX_PAGE_SIZE', DEFAULT_SEARCH_MAX_PAGE_SIZE)
+
+
+def not_found(message):
+    return HttpResponse(message, status=404, content_type='text/plain')
+
+
+def format_time(value):
+    """Revision time as the ISO 8601 string the Conan client parses"""
+    return value.astimezone(datetime.timezone.utc).isoformat()
+
+
+def _get_recipe(name, version, user, channel, rrev=None):
+    """
+    PackageVersion of a recipe reference, with its manifest and revision.
+
+    Returns:
+        (package_version, manifest, revision)
+
+    Raises:
+        NotFound: If the reference (or the given revision) doesn't exist
+    """
+    reference = f"{name}/{version}"
+    if user != '_' or channel != '_':
+        raise NotFound(f"Recipe not found: '{reference}@{user}/{channel}'")
+    package_version = (
+        PackageVersion.objects.select_related('package')
+        .filter(package__name=name, version=version)
+        .exclude(recipe_content='')
+        .first()
+    )
+    if package_version is None:
+        raise NotFound(f"Recipe not found: '{reference}'")
+
+    manifest, revision = recipe_manifest(package_version)
+    if rrev is not None and rrev != revision:
+        raise NotFound(f"Recipe revision not found: '{reference}#{rrev}'")
+    return package_version, manifest, revision
+
+
+def _get_package(name, version, user, channel, rrev, package_id, prev=None):
+    """
+    Binary of a package reference, with its Conan package revision.
+
+    Returns:
+        (binary, conan_revision)
+
+    Raises:
+        NotFound: If the reference (or the given revision) doesn't exist
+        ExtractionError: If the package had to be built and its tarball can't be read
+    """
+    package_version, _, _ = _get_recipe(name, version, user, channel, rrev)
+    binary = BinaryPackage.objects.filter(package_version=package_version, package_id=package_id).first()
+    conan_revision = get_conan_package(binary) if binary is not None else None
+    if conan_revision is None:
+        raise NotFound(f"Binary package not found: '{name}/{version}#{rrev}:{package_id}'")
+    if prev is not None and prev != conan_revision.revision:
+        raise NotFound(f"Package revision not found: '{name}/{version}#{rrev}:{package_id}#{prev}'")
+    return binary, conan_revision
+
+
+def _text_file_response(request, content):
+    """A manifest/recipe/conaninfo file, with its md5 as the ETag"""
+    etag = make_etag(md5_text(content))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='text/plain')
+    response['ETag'] = etag
+    response['Cache-Control'] = get_cache_control()
+    return response
+
+
+def conan_api_view(view):
+    """
+    GET-only, CSRF-exempt Conan API view.
+
+    NotFound becomes a 404; a Conan package that can't be built from its
+    tarball (ExtractionError) a 500.
+    """
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except NotFound as e:
+            return not_found(str(e))
+        except ExtractionError as e:
+            logger.exception("Could not build Conan package for %s", request.path)
+            return HttpResponse(f"Error building package: {e}", status=500, content_type='text/plain')
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return csrf_exempt(require_http_methods(["GET"])(wrapper))
+
+
+@conan_api_view
+def search_recipes(request):
+    """
+    Search recipes by reference pattern (fnmatch, like the Conan server)
+
+    URL: /v2/v2/conans/search?q=zlib/*[&ignorecase=False][&page=1&page_size=100]
+
+    Without page, all matching references are returned (what the Conan
+    client expects).
+    """
+    pattern = request.GET.get('q') or '*'
+    ignorecase = request.GET.get('ignorecase', 'True').lower() != 'false'
+    matcher = re.compile(fnmatch.translate(pattern), re.IGNORECASE if ignorecase else 0)
+
+    # Narrow the query down with the pattern's literal name prefix
+    literal = re.split(r'[*?\[]', pattern, maxsplit=1)[0]
+    versions = PackageVersion.objects.exclude(recipe_content='')
+    if '/' in literal:
+        name_lookup = 'package__name__iexact' if ignorecase else 'package__name'
+        versions = versions.filter(**{name_lookup: literal.split('/', 1)[0]})
+    elif literal:
+        name_lookup = 'package__name__istartswith' if ignorecase else 'package__name__startswith'
+        versions = versions.filter(**{name_lookup: literal})
+
+    references = sorted(
+        reference for reference in (
+            f"{name}/{version}"
+            for name, version in versions.values_list('package__name', 'version')
+        )
+        if matcher.match(reference)
+    )
+
+    if 'page' not in request.GET:
+        return JsonResponse({"results": references})
+
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_SEARCH_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_SEARCH_PAGE_SIZE
+    page_size = min(max(page_size, 1), get_search_max_page_size())
+    paginator = Paginator(references, page_size)
+    page = paginator.get_page(request.GET.get('page'))
+    return JsonResponse({
+        "results": list(page.object_list),
+        "page": page.number,
+        "pages": paginator.num_pages,
+        "total": paginator.count,
+    })
+
+
+@conan_api_view
+def recipe_latest(request, name, version, user, channel):
+    """
+    Latest recipe revision
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/latest
+    """
+    package_version, _, revision = _get_recipe(name, version, user, channel)
+    return JsonResponse({"revision": revision, "time": format_time(package_version.updated_at)})
+
+
+@conan_api_view
+def recipe_revisions(request, name, version, user, channel):
+    """
+    Recipe revisions, newest first (one per version: the recipe of the latest upload)
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/revisions
+    """
+    package_version, _, revision = _get_recipe(name, version, user, channel)
+    return JsonResponse({
+        "reference": f"{name}/{version}",
+        "revisions": [{"revision": revision, "time": format_time(package_version.updated_at)}],
+    })
+
+
+@conan_api_view
+def recipe_files(request, name, version, user, channel, rrev):
+    """
+    Files of a recipe revision
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/revisions/{rrev}/files
+    """
+    _get_recipe(name, version, user, channel, rrev)
+    return JsonResponse({"files": {CONANFILE: {}, CONAN_MANIFEST: {}}})
+
+
+@conan_api_view
+def recipe_file(request, name, version, user, channel, rrev, path):
+    """
+    Download one file of a recipe revision
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/revisions/{rrev}/files/{conanfile.py|conanmanifest.txt}
+    """
+    package_version, manifest, _ = _get_recipe(name, version, user, channel, rrev)
+    if path == CONANFILE:
+        return _text_file_response(request, package_version.recipe_content)
+    if path == CONAN_MANIFEST:
+        return _text_file_response(request, manifest)
+    return not_found(f"File not found: '{path}'")
+
+
+@conan_api_view
+def search_binaries(request, name, version, user, channel, rrev=None):
+    """
+    Binaries of a recipe with their settings, options and requires
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/[revisions/{rrev}/]search
+
+    Binaries whose Conan package isn't built yet are reported from their
+    recorded settings.
+    """
+    package_version, _, _ = _get_recipe(name, version, user, channel, rrev)
+    results = {}
+    binaries = package_version.binaries.select_related('conan_revision').exclude(binary_file='')
+    for binary in binaries.exclude(binary_file__isnull=True):
+        conan_revision = getattr(binary, 'conan_revision', None)
+        if conan_revision is not None and conan_revision.conaninfo:
+            results[binary.package_id] = parse_conaninfo_sections(conan_revision.conaninfo)
+            continue
+        binary_settings = {
+            'os': binary.os,
+            'arch': binary.arch,
+            'compiler': binary.compiler,
+            'compiler.version': binary.compiler_version,
+            'build_type': binary.build_type,
+        }
+        results[binary.package_id] = {
+            "settings": {key: value for key, value in binary_settings.items() if value},
+            "options": binary.options,
+            "requires": [],
+        }
+    return JsonResponse(results)
+
+
+def _package_revision_json(conan_revision):
+    return {"revision": conan_revision.revision, "time": format_time(conan_revision.created_at)}
+
+
+@conan_api_view
+def package_latest(request, name, version, user, channel, rrev, package_id):
+    """
+    Latest package revision (builds the Conan package on first request)
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/revisions/{rrev}/packages/{package_id}/latest
+    """
+    _, conan_revision = _get_package(name, version, user, channel, rrev, package_id)
+    return JsonResponse(_package_revision_json(conan_revision))
+
+
+@conan_api_view
+def package_revisions(request, name, version, user, channel, rrev, package_id):
+    """
+    Package revisions, newest first (one per binary: the latest upload)
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/revisions/{rrev}/packages/{package_id}/revisions
+    """
+    _, conan_revision = _get_package(name, version, user, channel, rrev, package_id)
+    return JsonResponse({
+        "reference": f"{name}/{version}#{rrev}:{package_id}",
+        "revisions": [_package_revision_json(conan_revision)],
+    })
+
+
+@conan_api_view
+def package_files(request, name, version, user, channel, rrev, package_id, prev):
+    """
+    Files of a package revision
+
+    URL: /v2/v2/conans/{name}/{version}/_/_/revisions/{rrev}/packages/{package_id}/revisions/{prev}/files
+    """
+    _get_package(name, version, user, channel, rrev, package_id, prev)
+    return JsonResponse({"files": {CONANINFO: {}, CONAN_MANIFEST: {}, PACKAGE_TGZ: {}}})
+
+
+@conan_api_view
+def package_file(request, name, version, user, channel, rrev, package_id, prev, path):
+    """
+    Download one file of a package revision
+
+    URL: .../packages/{package_id}/revisions/{prev}/files/{conaninfo.txt|conanmanifest.txt|conan_package.tgz}
+
+    conan_package.tgz is served like other binary downloads (presigned
+    redirect or stream, ETag, Range) and counts as a download of the binary.
+    """
+    binary, conan_revision = _get_package(name, version, user, channel, rrev, package_id, prev)
+
+    if path == CONANINFO:
+        return _text_file_response(request, conan_revision.conaninfo)
+    if path == CONAN_MANIFEST:
+        return _text_file_response(request, conan_revision.manifest)
+    if path != PACKAGE_TGZ:
+        return not_found(f"File not found: '{path}'")
+
+    try:
+        response = stored_file_response(
+            conan_revision.package_file,
+            PACKAGE_TGZ,
+            'application/gzip',
+            size=conan_revision.package_size,
+            request=request,
+            etag=make_etag(conan_revision.package_sha256)
+        )
+    except Exception as e:
+        return HttpResponse(f"Error reading file: {e}", status=500, content_type='text/plain')
+    # Revalidations and resumed ranges aren't new downloads
+    if counts_as_download(response):
+        record_download(binary, package=binary.package_version.package)
+    return response
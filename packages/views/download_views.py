@@ -1,16 +1,39 @@
 """
 Views for downloading packages and binaries
 """
-import os
 import json
-import zipfile
-import tarfile
-import tempfile
-import shutil
-from pathlib import Path
+import itertools
+import logging
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, JsonResponse, HttpResponse
+from django.conf import settings
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.http import (
+    FileResponse, HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse, QueryDict, StreamingHttpResponse
+)
 from packages.models import Package, PackageVersion, BinaryPackage
+from packages.async_streaming import async_file_response, is_async_request, stream_content
+from packages.bundle_cache import cache_while_streaming, compute_cache_key, get_cached_bundle
+from packages.bundle_cache import is_enabled as is_bundle_cache_enabled
+from packages.dependency_index import get_dependency_edges
+from packages.resolver import resolve_bundle_dependencies
+from packages.conditional import (
+    RangeNotSatisfiable,
+    counts_as_download,
+    get_cache_control,
+    if_range_matches,
+    make_etag,
+    parse_range,
+)
+from packages.compression import get_compression_policy, get_default_compression_policy
+from packages.conan_layout import recipe_revision
+from packages.download_counts import record_download
+from packages.extracted import ExtractionError, get_extracted_artifact, iter_extracted_bundle_zip, iter_extracted_zip
+from packages.rust_bundle import build_readme as build_rust_bundle_readme
+from packages.rust_bundle import get_bundle_crates, get_cache_members, iter_rust_bundle_zip
+from packages.rust_crate import get_rust_crate
+from packages.storage_utils import open_range, open_stream, presigned_url
+from packages.zip_stream import ZipStream, get_chunk_size
 from packages.conan_wrapper import (
     resolve_dependencies,
     check_conan_available,
@@ -19,6 +42,86 @@ from packages.conan_wrapper import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
+def get_delivery_mode():
+    """How stored files are delivered: 'proxy' (stream through Django) or 'redirect'"""
+    return getattr(settings, 'DOWNLOAD_DELIVERY_MODE', 'proxy')
+
+
+def _file_response(request, fileobj, filename, content_type, status=200):
+    """Stream an open storage file as an attachment (async iterator under ASGI)"""
+    if is_async_request(request):
+        return async_file_response(fileobj, filename, content_type, get_chunk_size(), status=status)
+
+    response = FileResponse(
+        fileobj,
+        status=status,
+        as_attachment=True,
+        filename=filename,
+        content_type=content_type
+    )
+    response.block_size = get_chunk_size()
+    return response
+
+
+def stored_file_response(field_file, filename, content_type, size=None, request=None, etag=None):
+    """
+    Serve a file from storage as an attachment.
+
+    In 'redirect' delivery mode the client is sent to a presigned MinIO URL
+    (with Content-Disposition baked in) so no bytes pass through Django.
+    Otherwise the object is streamed through in fixed-size chunks - from
+    the event loop when served under ASGI (see packages.async_streaming).
+
+    When the request is passed, conditional requests are answered first
+    (If-None-Match -> 304) and a single byte range is served as 206 Partial
+    Content from a ranged storage read. A known ETag also enables long-lived
+    cache headers.
+    """
+    if request is not None and etag:
+        conditional = get_conditional_response(request, etag=etag)
+        if conditional is not None:
+            conditional['ETag'] = etag
+            conditional['Cache-Control'] = get_cache_control()
+            return conditional
+
+    if get_delivery_mode() == 'redirect':
+        url = presigned_url(field_file, filename=filename, content_type=content_type)
+        if url:
+            return HttpResponseRedirect(url)
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE') if request is not None else None
+    if range_header and if_range_matches(request, etag):
+        if not size:
+            size = field_file.storage.size(field_file.name)
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        response = _file_response(request, open_range(field_file, start, end), filename, content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = _file_response(request, open_stream(field_file), filename, content_type)
+        if size:
+            response['Content-Length'] = str(size)
+
+    if size:
+        response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+        response['Cache-Control'] = get_cache_control()
+    return response
+
+
 def download_binary(request, package_name, version, binary_id):
     """
     Direct download of a specific binary package
@@ -27,27 +130,24 @@ def download_binary(request, package_name, version, binary_id):
     package_version = get_object_or_404(PackageVersion, package=package, version=version)
     binary = get_object_or_404(BinaryPackage, package_version=package_version, package_id=binary_id)
 
-    # Increment download count
-    binary.download_count += 1
-    binary.save()
-
-    package.download_count += 1
-    package.save()
-
     # Serve actual file if it exists
     if binary.binary_file and binary.binary_file.name:
         try:
-            # For cloud storage (MinIO/S3), you could return a redirect:
-            # from django.http import HttpResponseRedirect
-            # return HttpResponseRedirect(binary.binary_file.url)
-
-            # For local filesystem, stream the file
-            return FileResponse(
-                binary.binary_file.open('rb'),
-                as_attachment=True,
-                filename=f"{package_name}-{version}-{binary_id}.tar.gz",
-                content_type='application/gzip'
+            # Redirect to a presigned MinIO URL or stream the file,
+            # depending on DOWNLOAD_DELIVERY_MODE. The sha256 is the ETag,
+            # so unchanged binaries get 304 and broken downloads can resume.
+            response = stored_file_response(
+                binary.binary_file,
+                f"{package_name}-{version}-{binary_id}.tar.gz",
+                'application/gzip',
+                size=binary.file_size,
+                request=request,
+                etag=make_etag(binary.sha256)
             )
+            # Revalidations and resumed ranges aren't new downloads
+            if counts_as_download(response):
+                record_download(binary, package=package)
+            return response
         except Exception as e:
             return HttpResponse(
                 f"Error reading file: {str(e)}\n"
@@ -57,6 +157,7 @@ def download_binary(request, package_name, version, binary_id):
             )
 
     # No file uploaded yet - return helpful placeholder
+    record_download(binary, package=package)
     response = HttpResponse(
         f"Binary download: {package_name}/{version} - {binary.get_config_string()}\n"
         f"Package ID: {binary_id}\n\n"
@@ -134,56 +235,35 @@ def bundle_preview(request, package_name, version):
     preview_data['total_size'] += binary.file_size
     preview_data['file_count'] += 1
 
-    # Process dependency graph if it exists
-    if binary.dependency_graph:
-        graph = binary.dependency_graph
-        nodes = graph.get('graph', {}).get('nodes', {})
-
-        for node_id, node in nodes.items():
-            # Skip root node (the package itself)
-            if node_id == "0":
-                continue
-
-            # Parse package reference (e.g., "boost/1.81.0" or "boost/1.81.0#hash")
-            ref = node.get('ref', '')
-            if '/' not in ref:
-                continue
+    # Add dependencies (all resolved in a single query)
+    for dep in resolve_bundle_dependencies(binary):
+        dep_name = dep['name']
+        dep_version = dep['version']
+        dep_package_id = dep['package_id'] or 'unknown'
+        dep_binary = dep['binary']
 
-            dep_name, dep_version_with_hash = ref.split('/', 1)
-            # Remove recipe revision hash if present (e.g., "1.0.0#hash" -> "1.0.0")
-            dep_version = dep_version_with_hash.split('#')[0]
-            dep_package_id = node.get('package_id', 'unknown')
-
-            # Look up the dependency binary in database
-            try:
-                dep_binary = BinaryPackage.objects.get(
-                    package_version__package__name=dep_name,
-                    package_version__version=dep_version,
-                    package_id=dep_package_id
-                )
-
-                preview_data['files'].append({
-                    'package': dep_name,
-                    'version': dep_version,
-                    'type': 'dependency',
-                    'package_id': dep_package_id,
-                    'config': dep_binary.get_config_string(),
-                    'size': dep_binary.file_size
-                })
-                preview_data['total_size'] += dep_binary.file_size
-                preview_data['file_count'] += 1
-
-            except BinaryPackage.DoesNotExist:
-                # Dependency binary not in database
-                preview_data['files'].append({
-                    'package': dep_name,
-                    'version': dep_version,
-                    'type': 'dependency',
-                    'package_id': dep_package_id,
-                    'config': 'Unknown',
-                    'size': 0,
-                    'note': f'Missing dependency: {dep_name}/{dep_version} with package_id {dep_package_id}'
-                })
+        if dep_binary is not None:
+            preview_data['files'].append({
+                'package': dep_name,
+                'version': dep_version,
+                'type': 'dependency',
+                'package_id': dep_package_id,
+                'config': dep_binary.get_config_string(),
+                'size': dep_binary.file_size
+            })
+            preview_data['total_size'] += dep_binary.file_size
+            preview_data['file_count'] += 1
+        else:
+            # Dependency binary not in database
+            preview_data['files'].append({
+                'package': dep_name,
+                'version': dep_version,
+                'type': 'dependency',
+                'package_id': dep_package_id,
+                'config': 'Unknown',
+                'size': 0,
+                'note': f'Missing dependency: {dep_name}/{dep_version} with package_id {dep_package_id}'
+            })
 
     return JsonResponse(preview_data, json_dumps_params={'indent': 2})
 
@@ -241,7 +321,9 @@ def download_bundle(request, package_name, version):
         }
         return JsonResponse(error_response, status=404, json_dumps_params={'indent': 2})
 
-    binary = binaries.first()
+    # The bundle generator reads package_version (recipe) while streaming,
+    # possibly in an ASGI worker thread - load it here
+    binary = binaries.select_related('package_version__package').first()
 
     # Add the main package to bundle
     binaries_to_bundle.append((binary, package_name, version))
@@ -253,62 +335,35 @@ def download_bundle(request, package_name, version):
         'config': binary.get_config_string()
     })
 
-    # Process dependency graph if it exists
-    if binary.dependency_graph:
-        graph = binary.dependency_graph
-        nodes = graph.get('graph', {}).get('nodes', {})
-
-        for node_id, node in nodes.items():
-            # Skip root node (the package itself)
-            if node_id == "0":
-                continue
-
-            # Parse package reference (e.g., "boost/1.81.0" or "boost/1.81.0#hash")
-            ref = node.get('ref', '')
-            if '/' not in ref:
-                continue
+    # Add dependencies (all resolved in a single query)
+    for dep in resolve_bundle_dependencies(binary):
+        dep_name = dep['name']
+        dep_version = dep['version']
+        dep_package_id = dep['package_id'] or 'unknown'
+        dep_binary = dep['binary']
+
+        if dep_binary is not None:
+            binaries_to_bundle.append((dep_binary, dep_name, dep_version))
+            bundle_metadata['contents'].append({
+                'package': dep_name,
+                'version': dep_version,
+                'type': 'dependency',
+                'package_id': dep_package_id,
+                'config': dep_binary.get_config_string()
+            })
+        else:
+            # Dependency binary not in database - add to metadata but not bundle
+            bundle_metadata['contents'].append({
+                'package': dep_name,
+                'version': dep_version,
+                'type': 'dependency',
+                'package_id': dep_package_id,
+                'config': 'Unknown',
+                'note': f'Missing dependency: {dep_name}/{dep_version} with package_id {dep_package_id} - not included in bundle'
+            })
 
-            dep_name, dep_version_with_hash = ref.split('/', 1)
-            # Remove recipe revision hash if present (e.g., "1.0.0#hash" -> "1.0.0")
-            dep_version = dep_version_with_hash.split('#')[0]
-            dep_package_id = node.get('package_id', 'unknown')
-
-            # Look up the dependency binary in database
-            try:
-                dep_binary = BinaryPackage.objects.get(
-                    package_version__package__name=dep_name,
-                    package_version__version=dep_version,
-                    package_id=dep_package_id
-                )
-
-                binaries_to_bundle.append((dep_binary, dep_name, dep_version))
-                bundle_metadata['contents'].append({
-                    'package': dep_name,
-                    'version': dep_version,
-                    'type': 'dependency',
-                    'package_id': dep_package_id,
-                    'config': dep_binary.get_config_string()
-                })
-
-            except BinaryPackage.DoesNotExist:
-                # Dependency binary not in database - add to metadata but not bundle
-                bundle_metadata['contents'].append({
-                    'package': dep_name,
-                    'version': dep_version,
-                    'type': 'dependency',
-                    'package_id': dep_package_id,
-                    'config': 'Unknown',
-                    'note': f'Missing dependency: {dep_name}/{dep_version} with package_id {dep_package_id} - not included in bundle'
-                })
-
-    # Create ZIP file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-        with zipfile.ZipFile(tmp_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add metadata file
-            zipf.writestr('bundle_info.json', json.dumps(bundle_metadata, indent=2))
-
-            # Add README
-            readme_content = f"""# {package_name}/{version} Bundle
+    # Build README
+    readme_content = f"""# {package_name}/{version} Bundle
 
 This bundle contains {package_name} version {version} and all its dependencies
 for {os_filter}/{arch_filter}/{compiler_filter}/{compiler_version_filter}/{build_type_filter}.
@@ -321,11 +376,11 @@ Conan version: {bundle_metadata.get('conan_version', 'N/A')}
 ## Contents
 
 """
-            for item in bundle_metadata['contents']:
-                note = f" - {item['note']}" if 'note' in item else ""
-                readme_content += f"- {item['package']}/{item['version']} ({item['type']}){note}\n"
+    for item in bundle_metadata['contents']:
+        note = f" - {item['note']}" if 'note' in item else ""
+        readme_content += f"- {item['package']}/{item['version']} ({item['type']}){note}\n"
 
-            readme_content += """
+    readme_content += """
 ## Note
 
 This is a prototype. In production, actual binary files would be included.
@@ -335,60 +390,125 @@ Currently, placeholder files are provided for packages in the local database.
 
 Extract this bundle and follow your project's installation instructions.
 """
-            zipf.writestr('README.txt', readme_content)
-
-            # Add binaries and recipes
-            for binary, pkg_name, pkg_ver in binaries_to_bundle:
-                # Create package directory in ZIP
-                pkg_dir = f'{pkg_name}-{pkg_ver}'
 
-                # Add recipe (conanfile.py) if available
+    compression_policy = get_compression_policy(request)
+    bundle_filename = f'{package_name}-{version}-bundle.zip'
+
+    # Bundles built from the same binaries and recipes, for the same
+    # requested platform (bundle_info.json and README.txt name it), are
+    # byte-for-byte reusable. Binaries without a recorded sha256 have nothing
+    # to key on, so bundles containing them are always built fresh.
+    cache_key = None
+    if all(bin_pkg.sha256 for bin_pkg, _, _ in binaries_to_bundle):
+        cache_members = [
+            (pkg_name, pkg_ver, bin_pkg.package_id, bin_pkg.sha256,
+             recipe_revision(bin_pkg.package_version.recipe_content))
+            for bin_pkg, pkg_name, pkg_ver in binaries_to_bundle
+        ]
+        cache_members.extend(
+            (item['package'], item['version'], item['package_id'], '')
+            for item in bundle_metadata['contents'] if 'note' in item
+        )
+        cache_key = compute_cache_key('conan', cache_members, compression=compression_policy,
+                                      platform=bundle_metadata['platform'])
+
+        cached = get_cached_bundle(cache_key)
+        if cached is not None:
+            return stored_file_response(cached.bundle_file, bundle_filename, 'application/zip', size=cached.size,
+                                        request=request)
+
+    def generate_bundle():
+        # Stream the ZIP straight to the client - binaries are copied from
+        # storage chunk by chunk, never fully loaded or written to disk
+        zip_stream = ZipStream(policy=compression_policy)
+
+        # Add metadata file
+        yield from zip_stream.write_str('bundle_info.json', json.dumps(bundle_metadata, indent=2))
+        yield from zip_stream.write_str('README.txt', readme_content)
+
+        # Add binaries and recipes
+        for binary, pkg_name, pkg_ver in binaries_to_bundle:
+            # Create package directory in ZIP
+            pkg_dir = f'{pkg_name}-{pkg_ver}'
+
+            # Add recipe (conanfile.py) if available - package_version was
+            # loaded together with the binary by the resolver
+            recipe_content = binary.package_version.recipe_content
+            if recipe_content:
+                yield from zip_stream.write_str(f'{pkg_dir}/conanfile.py', recipe_content)
+
+            # Add binary file from MinIO/storage
+            if binary.binary_file and binary.binary_file.name:
                 try:
-                    pkg_version_obj = PackageVersion.objects.get(
-                        package__name=pkg_name,
-                        version=pkg_ver
-                    )
-                    if pkg_version_obj.recipe_content:
-                        zipf.writestr(
-                            f'{pkg_dir}/conanfile.py',
-                            pkg_version_obj.recipe_content
-                        )
-                except PackageVersion.DoesNotExist:
-                    pass
-
-                # Add binary file from MinIO/storage
-                if binary.binary_file and binary.binary_file.name:
-                    try:
-                        # Read from storage backend (works with both local and MinIO)
-                        binary_content = binary.binary_file.read()
-                        zipf.writestr(
-                            f'{pkg_dir}/{pkg_name}-{pkg_ver}-{binary.package_id}.tar.gz',
-                            binary_content
-                        )
-                    except Exception as e:
-                        # If binary file can't be read, add a note
-                        error_note = f"""Package: {pkg_name}/{pkg_ver}
+                    # Open a streaming read from the storage backend
+                    source = open_stream(binary.binary_file)
+                except Exception as e:
+                    # If binary file can't be read, add a note
+                    error_note = f"""Package: {pkg_name}/{pkg_ver}
 Binary ID: {binary.package_id}
 Configuration: {binary.get_config_string()}
 Size: {binary.file_size} bytes
 
 Error: Could not read binary file: {e}
 """
-                        zipf.writestr(
-                            f'{pkg_dir}/ERROR.txt',
-                            error_note
-                        )
-
-        # Return the ZIP file
-        tmp_file.seek(0)
-        response = FileResponse(
-            open(tmp_file.name, 'rb'),
-            content_type='application/zip',
-            as_attachment=True,
-            filename=f'{package_name}-{version}-bundle.zip'
-        )
+                    yield from zip_stream.write_str(f'{pkg_dir}/ERROR.txt', error_note)
+                    continue
 
-        return response
+                try:
+                    yield from zip_stream.write_file(
+                        f'{pkg_dir}/{pkg_name}-{pkg_ver}-{binary.package_id}.tar.gz',
+                        source,
+                        size=binary.file_size
+                    )
+                finally:
+                    source.close()
+
+        yield from zip_stream.close()
+
+    chunks = generate_bundle()
+    if cache_key is not None:
+        chunks = cache_while_streaming(cache_key, chunks)
+    response = StreamingHttpResponse(stream_content(request, chunks), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{bundle_filename}"'
+    return response
+
+
+def prewarm_bundle(binary):
+    """
+    Build the bundle of a binary for its own platform into the bundle cache,
+    so the first download is served from the cache.
+
+    Runs the download_bundle view on a synthetic request and drains the
+    stream; cache_while_streaming() stores the ZIP.
+
+    Returns:
+        True if a bundle was built, False if it was already cached
+    """
+    if not is_bundle_cache_enabled():
+        return False
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(mutable=True)
+    request.GET.update({
+        'os': binary.os,
+        'arch': binary.arch,
+        'compiler': binary.compiler,
+        'compiler_version': binary.compiler_version,
+        'build_type': binary.build_type,
+    })
+
+    response = download_bundle(
+        request, binary.package_version.package.name, binary.package_version.version
+    )
+    try:
+        if isinstance(response, FileResponse) or not response.streaming:
+            return False
+        for _ in response.streaming_content:
+            pass
+        return True
+    finally:
+        response.close()
 
 
 def download_manifest(request, package_name, version):
@@ -563,170 +683,38 @@ def download_extracted_binary(request, package_name, version, binary_id):
             content_type='text/plain'
         )
 
-    # Increment download count
-    binary.download_count += 1
-    binary.save()
-    package.download_count += 1
-    package.save()
-
-    # Create temporary directory for extraction
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-
-        # Save the Conan .tar.gz file
-        conan_tarball = tmpdir_path / 'package.tar.gz'
-        with open(conan_tarball, 'wb') as f:
-            f.write(binary.binary_file.read())
-
-        # Extract the Conan tarball
-        extract_dir = tmpdir_path / 'extracted'
-        extract_dir.mkdir()
+    compression_policy = get_compression_policy(request)
+    filename = f"{package_name}-{version}-extracted.zip"
 
+    if compression_policy != get_default_compression_policy():
+        # One-off archive with a non-default compression policy, transcoded
+        # straight from the tarball stream
+        chunks = iter_extracted_zip(binary, policy=compression_policy)
         try:
-            with tarfile.open(conan_tarball, 'r:gz') as tar:
-                tar.extractall(extract_dir)
-        except Exception as e:
-            return HttpResponse(
-                f"Error extracting package: {e}",
-                status=500,
-                content_type='text/plain'
-            )
-
-        # Find the standard C++ directories (include/, lib/, bin/, cmake/)
-        # Conan packages typically store these in the package root
-        standard_dirs = ['include', 'lib', 'bin', 'cmake']
-
-        # Files to exclude from extraction (Conan metadata and recipe)
-        exclude_files = {'conaninfo.txt', 'conanmanifest.txt', 'pkglist.json', 'conan_sources.tgz', 'conanfile.py'}
-        # Directories to exclude (Conan internals)
-        exclude_dirs = {'e', 'd', 'b'}  # Conan cache structure directories
-
-        # Create output ZIP
-        output_zip = tmpdir_path / 'output.zip'
-        with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add README
-            readme_content = f"""# {package_name} {version} - Extracted Binary
-
-This package has been extracted from Conan format for direct use.
-
-## Package Information
-- Name: {package_name}
-- Version: {version}
-- Package ID: {binary_id}
-- Configuration: {binary.get_config_string()}
-
-## Directory Structure
-
-The following directories may be present:
-- include/ - Header files
-- lib/ - Library files (.a, .so, .dll, .lib)
-- bin/ - Binary executables
-- cmake/ - CMake package configuration files
-
-## Usage with CMake
-
-If cmake/ directory is present, you can use this package in your CMakeLists.txt:
-
-```cmake
-# Add to CMAKE_PREFIX_PATH
-list(APPEND CMAKE_PREFIX_PATH "${{CMAKE_CURRENT_SOURCE_DIR}}/path/to/extracted/package")
-
-# Find the package
-find_package({package_name} REQUIRED)
-
-# Link against it
-target_link_libraries(your_target {package_name}::{package_name})
-```
-
-## Manual Usage
-
-If cmake/ is not present, you can manually specify include and library paths:
-
-```cmake
-target_include_directories(your_target PRIVATE "${{CMAKE_CURRENT_SOURCE_DIR}}/path/to/include")
-target_link_directories(your_target PRIVATE "${{CMAKE_CURRENT_SOURCE_DIR}}/path/to/lib")
-target_link_libraries(your_target library_name)
-```
+            first_chunk = next(chunks)
+        except ExtractionError as e:
+            return HttpResponse(str(e), status=500, content_type='text/plain')
+        record_download(binary, package=package)
+        response = StreamingHttpResponse(
+            stream_content(request, itertools.chain([first_chunk], chunks)),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-Generated by ConanCrates
-"""
-            zipf.writestr('README.txt', readme_content)
-
-            # Walk through extracted directory and add standard dirs
-            # Maps found standard directories to their files: {std_dir: [(src_path, archive_path), ...]}
-            found_files = {}
-
-            for root, dirs, files in os.walk(extract_dir):
-                for file in files:
-                    # Skip Conan metadata files
-                    if file in exclude_files:
-                        continue
-
-                    file_path = Path(root) / file
-                    # Get relative path from extract_dir
-                    rel_path = file_path.relative_to(extract_dir)
-
-                    # Skip files that are in export/recipe directories (not in b/.../p/)
-                    # Conan binary packages are in b/<hash>/p/ directory
-                    parts_str = '/'.join(rel_path.parts)
-                    if '/e/' in parts_str or '/d/' in parts_str or '/s/' in parts_str or '/es/' in parts_str:
-                        continue  # Skip recipe and metadata directories
-
-                    # Check if this file is in a standard directory (anywhere in the path)
-                    parts = rel_path.parts
-                    for i, part in enumerate(parts):
-                        if part in standard_dirs:
-                            # Found a standard directory!
-                            # Reorganize path: std_dir/remaining/path
-                            std_dir = part
-                            remaining_parts = parts[i+1:]  # Everything after the std_dir
-                            archive_path = Path(std_dir) / Path(*remaining_parts) if remaining_parts else Path(std_dir)
-
-                            if std_dir not in found_files:
-                                found_files[std_dir] = []
-                            found_files[std_dir].append((file_path, archive_path))
-                            break
-
-            # Add found files to ZIP
-            for std_dir, file_list in found_files.items():
-                for src_path, archive_path in file_list:
-                    # Use ZipInfo to avoid timestamp issues (some files have pre-1980 timestamps)
-                    zinfo = zipfile.ZipInfo(str(archive_path))
-                    zinfo.date_time = (1980, 1, 1, 0, 0, 0)  # Safe default timestamp
-                    with open(src_path, 'rb') as src_f:
-                        zipf.writestr(zinfo, src_f.read())
-
-            # If no standard directories found, include everything (except metadata)
-            file_count = len(zipf.namelist()) - 1  # -1 for README
-            if file_count == 0:
-                # Add all files except Conan metadata
-                for root, dirs, files in os.walk(extract_dir):
-                    for file in files:
-                        # Skip Conan metadata files
-                        if file in exclude_files:
-                            continue
-
-                        file_path = Path(root) / file
-                        rel_path = file_path.relative_to(extract_dir)
-                        # Use ZipInfo to avoid timestamp issues
-                        zinfo = zipfile.ZipInfo(str(rel_path))
-                        zinfo.date_time = (1980, 1, 1, 0, 0, 0)
-                        with open(file_path, 'rb') as src_f:
-                            zipf.writestr(zinfo, src_f.read())
-
-                # Check if we actually added any files
-                if len(zipf.namelist()) <= 1:  # Only README
-                    # Package has no files!
-                    zipf.writestr('NOTE.txt',
-                        "This package appears to be empty or header-only with no files.\n"
-                        "No compiled binaries, headers, or other artifacts were found.\n"
-                        "This may be a metapackage that only declares dependencies.")
-
-        # Return the ZIP file
-        with open(output_zip, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{package_name}-{version}-extracted.zip"'
-            return response
+    # The extracted ZIP is built once per binary (at upload time, or here on
+    # first request for older binaries) and served from storage afterwards
+    try:
+        artifact = get_extracted_artifact(binary)
+    except ExtractionError as e:
+        return HttpResponse(str(e), status=500, content_type='text/plain')
+
+    response = stored_file_response(artifact, filename, 'application/zip', size=binary.extracted_size,
+                                    request=request)
+    # Resumed ranges aren't new downloads
+    if counts_as_download(response):
+        record_download(binary, package=package)
+    return response
 
 
 def list_available_binaries(request, package_name, version):
@@ -805,132 +793,24 @@ def download_extracted_bundle(request, package_name, version):
             content_type='text/plain'
         )
 
-    binary = binaries.first()
+    binary = binaries.select_related('package_version__package').first()
 
     # Collect all binaries to include (main + dependencies)
     binaries_to_extract = [(binary, package_name, version)]
     package_list = [f"{package_name}/{version}"]
 
-    # Process dependency graph
-    if binary.dependency_graph:
-        graph = binary.dependency_graph
-        nodes = graph.get('graph', {}).get('nodes', {})
-
-        for node_id, node in nodes.items():
-            if node_id == "0":  # Skip root node
-                continue
-
-            ref = node.get('ref', '')
-            if '/' not in ref:
-                continue
-
-            dep_name, dep_version_with_hash = ref.split('/', 1)
-            dep_version = dep_version_with_hash.split('#')[0]
-            dep_package_id = node.get('package_id', 'unknown')
-
-            try:
-                dep_binary = BinaryPackage.objects.get(
-                    package_version__package__name=dep_name,
-                    package_version__version=dep_version,
-                    package_id=dep_package_id
-                )
-                binaries_to_extract.append((dep_binary, dep_name, dep_version))
-                package_list.append(f"{dep_name}/{dep_version}")
-            except BinaryPackage.DoesNotExist:
-                pass  # Skip missing dependencies
+    # Add dependencies (all resolved in a single query, missing ones are skipped)
+    for dep in resolve_bundle_dependencies(binary):
+        if dep['binary'] is not None:
+            binaries_to_extract.append((dep['binary'], dep['name'], dep['version']))
+            package_list.append(f"{dep['name']}/{dep['version']}")
 
     # Log bundle generation start
-    import logging
-    logger = logging.getLogger(__name__)
     logger.info(f"Generating bundle for {package_name}/{version} with {len(binaries_to_extract)} package(s)")
 
-    # Create temporary directory for extraction
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
+    compression_policy = get_compression_policy(request)
 
-        # Directories for interlaced content
-        merged_include = tmpdir_path / 'include'
-        merged_lib = tmpdir_path / 'lib'
-        merged_bin = tmpdir_path / 'bin'
-        merged_cmake = tmpdir_path / 'cmake'
-
-        merged_include.mkdir()
-        merged_lib.mkdir()
-        merged_bin.mkdir()
-        merged_cmake.mkdir()
-
-        # Extract each package and merge into common directories
-        for idx, (bin_pkg, pkg_name, pkg_ver) in enumerate(binaries_to_extract, 1):
-            logger.info(f"  [{idx}/{len(binaries_to_extract)}] Extracting {pkg_name}/{pkg_ver}...")
-            if not bin_pkg.binary_file or not bin_pkg.binary_file.name:
-                continue
-
-            # Extract this package's tarball
-            pkg_tarball = tmpdir_path / f'{pkg_name}-{pkg_ver}.tar.gz'
-            with open(pkg_tarball, 'wb') as f:
-                f.write(bin_pkg.binary_file.read())
-
-            pkg_extract_dir = tmpdir_path / f'extract_{pkg_name}_{pkg_ver}'
-            pkg_extract_dir.mkdir()
-
-            try:
-                with tarfile.open(pkg_tarball, 'r:gz') as tar:
-                    tar.extractall(pkg_extract_dir)
-            except Exception:
-                continue  # Skip packages that fail to extract
-
-            # Merge standard directories
-            # For include/, create subdirectories per package
-            # For lib/ and bin/, put all files together
-            # For cmake/, merge all cmake files together
-            standard_dirs = ['include', 'lib', 'bin', 'cmake']
-
-            for root, dirs, files in os.walk(pkg_extract_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    rel_path = file_path.relative_to(pkg_extract_dir)
-                    parts = rel_path.parts
-
-                    # Find if this file is in a standard directory (anywhere in path)
-                    for i, part in enumerate(parts):
-                        if part in standard_dirs:
-                            std_dir = part
-                            remaining_parts = parts[i+1:]  # Everything after std_dir
-
-                            if std_dir == 'include':
-                                # Copy to merged_include/package_name/remaining/path
-                                dest = merged_include / pkg_name / Path(*remaining_parts) if remaining_parts else merged_include / pkg_name
-                                dest.parent.mkdir(parents=True, exist_ok=True)
-                                shutil.copy2(file_path, dest)
-
-                            elif std_dir == 'lib':
-                                # Copy to merged_lib/ (just the filename)
-                                dest = merged_lib / file
-                                if dest.exists():
-                                    # Avoid overwriting - add package name prefix
-                                    dest = merged_lib / f"{pkg_name}_{file}"
-                                shutil.copy2(file_path, dest)
-
-                            elif std_dir == 'bin':
-                                # Copy to merged_bin/ (just the filename)
-                                dest = merged_bin / file
-                                if dest.exists():
-                                    dest = merged_bin / f"{pkg_name}_{file}"
-                                shutil.copy2(file_path, dest)
-
-                            elif std_dir == 'cmake':
-                                # Copy to merged_cmake/remaining/path
-                                dest = merged_cmake / Path(*remaining_parts) if remaining_parts else merged_cmake
-                                dest.parent.mkdir(parents=True, exist_ok=True)
-                                shutil.copy2(file_path, dest)
-
-                            break  # Only match first standard dir in path
-
-        # Create output ZIP
-        output_zip = tmpdir_path / 'output.zip'
-        with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add README
-            readme_content = f"""# {package_name} {version} - Extracted Bundle
+    readme_content = f"""# {package_name} {version} - Extracted Bundle
 
 This bundle contains {package_name} and all its dependencies extracted for direct use.
 
@@ -941,10 +821,10 @@ This bundle contains {package_name} and all its dependencies extracted for direc
 
 ## Included Packages
 """
-            for pkg_ref in package_list:
-                readme_content += f"- {pkg_ref}\n"
+    for pkg_ref in package_list:
+        readme_content += f"- {pkg_ref}\n"
 
-            readme_content += """
+    readme_content += """
 ## Directory Structure
 
 This bundle uses an "interlaced" structure where all packages are merged:
@@ -990,27 +870,16 @@ target_link_libraries(your_target library_name1 library_name2)
 
 Generated by ConanCrates
 """
-            zipf.writestr('README.txt', readme_content)
-
-            # Add all merged directories to ZIP
-            for merged_dir in [merged_include, merged_lib, merged_bin, merged_cmake]:
-                if merged_dir.exists():
-                    for root, dirs, files in os.walk(merged_dir):
-                        for file in files:
-                            file_path = Path(root) / file
-                            # Path relative to tmpdir
-                            rel_path = file_path.relative_to(tmpdir_path)
-                            # Use ZipInfo to avoid timestamp issues
-                            zinfo = zipfile.ZipInfo(str(rel_path))
-                            zinfo.date_time = (1980, 1, 1, 0, 0, 0)
-                            with open(file_path, 'rb') as src_f:
-                                zipf.writestr(zinfo, src_f.read())
-
-        # Return the ZIP file
-        with open(output_zip, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{package_name}-{version}-extracted-bundle.zip"'
-            return response
+
+    # Tarballs are decompressed into temp files by a thread pool (up to
+    # EXTRACTED_BUNDLE_WORKERS + 1 on disk at once) and transcoded member by
+    # member into the ZIP in bundle order
+    response = StreamingHttpResponse(
+        stream_content(request, iter_extracted_bundle_zip(binaries_to_extract, readme_content, policy=compression_policy)),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{package_name}-{version}-extracted-bundle.zip"'
+    return response
 
 
 def download_rust_crate(request, package_name, version, package_id):
@@ -1024,22 +893,30 @@ def download_rust_crate(request, package_name, version, package_id):
     # Find the binary package
     binary = get_object_or_404(BinaryPackage, package_version=package_version, package_id=package_id)
 
-    # Check if rust crate file exists
-    if not binary.rust_crate_file or not binary.rust_crate_file.name:
+    # The crate is built from the binary once (after upload, or here on
+    # first request) and served from storage afterwards
+    try:
+        crate_file = get_rust_crate(binary)
+    except ExtractionError as e:
+        return HttpResponse(str(e), status=500, content_type='text/plain')
+    if crate_file is None:
         return HttpResponse(
             f"Rust crate not available for {package_name}/{version} (package_id: {package_id})",
             status=404,
             content_type='text/plain'
         )
 
-    # Increment download count
-    binary.download_count += 1
-    binary.save(update_fields=['download_count'])
-
-    # Return the .crate file
-    response = HttpResponse(binary.rust_crate_file.read(), content_type='application/gzip')
+    # Return the .crate file (presigned redirect or streamed, see DOWNLOAD_DELIVERY_MODE)
     crate_name = f"{package_name.replace('_', '-')}-sys-{version}.crate"
-    response['Content-Disposition'] = f'attachment; filename="{crate_name}"'
+    response = stored_file_response(
+        crate_file,
+        crate_name,
+        'application/gzip',
+        request=request,
+        etag=make_etag(binary.rust_crate_sha256)
+    )
+    if counts_as_download(response):
+        record_download(binary)
     return response
 
 
@@ -1048,14 +925,16 @@ def download_rust_bundle(request, package_name, version, package_id):
     Download a bundle containing the requested Rust crate and all its dependencies.
     Returns a .zip file with all crate directories and path dependencies configured.
     """
-    import re
-    
     package = get_object_or_404(Package, name=package_name)
     package_version = get_object_or_404(PackageVersion, package=package, version=version)
     binary = get_object_or_404(BinaryPackage, package_version=package_version, package_id=package_id)
 
     # Check if rust crate and dependency graph exist
-    if not binary.rust_crate_file or not binary.rust_crate_file.name:
+    try:
+        crate_file = get_rust_crate(binary)
+    except ExtractionError as e:
+        return HttpResponse(str(e), status=500, content_type='text/plain')
+    if crate_file is None:
         return HttpResponse(
             f"Rust crate not available for {package_name}/{version}",
             status=404,
@@ -1069,144 +948,46 @@ def download_rust_bundle(request, package_name, version, package_id):
             content_type='text/plain'
         )
 
-    # Parse dependency graph
-    try:
-        dep_graph = binary.dependency_graph if isinstance(binary.dependency_graph, dict) else json.loads(binary.dependency_graph)
-    except json.JSONDecodeError:
-        return HttpResponse("Invalid dependency graph", status=500, content_type='text/plain')
-
-    # Extract dependencies
-    dependencies = []
-    nodes = dep_graph.get('graph', {}).get('nodes', {})
-    for node_id, node in nodes.items():
-        if node_id == "0":
-            continue
-        ref = node.get('ref', '')
-        if '/' not in ref:
-            continue
-        dep_name, dep_version_with_hash = ref.split('/', 1)
-        dep_version = dep_version_with_hash.split('#')[0]
-        dep_package_id = node.get('package_id')
-        if dep_package_id:
-            dependencies.append({
-                'name': dep_name,
-                'version': dep_version,
-                'package_id': dep_package_id
-            })
-
-    # Create temp directory
-    temp_dir = tempfile.mkdtemp()
-    try:
-        crates_dir = os.path.join(temp_dir, 'crates')
-        os.makedirs(crates_dir)
-
-        # Download and extract main crate
-        main_crate_name = f"{package_name.replace('_', '-')}-sys"
-        main_crate_file = f"{main_crate_name}-{version}.crate"
-        main_crate_path = os.path.join(crates_dir, main_crate_file)
-
-        with open(main_crate_path, 'wb') as f:
-            binary.rust_crate_file.seek(0)
-            f.write(binary.rust_crate_file.read())
-
-        with tarfile.open(main_crate_path, 'r:gz') as tar:
-            tar.extractall(crates_dir)
-        os.remove(main_crate_path)
-
-        # Download and extract dependency crates
-        dep_crate_names = []
-        for dep in dependencies:
-            dep_pkg = Package.objects.filter(name=dep['name']).first()
-            if not dep_pkg:
-                continue
-            dep_ver = PackageVersion.objects.filter(package=dep_pkg, version=dep['version']).first()
-            if not dep_ver:
-                continue
-            dep_bin = BinaryPackage.objects.filter(
-                package_version=dep_ver, package_id=dep['package_id']
-            ).first()
-            if not dep_bin or not dep_bin.rust_crate_file:
-                continue
-
-            dep_crate_name = f"{dep['name'].replace('_', '-')}-sys"
-            dep_crate_file = f"{dep_crate_name}-{dep['version']}.crate"
-            dep_crate_path = os.path.join(crates_dir, dep_crate_file)
-
-            with open(dep_crate_path, 'wb') as f:
-                dep_bin.rust_crate_file.seek(0)
-                f.write(dep_bin.rust_crate_file.read())
-
-            with tarfile.open(dep_crate_path, 'r:gz') as tar:
-                tar.extractall(crates_dir)
-            os.remove(dep_crate_path)
-
-            dep_crate_names.append(dep_crate_name)
-
-        # Update Cargo.toml files to use path dependencies
-        for crate_dir_name in [main_crate_name] + dep_crate_names:
-            cargo_toml = os.path.join(crates_dir, crate_dir_name, 'Cargo.toml')
-            if not os.path.exists(cargo_toml):
-                continue
-                
-            with open(cargo_toml, 'r') as f:
-                content = f.read()
-
-            # Replace simple version dependencies with path dependencies
-            for dep_name in dep_crate_names:
-                pattern = f'{re.escape(dep_name)} = "([^"]+)"'
-                replacement = f'{dep_name} = {{ version = "\1", path = "../{dep_name}" }}'
-                content = re.sub(pattern, replacement, content)
-
-            with open(cargo_toml, 'w') as f:
-                f.write(content)
-
-        # Create README
-        with open(os.path.join(crates_dir, 'README.md'), 'w') as f:
-            f.write(f"""# Rust Crate Bundle: {main_crate_name}
-
-This bundle contains {main_crate_name} and all its dependencies.
+    # Dependencies with a package_id (all resolved in a single query); their
+    # crates are built now if no worker has built them yet
+    dependencies = [dep for dep in resolve_bundle_dependencies(binary) if dep['package_id']]
+    for dep in dependencies:
+        if dep['binary'] is not None:
+            try:
+                get_rust_crate(dep['binary'])
+            except ExtractionError as e:
+                logger.warning(f"Could not build Rust crate for {dep['name']}/{dep['version']}: {e}")
+    crates = get_bundle_crates(binary, dependencies)
+
+    main_crate_name = crates[0][0]
+    bundle_filename = f"{main_crate_name}-bundle.zip"
+    compression_policy = get_compression_policy(request)
+
+    # Bundles built from the same crates are byte-for-byte reusable
+    cache_members = get_cache_members(crates)
+    cache_key = None
+    if cache_members is not None:
+        cache_key = compute_cache_key('rust', cache_members, compression=compression_policy)
+        cached = get_cached_bundle(cache_key)
+        if cached is not None:
+            response = stored_file_response(cached.bundle_file, bundle_filename, 'application/zip',
+                                            size=cached.size, request=request)
+            # Revalidations and resumed ranges aren't new downloads
+            if counts_as_download(response):
+                record_download(binary)
+            return response
 
-## Contents
-- {main_crate_name}/ - Main crate
-""")
-            for dep in dep_crate_names:
-                f.write(f"- {dep}/ - Dependency\n")
-            f.write(f"""
-## Usage
-
-1. Extract this bundle
-2. Copy the crates/ directory to your project
-3. In your Cargo.toml, add:
-   ```toml
-   [dependencies]
-   {main_crate_name} = {{ version = "{version}", path = "crates/{main_crate_name}" }}
-   ```
-4. Run: cargo build
+    readme = build_rust_bundle_readme(main_crate_name, version, [name for name, _ in crates[1:]])
+    chunks = iter_rust_bundle_zip(crates, readme, policy=compression_policy)
+    if cache_key is not None:
+        chunks = cache_while_streaming(cache_key, chunks)
 
-Generated by ConanCrates
-""")
-
-        # Create zip
-        zip_path = os.path.join(temp_dir, f"{main_crate_name}-bundle.zip")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(crates_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    zipf.write(file_path, arcname)
-
-        # Increment download count
-        binary.download_count += 1
-        binary.save(update_fields=['download_count'])
-
-        # Return zip
-        with open(zip_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{main_crate_name}-bundle.zip"'
-            return response
+    # Increment download count
+    record_download(binary)
 
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+    response = StreamingHttpResponse(stream_content(request, chunks), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{bundle_filename}"'
+    return response
 
 
 def get_package_info_api(request, package_name, version, package_id):
@@ -1220,27 +1001,14 @@ def get_package_info_api(request, package_name, version, package_id):
 
     # Extract dependencies from graph
     dependencies = []
-    if binary.dependency_graph:
-        dep_graph = binary.dependency_graph if isinstance(binary.dependency_graph, dict) else json.loads(binary.dependency_graph)
-        nodes = dep_graph.get('graph', {}).get('nodes', {})
-        
-        for node_id, node in nodes.items():
-            if node_id == "0":
-                continue
-            ref = node.get('ref', '')
-            if '/' not in ref:
-                continue
-            dep_name, dep_version_with_hash = ref.split('/', 1)
-            dep_version = dep_version_with_hash.split('#')[0]
-            dep_package_id = node.get('package_id')
-            
-            if dep_package_id:
-                dependencies.append({
-                    'name': dep_name,
-                    'version': dep_version,
-                    'package_id': dep_package_id,
-                    'rust_crate_url': f"/packages/{dep_name}/{dep_version}/binaries/{dep_package_id}/rust-crate/"
-                })
+    for edge in get_dependency_edges(binary):
+        if edge.package_id:
+            dependencies.append({
+                'name': edge.name,
+                'version': edge.version,
+                'package_id': edge.package_id,
+                'rust_crate_url': f"/packages/{edge.name}/{edge.version}/binaries/{edge.package_id}/rust-crate/"
+            })
 
     response_data = {
         'package': {
@@ -1249,7 +1017,8 @@ def get_package_info_api(request, package_name, version, package_id):
             'package_id': package_id
         },
         'rust_crate': {
-            'available': bool(binary.rust_crate_file),
+            # Built from the binary on first download if there is none yet
+            'available': bool(binary.rust_crate_file or binary.binary_file),
             'crate_name': f"{package_name.replace('_', '-')}-sys",
             'download_url': f"/packages/{package_name}/{version}/binaries/{package_id}/rust-crate/"
         },
@@ -1289,8 +1058,8 @@ def get_rust_crate_by_settings_api(request, package_name, version):
     if build_type:
         binaries = binaries.filter(build_type=build_type)
 
-    # Filter to only those with rust crates
-    binaries = binaries.exclude(rust_crate_file='')
+    # Filter to those with a Rust crate, or a binary to build one from
+    binaries = binaries.filter(Q(rust_crate_file__gt='') | Q(binary_file__gt=''))
 
     if not binaries.exists():
         return JsonResponse({
@@ -1309,27 +1078,14 @@ def get_rust_crate_by_settings_api(request, package_name, version):
 
     # Get dependencies
     dependencies = []
-    if binary.dependency_graph:
-        dep_graph = binary.dependency_graph if isinstance(binary.dependency_graph, dict) else json.loads(binary.dependency_graph)
-        nodes = dep_graph.get('graph', {}).get('nodes', {})
-
-        for node_id, node in nodes.items():
-            if node_id == "0":
-                continue
-            ref = node.get('ref', '')
-            if '/' not in ref:
-                continue
-            dep_name, dep_version_with_hash = ref.split('/', 1)
-            dep_version = dep_version_with_hash.split('#')[0]
-            dep_package_id = node.get('package_id')
-
-            if dep_package_id:
-                dependencies.append({
-                    'name': dep_name,
-                    'version': dep_version,
-                    'package_id': dep_package_id,
-                    'rust_crate_url': f"/packages/{dep_name}/{dep_version}/binaries/{dep_package_id}/rust-crate/"
-                })
+    for edge in get_dependency_edges(binary):
+        if edge.package_id:
+            dependencies.append({
+                'name': edge.name,
+                'version': edge.version,
+                'package_id': edge.package_id,
+                'rust_crate_url': f"/packages/{edge.name}/{edge.version}/binaries/{edge.package_id}/rust-crate/"
+            })
 
     response_data = {
         'package': {
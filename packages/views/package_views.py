@@ -2,6 +2,7 @@ from django.shortcuts import render, get_object_or_404
 from django.db.models import Q
 from django.core.paginator import Paginator
 from packages.models import Package, PackageVersion, Topic
+from packages.dependency_index import get_dependency_edges
 
 
 def package_list(request):
@@ -71,33 +72,17 @@ def package_detail(request, package_name):
     if selected_version:
         binaries = selected_version.binaries.all()
 
-        # Extract dependencies from dependency_graph stored in each binary
+        # Dependencies come from the index of each binary's dependency_graph
         # Dependencies can differ per binary based on options/settings
         for binary in binaries:
-            dependencies = []
-            if binary.dependency_graph:
-                graph = binary.dependency_graph
-                nodes = graph.get('graph', {}).get('nodes', {})
-
-                for node_id, node in nodes.items():
-                    # Skip root node (the package itself)
-                    if node_id == "0":
-                        continue
-
-                    # Parse package reference (e.g., "boost/1.81.0" or "boost/1.81.0#hash")
-                    ref = node.get('ref', '')
-                    if '/' not in ref:
-                        continue
-
-                    dep_name, dep_version_with_hash = ref.split('/', 1)
-                    # Remove recipe revision hash if present
-                    dep_version = dep_version_with_hash.split('#')[0]
-
-                    dependencies.append({
-                        'name': dep_name,
-                        'version': dep_version,
-                        'package_id': node.get('package_id', 'unknown')
-                    })
+            dependencies = [
+                {
+                    'name': edge.name,
+                    'version': edge.version,
+                    'package_id': edge.package_id or 'unknown'
+                }
+                for edge in get_dependency_edges(binary)
+            ]
 
             # Build bundle package list (main package + dependencies)
             bundle_packages = [f"{package.name}/{selected_version.version}"]
@@ -1,20 +1,37 @@
 """
 Simple unified upload API for ConanCrates
 
-Single endpoint that accepts both recipe (conanfile.py) and binary (.tar.gz) files.
+Single endpoint that accepts both recipe (conanfile.py) and binary (.tar.gz) files,
+plus a bulk existence check used by the CLI to plan uploads.
 """
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.base import ContentFile
-from packages.models import Package, PackageVersion, BinaryPackage
+from django.db import transaction
+from packages.models import Package, PackageVersion, BinaryPackage, Dependency
+from packages.ingest import scan_conaninfo
+from packages.conan_layout import recipe_revision
+from packages.jobs import enqueue_upload_jobs
+from packages.blobs import (
+    BINARY_SUFFIX,
+    CRATE_SUFFIX,
+    ChecksumMismatch,
+    acquire_blob,
+    find_blob,
+    release_file,
+    reuse_blob,
+    store_upload,
+)
 import json
 import hashlib
-import tarfile
-import io
 import re
 
 
+# Maximum number of binaries accepted by one existence check request
+MAX_EXISTS_BATCH = 1000
+
+
 def parse_conanfile(recipe_content):
     """
     Extract metadata from conanfile.py content.
@@ -66,9 +83,9 @@ def parse_conanfile(recipe_content):
     return metadata
 
 
-def extract_conaninfo(binary_file):
+def parse_conaninfo(content):
     """
-    Extract conaninfo.txt from binary .tar.gz file.
+    Parse settings out of conaninfo.txt content.
 
     Returns dict with:
     - os: operating system
@@ -76,6 +93,8 @@ def extract_conaninfo(binary_file):
     - compiler: compiler name
     - compiler_version: compiler version
     - build_type: build type (Release, Debug, etc.)
+
+    Settings missing from the file (or no file at all) keep their defaults.
     """
     settings = {
         'os': 'Linux',
@@ -84,53 +103,243 @@ def extract_conaninfo(binary_file):
         'compiler_version': '11',
         'build_type': 'Release'
     }
+    if not content:
+        return settings
+
+    # Parse conaninfo.txt
+    # Format:
+    # [settings]
+    # os=Linux
+    # arch=x86_64
+    # ...
+    for line in content.split('\n'):
+        line = line.strip()
+        if '=' in line:
+            key, value = line.split('=', 1)
+            key = key.strip()
+            value = value.strip()
+
+            if key == 'os':
+                settings['os'] = value
+            elif key == 'arch':
+                settings['arch'] = value
+            elif key == 'compiler':
+                settings['compiler'] = value
+            elif key == 'compiler.version':
+                settings['compiler_version'] = value
+            elif key == 'build_type':
+                settings['build_type'] = value
+
+    return settings
+
+
+def extract_conaninfo(binary_file):
+    """
+    Extract settings from the conaninfo.txt inside a binary .tar.gz file.
+
+    Reading stops as soon as conaninfo.txt is found. Uploads get their
+    settings from store_upload() instead, while the binary is stored.
 
+    Returns:
+        Settings dict, see parse_conaninfo()
+    """
     try:
-        # Reset file pointer
-        binary_file.seek(0)
-
-        # Open tar.gz
-        with tarfile.open(fileobj=binary_file, mode='r:gz') as tar:
-            # Look for conaninfo.txt
-            for member in tar.getmembers():
-                if member.name.endswith('conaninfo.txt'):
-                    f = tar.extractfile(member)
-                    if f:
-                        content = f.read().decode('utf-8')
-
-                        # Parse conaninfo.txt
-                        # Format:
-                        # [settings]
-                        # os=Linux
-                        # arch=x86_64
-                        # ...
-
-                        for line in content.split('\n'):
-                            line = line.strip()
-                            if '=' in line:
-                                key, value = line.split('=', 1)
-                                key = key.strip()
-                                value = value.strip()
-
-                                if key == 'os':
-                                    settings['os'] = value
-                                elif key == 'arch':
-                                    settings['arch'] = value
-                                elif key == 'compiler':
-                                    settings['compiler'] = value
-                                elif key == 'compiler.version':
-                                    settings['compiler_version'] = value
-                                elif key == 'build_type':
-                                    settings['build_type'] = value
-                        break
+        content = scan_conaninfo(binary_file)
     except Exception as e:
         # If we can't extract, use defaults
         print(f"Warning: Could not extract conaninfo.txt: {e}")
+        content = None
 
-    # Reset file pointer again for later use
-    binary_file.seek(0)
+    if content is None:
+        print("Warning: Could not extract conaninfo.txt, using default settings")
+    return parse_conaninfo(content)
 
-    return settings
+
+def get_dependency_graph(request):
+    """Dependency graph (conan graph info JSON) sent with an upload, or {}"""
+    dependency_graph = {}
+    dependency_graph_json = request.POST.get('dependency_graph')
+    if dependency_graph_json:
+        try:
+            dependency_graph = json.loads(dependency_graph_json)
+        except json.JSONDecodeError:
+            print(f"Warning: Could not parse dependency_graph JSON")
+    return dependency_graph
+
+
+def parse_requirement(dep_str):
+    """
+    Split a recipe requirement like "boost/1.81.0" into (name, version).
+
+    Returns None for strings that aren't name/version references.
+    """
+    if '/' not in dep_str:
+        return None
+    name, version = dep_str.split('/', 1)
+    return name.strip(), version.strip()
+
+
+def record_dependencies(package_version, requirements):
+    """
+    Upsert the recipe-level Dependency rows of a package version.
+
+    Missing dependency packages are created as placeholders; all rows are
+    written with bulk queries (an existing row gets the new version
+    requirement), so the cost doesn't grow with one query per requirement.
+    Call inside a transaction.
+
+    Args:
+        package_version: PackageVersion the recipe belongs to
+        requirements: List of (name, version) from parse_requirement()
+    """
+    requirements = dict(requirements)  # last one wins for duplicate names
+
+    if requirements:
+        Package.objects.bulk_create([
+            Package(name=name, description=f'Dependency: {name}', license='Unknown')
+            for name in requirements
+        ], ignore_conflicts=True)
+    packages = Package.objects.in_bulk(list(requirements), field_name='name')
+
+    Dependency.objects.bulk_create([
+        Dependency(
+            package_version=package_version,
+            requires_package=packages[name],
+            version_requirement=version,
+            dependency_type='requires'
+        )
+        for name, version in requirements.items()
+    ], update_conflicts=True,
+        unique_fields=['package_version', 'requires_package', 'dependency_type'],
+        update_fields=['version_requirement'])
+
+
+def record_upload(request, package_name, version, recipe_content, package_id,
+                  settings, dependency_graph, ingested):
+    """
+    Create or update the database rows of an uploaded binary.
+
+    The binary itself is already in storage (see store_upload() and the
+    direct upload sessions); this records the Package, PackageVersion and
+    BinaryPackage referencing its blob, stores the optional Rust crate from
+    request.FILES and queues the derived work (see packages.jobs).
+
+    All rows are written in one transaction with upserts, so parallel
+    uploads of binaries of the same package/version neither fail on unique
+    constraints nor leave half-written rows behind. Storage transfers
+    happen before the transaction and the derived work is queued after it,
+    so no row locks are held during I/O.
+
+    Args:
+        request: Upload request (conan_version and rust_crate are read from it)
+        ingested: IngestResult of the stored binary
+
+    Returns:
+        The saved BinaryPackage
+    """
+    # Parse conanfile for description and license (still useful)
+    metadata = parse_conanfile(recipe_content)
+    description = metadata.get('description', '')
+    license_info = metadata.get('license', 'Unknown')
+    requirements = [
+        requirement for requirement in map(parse_requirement, metadata.get('dependencies', []))
+        if requirement
+    ]
+
+    # Get conan_version from client if provided
+    conan_version = request.POST.get('conan_version', 'unknown')
+
+    # Store the Rust crate (if provided) before any row is locked
+    ingested_crate = None
+    if 'rust_crate' in request.FILES:
+        ingested_crate = store_upload(
+            request.FILES['rust_crate'],
+            CRATE_SUFFIX,
+            sha256=request.POST.get('rust_crate_sha256'),
+            scan=False
+        )
+
+    with transaction.atomic():
+        # Upsert the package; an existing package keeps its metadata unless
+        # the recipe has a description
+        package_metadata = {'description': description, 'license': license_info}
+        package, _ = Package.objects.update_or_create(
+            name=package_name,
+            defaults=package_metadata if description else {},
+            create_defaults=package_metadata
+        )
+
+        # Upsert the package version (recipe content follows the latest upload)
+        version_metadata = {
+            'recipe_content': recipe_content,
+            'recipe_revision': recipe_revision(recipe_content),
+            'description': description,
+            'conan_version': conan_version,
+        }
+        package_version, _ = PackageVersion.objects.update_or_create(
+            package=package,
+            version=version,
+            defaults=version_metadata,
+            create_defaults=dict(
+                version_metadata,
+                uploaded_by=request.user if request.user.is_authenticated else None
+            )
+        )
+
+        # Lock (or create) the binary, so concurrent re-uploads of the same
+        # package_id are applied one after the other
+        binary, _ = BinaryPackage.objects.select_for_update().get_or_create(
+            package_version=package_version,
+            package_id=package_id,
+            defaults={
+                'os': settings['os'],
+                'arch': settings['arch'],
+                'compiler': settings['compiler'],
+                'compiler_version': settings['compiler_version'],
+                'build_type': settings['build_type'],
+            }
+        )
+
+        # Point the binary at its stored blobs; the files it pointed at
+        # before are released once the new ones are committed
+        replaced = [binary.binary_file]
+        binary.binary_file = acquire_blob(ingested)
+        binary.sha256 = ingested.sha256
+        binary.file_size = ingested.size
+        binary.dependency_graph = dependency_graph  # Update graph even if binary exists
+        if ingested_crate is not None:
+            replaced.append(binary.rust_crate_file)
+            binary.rust_crate_file = acquire_blob(ingested_crate)
+            binary.rust_crate_sha256 = ingested_crate.sha256
+            binary.rust_crate_source_sha256 = ingested.sha256
+        binary.save()
+
+        # Create dependencies from metadata (if parsed from requires field)
+        record_dependencies(package_version, requirements)
+
+    for field_file in replaced:
+        release_file(field_file)
+
+    # Extracted artifact and bundle prewarm (by run_workers in queued mode)
+    enqueue_upload_jobs(binary)
+
+    return binary
+
+
+def upload_response(package_name, version, package_id, ingested, settings):
+    """Success response shared by the upload endpoints"""
+    return JsonResponse({
+        'status': 'success',
+        'message': f'Package {package_name}/{version} uploaded successfully',
+        'package': {
+            'name': package_name,
+            'version': version,
+            'package_id': package_id,
+            'sha256': ingested.sha256,
+            'size': ingested.size,
+            'settings': settings
+        }
+    })
 
 
 @csrf_exempt
@@ -142,6 +351,10 @@ def upload_package(request):
     Accepts multipart form data with:
     - recipe: conanfile.py file
     - binary: .tar.gz binary file
+    - binary_sha256: (optional) sha256 of the binary. If the server already
+      stores that content, the binary file can be left out entirely
+    - rust_crate: (optional) .crate file, with optional rust_crate_sha256.
+      Without one the server builds the crate from the binary
     - package_id: (optional) Real Conan package_id from client
     - dependency_graph: (optional) JSON string of conan graph info output
 
@@ -155,14 +368,17 @@ def upload_package(request):
                 'message': 'Missing recipe file (conanfile.py)'
             }, status=400)
 
+        binary_sha256 = request.POST.get('binary_sha256')
+        known_blob = None
         if 'binary' not in request.FILES:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Missing binary file (.tar.gz)'
-            }, status=400)
+            known_blob = find_blob(binary_sha256)
+            if known_blob is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Missing binary file (.tar.gz)'
+                }, status=400)
 
         recipe_file = request.FILES['recipe']
-        binary_file = request.FILES['binary']
 
         # Read recipe content
         recipe_content = recipe_file.read().decode('utf-8')
@@ -177,50 +393,19 @@ def upload_package(request):
                 'message': 'Missing required fields: package_name and version must be provided in POST data'
             }, status=400)
 
-        # Parse conanfile for description and license (still useful)
-        metadata = parse_conanfile(recipe_content)
-        description = metadata.get('description', '')
-        license_info = metadata.get('license', 'Unknown')
-
-        # Extract settings from binary
-        settings = extract_conaninfo(binary_file)
-
-        # Get or create package
-        package, created = Package.objects.get_or_create(
-            name=package_name,
-            defaults={
-                'description': description,
-                'license': license_info
-            }
-        )
-
-        # Update package if it already exists
-        if not created and description:
-            package.description = description
-            package.license = license_info
-            package.save()
-
-        # Get conan_version from client if provided
-        conan_version = request.POST.get('conan_version', 'unknown')
-
-        # Get or create package version
-        package_version, created = PackageVersion.objects.get_or_create(
-            package=package,
-            version=version,
-            defaults={
-                'recipe_content': recipe_content,
-                'description': description,
-                'conan_version': conan_version,
-                'uploaded_by': request.user if request.user.is_authenticated else None
-            }
-        )
-
-        # Update recipe content if version already exists
-        if not created:
-            package_version.recipe_content = recipe_content
-            package_version.description = description
-            package_version.conan_version = conan_version
-            package_version.save()
+        # Store the binary in MinIO unless its content is already there,
+        # hashing it and reading its conaninfo.txt on the way
+        try:
+            if known_blob is not None:
+                ingested = reuse_blob(known_blob)
+            else:
+                ingested = store_upload(request.FILES['binary'], BINARY_SUFFIX, sha256=binary_sha256)
+        except ChecksumMismatch as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e)
+            }, status=400)
+        settings = parse_conaninfo(ingested.conaninfo)
 
         # Get package_id from client if provided, otherwise generate from settings
         package_id = request.POST.get('package_id')
@@ -230,93 +415,10 @@ def upload_package(request):
             package_id_str = f"{settings['os']}-{settings['arch']}-{settings['compiler']}-{settings['compiler_version']}-{settings['build_type']}"
             package_id = hashlib.md5(package_id_str.encode()).hexdigest()[:16]
 
-        # Get dependency_graph from client if provided
-        dependency_graph = {}
-        dependency_graph_json = request.POST.get('dependency_graph')
-        if dependency_graph_json:
-            try:
-                dependency_graph = json.loads(dependency_graph_json)
-            except json.JSONDecodeError:
-                print(f"Warning: Could not parse dependency_graph JSON")
-
-        # Calculate SHA256 of binary
-        binary_file.seek(0)
-        sha256_hash = hashlib.sha256()
-        for chunk in binary_file.chunks():
-            sha256_hash.update(chunk)
-        sha256 = sha256_hash.hexdigest()
-
-        # Get or create binary package
-        binary, created = BinaryPackage.objects.get_or_create(
-            package_version=package_version,
-            package_id=package_id,
-            defaults={
-                'os': settings['os'],
-                'arch': settings['arch'],
-                'compiler': settings['compiler'],
-                'compiler_version': settings['compiler_version'],
-                'build_type': settings['build_type'],
-                'sha256': sha256,
-                'file_size': binary_file.size,
-                'dependency_graph': dependency_graph
-            }
-        )
-
-        # Save binary file to MinIO
-        binary_file.seek(0)
-        binary.binary_file.save(
-            f"{package_name}-{version}-{package_id}.tar.gz",
-            binary_file,
-            save=False
-        )
-        binary.sha256 = sha256
-        binary.file_size = binary_file.size
-        binary.dependency_graph = dependency_graph  # Update graph even if binary exists
-
-        # Save Rust crate file if provided
-        if 'rust_crate' in request.FILES:
-            rust_crate_file = request.FILES['rust_crate']
-            crate_name = package_name.replace('_', '-')
-            binary.rust_crate_file.save(
-                f"{crate_name}-sys-{version}.crate",
-                rust_crate_file,
-                save=False
-            )
-
-        binary.save()
+        record_upload(request, package_name, version, recipe_content, package_id,
+                      settings, get_dependency_graph(request), ingested)
 
-        # Create dependencies from metadata (if parsed from requires field)
-        from packages.models import Dependency
-        for dep_str in metadata.get('dependencies', []):
-            # Parse dependency string (e.g., "boost/1.81.0")
-            if '/' in dep_str:
-                dep_name, dep_version = dep_str.split('/', 1)
-                dep_package, _ = Package.objects.get_or_create(
-                    name=dep_name,
-                    defaults={'description': f'Dependency: {dep_name}', 'license': 'Unknown'}
-                )
-                dep_version_obj, _ = PackageVersion.objects.get_or_create(
-                    package=dep_package,
-                    version=dep_version
-                )
-
-                Dependency.objects.get_or_create(
-                    package_version=package_version,
-                    depends_on=dep_version_obj
-                )
-
-        return JsonResponse({
-            'status': 'success',
-            'message': f'Package {package_name}/{version} uploaded successfully',
-            'package': {
-                'name': package_name,
-                'version': version,
-                'package_id': package_id,
-                'sha256': sha256,
-                'size': binary_file.size,
-                'settings': settings
-            }
-        })
+        return upload_response(package_name, version, package_id, ingested, settings)
 
     except Exception as e:
         import traceback
@@ -325,3 +427,91 @@ def upload_package(request):
             'status': 'error',
             'message': str(e)
         }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def check_blob_exists(request, sha256):
+    """
+    Check whether the server already stores content with this sha256.
+
+    Lets the CLI send binary_sha256 instead of the binary itself.
+    """
+    blob = find_blob(sha256)
+    if blob is None:
+        return JsonResponse({'status': 'success', 'exists': False}, status=404)
+    return JsonResponse({'status': 'success', 'exists': True, 'sha256': blob.sha256, 'size': blob.size})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def check_packages_exist(request):
+    """
+    Bulk existence check for binary packages.
+
+    Accepts a JSON body:
+        {"packages": [{"name": "zlib", "version": "1.2.13", "package_id": "abc...",
+                       "sha256": "..."}, ...]}
+    sha256 is optional; when given, the response also says whether the stored
+    binary has the same checksum.
+
+    A binary only counts as existing if its file has been stored. All entries
+    are answered with a single query, in request order.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Request body must be JSON'
+        }, status=400)
+
+    packages = payload.get('packages') if isinstance(payload, dict) else None
+    if not isinstance(packages, list):
+        return JsonResponse({
+            'status': 'error',
+            'message': "Missing 'packages' list"
+        }, status=400)
+
+    if len(packages) > MAX_EXISTS_BATCH:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Too many packages (max {MAX_EXISTS_BATCH} per request)'
+        }, status=400)
+
+    for entry in packages:
+        if not isinstance(entry, dict) or not all(entry.get(key) for key in ('name', 'version', 'package_id')):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Each package needs name, version and package_id'
+            }, status=400)
+
+    package_ids = {entry['package_id'] for entry in packages}
+    stored = {}
+    rows = (
+        BinaryPackage.objects.filter(package_id__in=package_ids)
+        .exclude(binary_file='')
+        .values_list('package_version__package__name', 'package_version__version', 'package_id', 'sha256')
+    )
+    for name, version, package_id, sha256 in rows:
+        stored[(name, version, package_id)] = sha256
+
+    results = []
+    for entry in packages:
+        key = (entry['name'], entry['version'], entry['package_id'])
+        result = {
+            'name': entry['name'],
+            'version': entry['version'],
+            'package_id': entry['package_id'],
+            'exists': key in stored,
+        }
+        if entry.get('sha256') and key in stored:
+            result['sha256_matches'] = stored[key] == entry['sha256']
+        results.append(result)
+
+    return JsonResponse({
+        'status': 'success',
+        'packages': results,
+        'existing': sum(1 for result in results if result['exists']),
+        'missing': sum(1 for result in results if not result['exists']),
+    })
@@ -0,0 +1,249 @@
+"""
+Direct upload sessions for ConanCrates
+
+Large binaries are uploaded straight to MinIO instead of through Django:
+
+1. POST   /api/package/upload-sessions                 - start; returns presigned part URLs
+2. PUT    <part url> (to MinIO, parts in parallel)
+3. POST   /api/package/upload-sessions/<id>/complete   - verify size/sha256, create BinaryPackage
+   DELETE /api/package/upload-sessions/<id>            - abort
+
+Parts are assembled under a staging name of the session's own
+(uploads/<session id>.tar.gz), never under the blob name: only content that
+has been verified is copied to its blob, so a client can't overwrite content
+other binaries already point at.
+
+The recipe and Rust crate are small and still come with the complete request.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from packages.models import BinaryPackage, UploadSession
+from packages.ingest import ingest_stored
+from packages.blobs import BINARY_SUFFIX, blob_name, find_blob
+from packages.multipart import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    copy_object,
+    get_session_expiry,
+    plan_parts,
+    presign_part_urls,
+    start_multipart_upload,
+    supports_direct_upload,
+)
+from packages.views.simple_upload import get_dependency_graph, parse_conaninfo, record_upload, upload_response
+import json
+import re
+
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _error(message, status):
+    return JsonResponse({'status': 'error', 'message': message}, status=status)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def start_upload_session(request):
+    """
+    Start a direct upload of a binary to MinIO.
+
+    Accepts a JSON body:
+        {"package_name": "zlib", "version": "1.2.13", "package_id": "abc...",
+         "size": 123456789, "sha256": "..."}
+
+    Returns the session id, the part size and one presigned PUT URL per part.
+    If the server already stores content with that sha256, no session is
+    started and the response says "exists": the client then uploads with
+    binary_sha256 instead of the binary. Answers 501 if the storage backend can't take direct uploads (the client
+    then falls back to /api/package/upload).
+    """
+    field = BinaryPackage._meta.get_field('binary_file')
+    if not supports_direct_upload(field.storage):
+        return _error('Direct uploads need S3/MinIO storage; use /api/package/upload', 501)
+
+    try:
+        payload = json.loads(request.body)
+        package_name = payload['package_name']
+        version = payload['version']
+        package_id = payload['package_id']
+        size = int(payload['size'])
+        sha256 = payload['sha256'].lower()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return _error('Expected JSON with package_name, version, package_id, size and sha256', 400)
+
+    if not (package_name and version and package_id) or size <= 0 or not SHA256_RE.match(sha256):
+        return _error('Invalid package reference, size or sha256', 400)
+
+    if find_blob(sha256) is not None:
+        return JsonResponse({'status': 'success', 'exists': True})
+
+    part_size, part_count = plan_parts(size)
+    session = UploadSession(
+        package_name=package_name,
+        version=version,
+        package_id=package_id,
+        size=size,
+        sha256=sha256,
+        part_size=part_size,
+        expires_at=timezone.now() + timedelta(seconds=get_session_expiry()),
+    )
+    session.binary_file = UploadSession._meta.get_field('binary_file').generate_filename(
+        session, f"{session.id}{BINARY_SUFFIX}"
+    )
+    try:
+        session.multipart_upload_id = start_multipart_upload(session.binary_file)
+        parts = presign_part_urls(session.binary_file, session.multipart_upload_id, part_count)
+    except Exception as e:
+        return _error(f'Could not start upload: {e}', 502)
+    session.save()
+
+    return JsonResponse({
+        'status': 'success',
+        'exists': False,
+        'session_id': str(session.id),
+        'part_size': part_size,
+        'expires_at': session.expires_at.isoformat(),
+        'parts': parts,
+    })
+
+
+def _fail_session(session, status=UploadSession.STATUS_FAILED, completed=False):
+    """
+    Drop whatever was uploaded for a session and close it.
+
+    Parts of an unfinished multipart upload are released by aborting it;
+    once completed, the assembled staging object is deleted instead.
+    """
+    try:
+        if completed:
+            session.binary_file.delete(save=False)
+        else:
+            abort_multipart_upload(session.binary_file, session.multipart_upload_id)
+    except Exception as e:
+        print(f"Warning: Could not clean up upload session {session.id}: {e}")
+    session.status = status
+    session.save(update_fields=['status'])
+
+
+def _store_verified(session, ingested):
+    """
+    Move a verified staging object to its blob.
+
+    Content that is already stored (uploaded by someone else while the
+    session was open) is reused as it is; otherwise the staging object is
+    copied to the blob name. The staging object is deleted either way.
+
+    Returns:
+        Name of the object holding the content
+    """
+    blob = find_blob(ingested.sha256)
+    if blob is not None:
+        name = blob.file.name
+    else:
+        name = copy_object(session.binary_file, blob_name(ingested.sha256, BINARY_SUFFIX))
+    try:
+        session.binary_file.delete(save=False)
+    except Exception as e:
+        print(f"Warning: Could not delete staging object of upload session {session.id}: {e}")
+    return name
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def complete_upload_session(request, session_id):
+    """
+    Finish a direct upload.
+
+    Accepts multipart form data with:
+    - parts: JSON list of {"part_number": n, "etag": "..."} from the part uploads
+    - recipe: conanfile.py file
+    - rust_crate: (optional) .crate file
+    - conan_version, dependency_graph: as for /api/package/upload
+
+    The assembled staging object is read back once from MinIO to check its
+    size and sha256 (and to read conaninfo.txt). A mismatch deletes it and
+    fails the session; verified content is copied to its blob (unless that
+    is stored already) before the BinaryPackage is created.
+    """
+    if 'recipe' not in request.FILES:
+        return _error('Missing recipe file (conanfile.py)', 400)
+    try:
+        parts = json.loads(request.POST.get('parts', ''))
+        if not isinstance(parts, list) or not parts:
+            raise ValueError
+    except ValueError:
+        return _error('Missing parts list', 400)
+
+    # Claim the session, so concurrent completes can't both finalize it
+    with transaction.atomic():
+        session = get_object_or_404(UploadSession.objects.select_for_update(), pk=session_id)
+        if session.status != UploadSession.STATUS_OPEN:
+            return _error(f'Upload session is {session.status}', 409)
+        expired = session.expires_at < timezone.now()
+        if not expired:
+            session.status = UploadSession.STATUS_COMPLETING
+            session.save(update_fields=['status'])
+    if expired:
+        _fail_session(session, UploadSession.STATUS_ABORTED)
+        return _error('Upload session expired', 410)
+
+    try:
+        complete_multipart_upload(session.binary_file, session.multipart_upload_id, parts)
+    except Exception as e:
+        _fail_session(session)
+        return _error(f'Could not complete upload: {e}', 400)
+
+    try:
+        ingested = ingest_stored(session.binary_file)
+    except Exception as e:
+        _fail_session(session, completed=True)
+        return _error(f'Could not read uploaded file: {e}', 400)
+
+    if ingested.size != session.size or ingested.sha256 != session.sha256:
+        _fail_session(session, completed=True)
+        return _error(
+            f'Uploaded file does not match: expected {session.size} bytes / {session.sha256}, '
+            f'got {ingested.size} bytes / {ingested.sha256}',
+            400
+        )
+
+    try:
+        ingested.name = _store_verified(session, ingested)
+    except Exception as e:
+        _fail_session(session, completed=True)
+        return _error(f'Could not store uploaded file: {e}', 502)
+
+    try:
+        recipe_content = request.FILES['recipe'].read().decode('utf-8')
+        settings = parse_conaninfo(ingested.conaninfo)
+        record_upload(request, session.package_name, session.version, recipe_content, session.package_id,
+                      settings, get_dependency_graph(request), ingested)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        session.status = UploadSession.STATUS_FAILED
+        session.save(update_fields=['status'])
+        return _error(str(e), 500)
+
+    session.status = UploadSession.STATUS_COMPLETE
+    session.save(update_fields=['status'])
+
+    return upload_response(session.package_name, session.version, session.package_id, ingested, settings)
+
+
+@csrf_exempt
+@require_http_methods(["DELETE"])
+def abort_upload_session(request, session_id):
+    """Abort a direct upload, releasing the parts uploaded so far"""
+    session = get_object_or_404(UploadSession, pk=session_id)
+    if session.status != UploadSession.STATUS_OPEN:
+        return _error(f'Upload session is {session.status}', 409)
+
+    _fail_session(session, UploadSession.STATUS_ABORTED)
+    return JsonResponse({'status': 'success', 'message': 'Upload aborted'})
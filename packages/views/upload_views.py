@@ -10,8 +10,10 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
 from django.core.files.base import ContentFile
 from packages.models import Package, PackageVersion, BinaryPackage
+from packages.blobs import BINARY_SUFFIX, acquire_blob, release_file, store_upload
+from packages.jobs import enqueue_upload_jobs
+from packages.views.simple_upload import parse_conaninfo
 import json
-import hashlib
 
 
 @csrf_exempt
@@ -19,12 +21,17 @@ import hashlib
 def ping(request):
     """
     Ping endpoint - Conan client uses this to check server availability
+
+    The capabilities header tells Conan 2 clients the revisions API
+    (packages.views.conan_remote) is available.
     """
-    return JsonResponse({
+    response = JsonResponse({
         "status": "ok",
         "version": "1.0.0",
         "server": "ConanCrates"
     })
+    response['X-Conan-Server-Capabilities'] = 'revisions'
+    return response
 
 
 @csrf_exempt
@@ -93,37 +100,28 @@ def upload_package(request, package_name, package_version, package_id):
         package = get_object_or_404(Package, name=package_name)
         version = get_object_or_404(PackageVersion, package=package, version=package_version)
 
-        # Get or create binary package
-        binary, created = BinaryPackage.objects.get_or_create(
-            package_version=version,
-            package_id=package_id,
-            defaults={
-                'os': 'Linux',  # TODO: Extract from package_id or metadata
-                'arch': 'x86_64',
-                'compiler': 'gcc',
-                'compiler_version': '11',
-                'build_type': 'Release'
-            }
-        )
-
         # Check if file was uploaded
         if 'file' in request.FILES:
-            uploaded_file = request.FILES['file']
-
-            # Calculate SHA256
-            sha256_hash = hashlib.sha256()
-            for chunk in uploaded_file.chunks():
-                sha256_hash.update(chunk)
-
-            # Save file
-            binary.binary_file.save(
-                f'{package_name}-{package_version}-{package_id}.tar.gz',
-                uploaded_file,
-                save=False
+            # Store the file once per distinct content, calculating its SHA256
+            # and reading the settings from its conaninfo.txt on the way
+            ingested = store_upload(request.FILES['file'], BINARY_SUFFIX)
+            settings = parse_conaninfo(ingested.conaninfo)
+
+            binary, created = BinaryPackage.objects.update_or_create(
+                package_version=version,
+                package_id=package_id,
+                defaults=settings if ingested.conaninfo else {},
+                create_defaults=settings
             )
-            binary.sha256 = sha256_hash.hexdigest()
-            binary.file_size = uploaded_file.size
+            replaced = binary.binary_file
+            binary.binary_file = acquire_blob(ingested)
+            binary.sha256 = ingested.sha256
+            binary.file_size = ingested.size
             binary.save()
+            release_file(replaced)
+
+            # Extracted artifact and bundle prewarm (by run_workers in queued mode)
+            enqueue_upload_jobs(binary)
 
             return JsonResponse({
                 "status": "ok",
@@ -0,0 +1,136 @@
+"""
+Streaming ZIP writer for bundle downloads
+
+Builds a ZIP archive incrementally and hands back the bytes as they are
+produced, so bundles can be served through StreamingHttpResponse without
+staging the archive in memory or on disk.
+"""
+import stat
+import time
+import zipfile
+from django.conf import settings
+from packages.compression import DEFAULT_COMPRESSION_POLICY, MAGIC_SIZE, compress_type_for
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def get_chunk_size():
+    """Read buffer size used when copying stored files into a ZIP stream"""
+    return getattr(settings, 'BUNDLE_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+class _ChunkBuffer:
+    """
+    Write-only sink for zipfile.
+
+    It has no tell()/seek(), so zipfile treats it as unseekable and writes
+    data descriptors after each entry instead of seeking back to patch headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Return everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    Incremental ZIP archive writer.
+
+    Every write method is a generator yielding the archive bytes produced
+    so far, so callers can chain them inside a response generator:
+
+        stream = ZipStream()
+        yield from stream.write_str('README.txt', readme)
+        yield from stream.write_file('pkg/pkg.tar.gz', fileobj, size=binary.file_size)
+        yield from stream.close()
+
+    Peak memory is bounded by the read chunk size, independent of the
+    size of the files being archived. Each entry is stored or deflated
+    according to the compression policy (see packages.compression).
+    """
+
+    def __init__(self, policy=DEFAULT_COMPRESSION_POLICY, chunk_size=None):
+        self.policy = policy
+        self.chunk_size = chunk_size or get_chunk_size()
+        self._buffer = _ChunkBuffer()
+        self._zipf = zipfile.ZipFile(self._buffer, 'w')
+
+    def _make_info(self, arcname, compress_type, mode=0o644):
+        zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = compress_type
+        zinfo.external_attr = (stat.S_IFREG | mode) << 16
+        return zinfo
+
+    def write_str(self, arcname, data, compress_type=None):
+        """
+        Add an in-memory entry (README, metadata, recipe).
+
+        Args:
+            arcname: Path of the entry inside the archive
+            data: str or bytes content
+            compress_type: Override the compression policy for this entry
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if compress_type is None:
+            compress_type = compress_type_for(self.policy, arcname, data[:MAGIC_SIZE])
+        self._zipf.writestr(self._make_info(arcname, compress_type), data)
+        yield self._buffer.drain()
+
+    def write_file(self, arcname, fileobj, size=None, compress_type=None, mode=0o644):
+        """
+        Copy a file-like object into the archive chunk by chunk.
+
+        Args:
+            arcname: Path of the entry inside the archive
+            fileobj: Readable file-like object (storage stream, open file, ...)
+            size: Expected size in bytes, if known (used to pick ZIP64 headers)
+            compress_type: Override the compression policy for this entry
+            mode: Unix permission bits of the entry (e.g. 0o755 for executables)
+        """
+        # Read the first chunk up front so the policy can sniff magic bytes
+        chunk = fileobj.read(self.chunk_size)
+        if compress_type is None:
+            compress_type = compress_type_for(self.policy, arcname, chunk[:MAGIC_SIZE])
+
+        zinfo = self._make_info(arcname, compress_type, mode=mode)
+        # Without a reliable size hint, always reserve ZIP64 headers so
+        # multi-GB binaries don't overflow the 32-bit fields mid-stream
+        force_zip64 = not size or size >= zipfile.ZIP64_LIMIT
+        with self._zipf.open(zinfo, 'w', force_zip64=force_zip64) as dest:
+            while chunk:
+                dest.write(chunk)
+                data = self._buffer.drain()
+                if data:
+                    yield data
+                chunk = fileobj.read(self.chunk_size)
+        yield self._buffer.drain()
+
+    def write_symlink(self, arcname, target):
+        """
+        Add a Unix symlink entry (e.g. libz.so -> libz.so.1).
+
+        unzip and most archive tools recreate it as a link on extraction.
+        """
+        zinfo = self._make_info(arcname, zipfile.ZIP_STORED)
+        zinfo.external_attr = (stat.S_IFLNK | 0o777) << 16
+        self._zipf.writestr(zinfo, target)
+        yield self._buffer.drain()
+
+    def close(self):
+        """Write the central directory and yield the final bytes"""
+        self._zipf.close()
+        yield self._buffer.drain()